@@ -20,6 +20,131 @@ class Settings:
     # We might need an API token later for authenticated requests
     CORPUS_API_TOKEN: str = os.getenv("CORPUS_API_TOKEN")
 
+    # Connection string for the Supabase/PostgreSQL database holding `blogs`
+    DATABASE_URL: str = os.getenv("DATABASE_URL")
+
+    # Token required in the `X-Admin-Token` header for the /admin endpoints
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN")
+
+    # Directory where the FAISS index and reindex checkpoints are persisted
+    VECTOR_STORE_DIR: str = os.getenv("VECTOR_STORE_DIR", "vector_store_data")
+
+    # Multi-worker mode: every worker memory-maps the published index instead
+    # of loading it into memory. Writes are always serialized with a file lock,
+    # and every process picks up a newer index within
+    # VECTOR_STORE_RELOAD_INTERVAL seconds
+    VECTOR_STORE_SHARED: bool = os.getenv("VECTOR_STORE_SHARED", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    VECTOR_STORE_RELOAD_INTERVAL: float = float(
+        os.getenv("VECTOR_STORE_RELOAD_INTERVAL", "5")
+    )
+
+    # Sharding: chunks are partitioned across VECTOR_STORE_SHARDS indexes by the
+    # hash of a metadata field ("record_id", "language" or "category_id"). With
+    # more than one shard, each is searched in its own worker process and shards
+    # slower than SHARD_SEARCH_TIMEOUT seconds are left out of the results
+    VECTOR_STORE_SHARDS: int = int(os.getenv("VECTOR_STORE_SHARDS", "1"))
+    VECTOR_STORE_SHARD_KEY: str = os.getenv("VECTOR_STORE_SHARD_KEY", "record_id")
+    SHARD_SEARCH_TIMEOUT: float = float(os.getenv("SHARD_SEARCH_TIMEOUT", "2"))
+
+    # Deleted or replaced chunks leave tombstoned vectors behind; a shard is
+    # compacted in the background once they reach this fraction of its vectors
+    VECTOR_STORE_COMPACT_RATIO: float = float(
+        os.getenv("VECTOR_STORE_COMPACT_RATIO", "0.2")
+    )
+
+    # Writes are appended to a log next to the index snapshot; once the log
+    # reaches this fraction of the snapshot's size, or VECTOR_STORE_MAX_LOG_BYTES,
+    # it is folded into a new one. Every worker holds the log's changes in memory
+    VECTOR_STORE_SNAPSHOT_RATIO: float = float(
+        os.getenv("VECTOR_STORE_SNAPSHOT_RATIO", "0.25")
+    )
+    VECTOR_STORE_MAX_LOG_BYTES: int = int(
+        os.getenv("VECTOR_STORE_MAX_LOG_BYTES", str(64 * 1024 * 1024))
+    )
+
+    # Chunking for the vector store, measured in estimated embedding-model
+    # tokens: the largest chunk and how much of its tail the next chunk repeats
+    CHUNK_TOKEN_BUDGET: int = int(os.getenv("CHUNK_TOKEN_BUDGET", "512"))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+
+    # Near-duplicate chunks (estimated Jaccard similarity of their MinHash
+    # signatures at or above DEDUP_THRESHOLD) are linked to the existing vector
+    # instead of being embedded again
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+
+    # Retrieval for /chat/: RETRIEVAL_FETCH_K candidates are re-ranked with MMR
+    # (RETRIEVAL_MMR_LAMBDA trades relevance against diversity), RETRIEVAL_K
+    # are kept, and their most relevant sentences are packed into
+    # CONTEXT_TOKEN_BUDGET estimated tokens
+    RETRIEVAL_K: int = int(os.getenv("RETRIEVAL_K", "3"))
+    RETRIEVAL_FETCH_K: int = int(os.getenv("RETRIEVAL_FETCH_K", "12"))
+    RETRIEVAL_MMR_LAMBDA: float = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.5"))
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+
+    # Chat sessions: how many are kept (least recently used are evicted), how
+    # long an idle one survives, and the token budget for the conversation
+    # history sent with each prompt before older turns are summarized
+    CHAT_MAX_SESSIONS: int = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+    CHAT_SESSION_TTL: float = float(os.getenv("CHAT_SESSION_TTL", "3600"))
+    CHAT_HISTORY_TOKEN_BUDGET: int = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+
+    # Chunked uploads: chunks are written under UPLOAD_TMP_DIR and assembled on
+    # disk; unfinished uploads older than UPLOAD_TTL seconds are discarded
+    UPLOAD_TMP_DIR: str = os.getenv("UPLOAD_TMP_DIR", "upload_tmp")
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+    UPLOAD_MAX_CHUNK_BYTES: int = int(
+        os.getenv("UPLOAD_MAX_CHUNK_BYTES", str(8 * 1024 * 1024))
+    )
+    UPLOAD_TTL: float = float(os.getenv("UPLOAD_TTL", str(24 * 3600)))
+
+    # Executors: threads for blocking IO (database, Gemini and embedding
+    # calls) and worker processes for OCR, each loading its own EasyOCR models
+    IO_WORKERS: int = int(os.getenv("IO_WORKERS", "16"))
+    OCR_WORKERS: int = int(os.getenv("OCR_WORKERS", "2"))
+
+    # Admission control: requests each endpoint class runs at once and how many
+    # more may wait. A full queue answers 429, a wait longer than
+    # ADMISSION_QUEUE_TIMEOUT seconds answers 503, both with Retry-After
+    CHAT_MAX_CONCURRENCY: int = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))
+    CHAT_MAX_QUEUE: int = int(os.getenv("CHAT_MAX_QUEUE", "32"))
+    UPLOAD_MAX_CONCURRENCY: int = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "2"))
+    UPLOAD_MAX_QUEUE: int = int(os.getenv("UPLOAD_MAX_QUEUE", "8"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+    ADMISSION_RETRY_AFTER: float = float(os.getenv("ADMISSION_RETRY_AFTER", "5"))
+
+    # Batch uploads: files per batch, batches processed at once, files queued
+    # between pipeline stages, files cleaned and embedded together, and the
+    # estimated tokens of OCR text packed into one Gemini cleanup call
+    BATCH_MAX_FILES: int = int(os.getenv("BATCH_MAX_FILES", "500"))
+    BATCH_MAX_JOBS: int = int(os.getenv("BATCH_MAX_JOBS", "2"))
+    BATCH_PIPELINE_DEPTH: int = int(os.getenv("BATCH_PIPELINE_DEPTH", "4"))
+    BATCH_INDEX_SIZE: int = int(os.getenv("BATCH_INDEX_SIZE", "8"))
+    CLEANUP_BATCH_TOKENS: int = int(os.getenv("CLEANUP_BATCH_TOKENS", "6000"))
+
+    # Corpus export: where export runs are written, the size at which a shard
+    # file is closed, and rows per Parquet row group (the most held in memory)
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", "corpus_export")
+    EXPORT_MAX_SHARD_BYTES: int = int(
+        os.getenv("EXPORT_MAX_SHARD_BYTES", str(256 * 1024 * 1024))
+    )
+    EXPORT_ROW_GROUP_SIZE: int = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "1000"))
+
+    # Reindex tuning: rows per server-side cursor fetch, chunks per embedding
+    # call, parallel embedding calls, and batches between checkpoints
+    REINDEX_FETCH_SIZE: int = int(os.getenv("REINDEX_FETCH_SIZE", "200"))
+    REINDEX_EMBED_BATCH_SIZE: int = int(os.getenv("REINDEX_EMBED_BATCH_SIZE", "64"))
+    REINDEX_WORKERS: int = int(os.getenv("REINDEX_WORKERS", "4"))
+    REINDEX_CHECKPOINT_EVERY: int = int(os.getenv("REINDEX_CHECKPOINT_EVERY", "10"))
+
 
 # Create a single instance of the Settings class that we can import elsewhere
 settings = Settings()
\ No newline at end of file
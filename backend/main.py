@@ -1,4 +1,3 @@
-import io
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -12,21 +11,35 @@ if env_path.is_file():
 # Add the project root to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import asyncio
+import math
+import time
 import uuid
-from typing import Annotated, List, Optional
+from typing import Annotated, BinaryIO, List, Optional
 
-import easyocr
-import fitz
 import google.generativeai as genai
-import numpy as np
-import psycopg2
-from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import (
+    BackgroundTasks,
+    Depends,
+    FastAPI,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    UploadFile,
+)
+from fastapi.responses import FileResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from langchain.chains.question_answering import load_qa_chain
 from langchain.prompts import PromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
-from PIL import Image
 from pydantic import BaseModel
+from .core.settings import settings
+from .services import executors, ocr
+from .services.admission import limiters
+from .services.batch_upload import batch_jobs, run_batch
+from .services.chat_sessions import record_turn, schedule_summary, sessions
+from .services.cleanup import clean_text
 from .services.corpus_api import (
     finalize_record,
     get_all_records,
@@ -36,21 +49,41 @@ from .services.corpus_api import (
     login_for_access_token,
     upload_chunk,
 )
+from .services.database import (
+    delete_blog,
+    get_blog,
+    get_db_connection,
+    init_db,
+    insert_blog,
+    restore_blog,
+    upsert_blog,
+)
+from .services.export import (
+    FORMATS as EXPORT_FORMATS,
+    export_corpus,
+    export_path,
+    get_export_status,
+)
+from .services.uploads import chunked_uploads
+from .services.reindex import get_reindex_status, reindex
+from .services.retrieval import retrieve_context
+from .services.text_utils import estimate_tokens
 from .services.vector_store import (
+    NUM_SHARDS,
     add_text_to_store,
+    compact_vector_store,
+    delete_record,
+    get_dedup_report,
     initialize_vector_store,
-    search_store,
+    upsert_record,
 )
 
 
-# --- Database and AI Service Initialization ---
-DATABASE_URL = os.getenv("DATABASE_URL")
+# --- AI Service Initialization ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
-reader = easyocr.Reader(["en", "te"])
-
 
 # --- Pydantic Models ---
 class StatusResponse(BaseModel):
@@ -76,13 +109,53 @@ class Blog(BaseModel):
     content: str  # <-- RESTORED
 
 
+class ReindexResponse(BaseModel):
+    status: str
+    message: str
+    incremental: bool
+    shard: Optional[int] = None
+
+
+class ExportResponse(BaseModel):
+    status: str
+    message: str
+    formats: List[str]
+    incremental: bool
+
+
+class RecordUpsertRequest(BaseModel):
+    title: str
+    content: str
+    language: Optional[str] = None
+    category_id: Optional[str] = None
+
+
+class RecordChangeResponse(BaseModel):
+    record_id: str
+    added: int
+    linked: int
+    removed: int
+    reassigned: int
+    unlinked: int
+
+
+class ChunkedUploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    total_size: int
+    total_chunks: int
+    received: List[int]
+
+
 class ChatRequest(BaseModel):
     query: str
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     answer: str
     sources: List[dict]
+    session_id: str
 
 
 # --- FastAPI App ---
@@ -93,44 +166,35 @@ app = FastAPI(
 )
 
 
-# --- Database Functions (RESTORED) ---
-def get_db_connection():
-    """Establishes a connection to the PostgreSQL database."""
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
-
-
-def init_db():
-    """Initializes the blogs table in the Supabase database."""
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS blogs (
-                id SERIAL PRIMARY KEY,
-                record_id TEXT NOT NULL UNIQUE,
-                title TEXT NOT NULL,
-                content TEXT NOT NULL,
-                created_at TIMESTAMPTZ DEFAULT NOW()
-            )
-        """
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-
 @app.on_event("startup")
 async def startup_event():
     init_db()
     initialize_vector_store()
 
 
+@app.on_event("shutdown")
+def shutdown_event():
+    executors.shutdown()
+
+
+# --- Admin Dependency ---
+async def require_admin(x_admin_token: Annotated[Optional[str], Header()] = None):
+    if not settings.ADMIN_API_TOKEN or x_admin_token != settings.ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+# --- Admission Control ---
+def admit(endpoint_class: str):
+    """Dependency holding a slot of the endpoint class's limiter for the request."""
+    limiter = limiters[endpoint_class]
+
+    async def dependency():
+        async with limiter:
+            yield
+
+    return dependency
+
+
 # --- AUTHENTICATION ENDPOINT ---
 @app.post("/token", response_model=Token, tags=["Authentication"])
 async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
@@ -141,37 +205,183 @@ async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
 
 
 # --- CHATBOT ENDPOINT ---
-@app.post("/chat/", response_model=ChatResponse, tags=["AI"])
+@app.post(
+    "/chat/",
+    response_model=ChatResponse,
+    tags=["AI"],
+    dependencies=[Depends(admit("chat"))],
+)
 async def handle_chat(request: ChatRequest):
-    context_docs = search_store(request.query)
-    if not context_docs:
-        return {
-            "answer": "I'm sorry, I couldn't find any relevant information to answer your question.",
-            "sources": [],
-        }
-    prompt_template = """
-    You are a helpful assistant. Answer the question as detailed as possible based on the provided context.
-    If the answer is not in the context, say "I don't have enough information to answer that."
-    Context: {context}
-    Question: {question}
-    Answer:
-    """
-    prompt = PromptTemplate(
-        template=prompt_template, input_variables=["context", "question"]
-    )
-    model = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash-latest", temperature=0.3, google_api_key=GEMINI_API_KEY
-    )
-    chain = load_qa_chain(model, chain_type="stuff", prompt=prompt)
-    response = await chain.ainvoke(
-        {"input_documents": context_docs, "question": request.query}
+    started = time.perf_counter()
+    session = sessions.get_or_create(request.session_id)
+    async with session.lock:
+        context_docs, retrieval_stats = await executors.run_io(
+            retrieve_context, request.query
+        )
+        if not context_docs:
+            answer = "క్షమించండి, మీ ప్రశ్నకు సమాధానం ఇవ్వడానికి తగిన సమాచారం దొరకలేదు."
+            if record_turn(session, request.query, answer):
+                schedule_summary(session)
+            return {"answer": answer, "sources": [], "session_id": session.id}
+        prompt_template = """
+        You are 'Sahitya Sreshta' (సాహిత్య శ్రేష్ఠ), a helpful and knowledgeable
+        chatbot specialized in Telugu literature. Answer questions about Telugu
+        literature, poetry, famous authors and literary works as detailed as
+        possible based on the provided context.
+        If the answer is not in the context, say that you don't have enough
+        information to answer that.
+        If a question is not about Telugu literature, politely and conversationally
+        respond that you can only answer questions about that topic.
+        Your responses must be in conversational Telugu.
+        Use the conversation so far to understand follow-up questions.
+        Conversation so far: {history}
+        Context: {context}
+        Question: {question}
+        Answer:
+        """
+        prompt = PromptTemplate(
+            template=prompt_template, input_variables=["history", "context", "question"]
+        )
+        model = ChatGoogleGenerativeAI(
+            model="gemini-1.5-flash-latest",
+            temperature=0.3,
+            google_api_key=GEMINI_API_KEY,
+        )
+        chain = load_qa_chain(model, chain_type="stuff", prompt=prompt)
+        history = session.history_text() or "(none)"
+        prompt_tokens = estimate_tokens(
+            prompt.format(
+                history=history,
+                context="\n\n".join(doc.page_content for doc in context_docs),
+                question=request.query,
+            )
+        )
+        generation_started = time.perf_counter()
+        response = await chain.ainvoke(
+            {
+                "input_documents": context_docs,
+                "question": request.query,
+                "history": history,
+            }
+        )
+        answer = response.get("output_text", "")
+        print(
+            f"Chat {session.id}: context {retrieval_stats['raw_tokens']} -> "
+            f"{retrieval_stats['tokens']} tokens from "
+            f"{retrieval_stats['candidates']} candidates, "
+            f"prompt {prompt_tokens} tokens, "
+            f"retrieval {retrieval_stats['ms']} ms, generation "
+            f"{(time.perf_counter() - generation_started) * 1000:.0f} ms, total "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        # The history is summarized after the response is sent, outside the
+        # lock and the admission slot.
+        if record_turn(session, request.query, answer):
+            schedule_summary(session)
+        sources = [doc.metadata for doc in context_docs]
+        return {"answer": answer, "sources": sources, "session_id": session.id}
+
+
+# --- Upload Processing ---
+async def extract_text(file_obj: BinaryIO, content_type: str) -> str:
+    """Runs OCR over an uploaded PDF or image in the OCR process pool."""
+    path = getattr(file_obj, "name", None)
+    if isinstance(path, str) and os.path.isfile(path):
+        return await executors.run_cpu(ocr.extract_text, path, content_type)
+    data = await executors.run_io(file_obj.read)
+    return await executors.run_cpu(ocr.extract_text, data, content_type)
+
+
+async def register_record(
+    title: str,
+    category_id: str,
+    release_rights: str,
+    language: str,
+    filename: str,
+    content_type: str,
+    file_obj: Optional[BinaryIO] = None,
+) -> dict:
+    """Registers a contribution with the corpus API and returns the new record."""
+    user_id = await get_current_user_id()
+    upload_uuid = str(uuid.uuid4())
+    if file_obj is not None:
+        await upload_chunk(
+            file_obj=file_obj,
+            upload_uuid=upload_uuid,
+            filename=filename,
+            content_type=content_type,
+        )
+    return await finalize_record(
+        title=title,
+        category_id=category_id,
+        user_id=user_id,
+        upload_uuid=upload_uuid,
+        filename=filename,
+        content_type=content_type,
+        release_rights=release_rights,
+        language=language,
     )
-    sources = [doc.metadata for doc in context_docs]
-    return {"answer": response.get("output_text", ""), "sources": sources}
+
+
+async def process_upload(
+    title: str,
+    category_id: str,
+    release_rights: str,
+    language: str,
+    file_obj: Optional[BinaryIO] = None,
+    filename: Optional[str] = None,
+    content_type: Optional[str] = None,
+    text_content: Optional[str] = None,
+    final_result: Optional[dict] = None,
+) -> dict:
+    """
+    Registers a contribution with the corpus API, unless `final_result` is the
+    record an earlier attempt registered, then OCRs, cleans and indexes it.
+    """
+    if file_obj is None:
+        filename = "text_input.txt"
+        content_type = "text/plain"
+    if final_result is None:
+        final_result = await register_record(
+            title,
+            category_id,
+            release_rights,
+            language,
+            filename,
+            content_type,
+            file_obj,
+        )
+    record_id = final_result.get("id")
+
+    if file_obj is not None:
+        # OCR, AI Cleanup, and Saving
+        file_obj.seek(0)
+        final_text = await extract_text(file_obj, content_type)
+    else:
+        final_text = text_content
+
+    if GEMINI_API_KEY and final_text:
+        cleaned_text = await executors.run_io(clean_text, final_text)
+
+        if record_id and cleaned_text:
+            metadata = {
+                "record_id": record_id,
+                "title": title,
+                "filename": filename,
+                "language": language,
+                "category_id": category_id,
+            }
+            # Save to Supabase before indexing, so a reindex that misses the
+            # vectors still finds the row.
+            await executors.run_io(
+                insert_blog, record_id, title, cleaned_text, language, category_id
+            )
+            await executors.run_io(add_text_to_store, cleaned_text, metadata)
+    return final_result
 
 
 # --- Upload Endpoint ---
-@app.post("/upload/", tags=["Files"])
+@app.post("/upload/", tags=["Files"], dependencies=[Depends(admit("upload"))])
 async def create_upload_file(
     file: Optional[Annotated[UploadFile, File(None)]] = None,
     title: Annotated[str, Form()] = None,
@@ -190,83 +400,351 @@ async def create_upload_file(
             status_code=400,
             detail="Cannot process both a file and text content at the same time.",
         )
-    
-    user_id = await get_current_user_id()
-    upload_uuid = str(uuid.uuid4())
-    final_text = ""
 
-    if file:
-        file_content = await file.read()
-        await file.seek(0)
-        await upload_chunk(file=file, upload_uuid=upload_uuid, filename=file.filename)
-        final_result = await finalize_record(
-            title=title,
-            category_id=category_id,
-            user_id=user_id,
-            upload_uuid=upload_uuid,
-            filename=file.filename,
-            content_type=file.content_type,
-            release_rights=release_rights,
-            language=language,
+    return await process_upload(
+        title=title,
+        category_id=category_id,
+        release_rights=release_rights,
+        language=language,
+        file_obj=file.file if file else None,
+        filename=file.filename if file else None,
+        content_type=file.content_type if file else None,
+        text_content=text_content,
+    )
+
+
+# --- Batch Upload Endpoints ---
+@app.post(
+    "/upload/batch",
+    status_code=202,
+    tags=["Files"],
+    dependencies=[Depends(admit("upload"))],
+)
+async def create_batch_upload(
+    files: Optional[Annotated[List[UploadFile], File(None)]] = None,
+    archive: Optional[Annotated[UploadFile, File(None)]] = None,
+    manifest: Optional[Annotated[str, Form()]] = None,
+    category_id: Annotated[str, Form()] = None,
+    release_rights: Annotated[str, Form()] = None,
+    language: Annotated[str, Form()] = None,
+):
+    """
+    Accepts many files and/or a ZIP or TAR archive, with per-file metadata from
+    a JSON `manifest` (or a manifest.json inside the archive), and processes
+    them in the background. Poll GET /upload/batch/{batch_id} for progress.
+    """
+    if not files and archive is None:
+        raise HTTPException(
+            status_code=400, detail="You must provide files or an archive."
+        )
+    if await executors.run_io(batch_jobs.running) >= settings.BATCH_MAX_JOBS:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many batch uploads in progress; try again later.",
+            headers={"Retry-After": str(math.ceil(settings.ADMISSION_RETRY_AFTER))},
+        )
+    try:
+        job = await executors.run_io(
+            batch_jobs.create,
+            [(f.filename, f.content_type, f.file) for f in files or []],
+            archive.file if archive else None,
+            manifest,
+            {
+                "category_id": category_id,
+                "release_rights": release_rights,
+                "language": language,
+            },
         )
-        record_id = final_result.get("id")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except RuntimeError as e:
+        # Another worker took the last slot since the check above.
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(settings.ADMISSION_RETRY_AFTER))},
+        ) from e
+    job.task = asyncio.create_task(run_batch(job))
+    return job.report()
 
-        # OCR, AI Cleanup, and Saving
-        if file.content_type == "application/pdf":
-            pdf_document = fitz.open(stream=io.BytesIO(file_content), filetype="pdf")
-            all_text_parts = []
-            for page in pdf_document:
-                pix = page.get_pixmap()
-                img_bytes = pix.tobytes("png")
-                ocr_result = reader.readtext(img_bytes, detail=0, paragraph=True)
-                all_text_parts.extend(ocr_result)
-            final_text = "\n".join(all_text_parts)
-        else:
-            image = Image.open(io.BytesIO(file_content))
-            ocr_result = reader.readtext(np.array(image), detail=0, paragraph=True)
-            final_text = "\n".join(ocr_result)
-    elif text_content:
-        final_text = text_content
-        final_result = await finalize_record(
+
+@app.get("/upload/batch/{batch_id}", tags=["Files"])
+async def read_batch_upload(batch_id: str):
+    try:
+        return await executors.run_io(batch_jobs.get, batch_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Batch not found.") from e
+
+
+# --- Chunked Upload Endpoints ---
+@app.post("/upload/chunked/", response_model=ChunkedUploadStatus, tags=["Files"])
+async def start_chunked_upload(
+    filename: Annotated[str, Form()],
+    content_type: Annotated[str, Form()],
+    total_size: Annotated[int, Form()],
+    total_chunks: Annotated[int, Form()],
+):
+    try:
+        return await executors.run_io(
+            chunked_uploads.create, filename, content_type, total_size, total_chunks
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@app.get(
+    "/upload/chunked/{upload_id}", response_model=ChunkedUploadStatus, tags=["Files"]
+)
+async def read_chunked_upload(upload_id: str):
+    try:
+        return await executors.run_io(chunked_uploads.status, upload_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Upload not found.") from e
+
+
+@app.put(
+    "/upload/chunked/{upload_id}/{chunk_index}",
+    response_model=ChunkedUploadStatus,
+    tags=["Files"],
+)
+async def put_upload_chunk(
+    upload_id: str, chunk_index: int, chunk: Annotated[UploadFile, File()]
+):
+    try:
+        return await executors.run_io(
+            chunked_uploads.write_chunk, upload_id, chunk_index, chunk.file
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Upload not found.") from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@app.post(
+    "/upload/chunked/{upload_id}/complete",
+    tags=["Files"],
+    dependencies=[Depends(admit("upload"))],
+)
+async def complete_chunked_upload(
+    upload_id: str,
+    title: Annotated[str, Form()] = None,
+    category_id: Annotated[str, Form()] = None,
+    release_rights: Annotated[str, Form()] = None,
+    language: Annotated[str, Form()] = None,
+):
+    try:
+        manifest, path = await executors.run_io(chunked_uploads.assemble, upload_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Upload not found.") from e
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+
+    with open(path, "rb") as file_obj:
+        final_result = manifest.get("record")
+        if final_result is None:
+            final_result = await register_record(
+                title,
+                category_id,
+                release_rights,
+                language,
+                manifest["filename"],
+                manifest["content_type"],
+                file_obj,
+            )
+            # A retried /complete reuses the record instead of registering the
+            # file with the corpus API again.
+            await executors.run_io(
+                chunked_uploads.save_record, upload_id, final_result
+            )
+        result = await process_upload(
             title=title,
             category_id=category_id,
-            user_id=user_id,
-            upload_uuid=upload_uuid,
-            filename="text_input.txt",
-            content_type="text/plain",
             release_rights=release_rights,
             language=language,
+            file_obj=file_obj,
+            filename=manifest["filename"],
+            content_type=manifest["content_type"],
+            final_result=final_result,
         )
-        record_id = final_result.get("id")
-        
-    if GEMINI_API_KEY and final_text:
-        model = genai.GenerativeModel("gemini-1.5-flash-latest")
-        prompt = f"Correct the following OCR text... Return only the corrected text.\n\nRAW TEXT:\n---\n{final_text}"
-        response = model.generate_content(prompt)
-        cleaned_text = response.text
+    await executors.run_io(chunked_uploads.discard, upload_id)
+    return result
 
-        if record_id and cleaned_text:
-            metadata = {
-                "record_id": record_id,
-                "title": title,
-                "filename": file.filename if file else "text_input.txt",
-            }
-            add_text_to_store(cleaned_text, metadata)
-
-            # Save to Supabase
-            conn = get_db_connection()
-            if conn:
-                try:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "INSERT INTO blogs (record_id, title, content) VALUES (%s, %s, %s) ON CONFLICT (record_id) DO NOTHING",
-                        (record_id, title, cleaned_text),
-                    )
-                    conn.commit()
-                finally:
-                    cursor.close()
-                    conn.close()
-    return final_result
+
+# --- ADMIN ENDPOINTS ---
+def _run_reindex(incremental: bool, shard: Optional[int]):
+    try:
+        reindex(incremental=incremental, shard=shard)
+    except Exception as e:
+        print(f"Reindex failed: {e}")
+
+
+@app.post(
+    "/admin/reindex",
+    response_model=ReindexResponse,
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def start_reindex(
+    background_tasks: BackgroundTasks,
+    incremental: bool = False,
+    shard: Optional[int] = None,
+):
+    if (await executors.run_io(get_reindex_status))["running"]:
+        raise HTTPException(status_code=409, detail="A reindex is already running.")
+    if shard is not None and (incremental or not 0 <= shard < NUM_SHARDS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"shard must be between 0 and {NUM_SHARDS - 1} and not incremental.",
+        )
+    background_tasks.add_task(_run_reindex, incremental, shard)
+    return {
+        "status": "accepted",
+        "message": "Reindex started; the new index is swapped in when it completes.",
+        "incremental": incremental,
+        "shard": shard,
+    }
+
+
+@app.get("/admin/reindex", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def read_reindex_status():
+    return await executors.run_io(get_reindex_status)
+
+
+@app.get("/admin/dedup", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def read_dedup_report():
+    # Takes live_lock and may load the duplicate index; keep it off the loop.
+    return await executors.run_io(get_dedup_report)
+
+
+@app.put(
+    "/admin/records/{record_id}",
+    response_model=RecordChangeResponse,
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def put_record(
+    record_id: str, request: RecordUpsertRequest, background_tasks: BackgroundTasks
+):
+    """Replaces a record's text in `blogs` and its chunks in the vector store."""
+    try:
+        old_row = await executors.run_io(get_blog, record_id)
+        row = await executors.run_io(
+            upsert_blog,
+            record_id,
+            request.title,
+            request.content,
+            request.language,
+            request.category_id,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    try:
+        result = await executors.run_io(upsert_record, record_id, request.content, row)
+    except Exception as e:
+        # The row is saved first so a reindex never misses it; put the old
+        # one back so `blogs` and the vector store keep agreeing.
+        await executors.run_io(restore_blog, record_id, old_row)
+        raise HTTPException(
+            status_code=502, detail=f"Updating the vector store failed: {e}"
+        ) from e
+    background_tasks.add_task(compact_vector_store)
+    return result
+
+
+@app.delete(
+    "/admin/records/{record_id}",
+    response_model=RecordChangeResponse,
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def remove_record(record_id: str, background_tasks: BackgroundTasks):
+    """Deletes a record from `blogs` and tombstones its chunks."""
+    try:
+        old_row = await executors.run_io(get_blog, record_id)
+        deleted = await executors.run_io(delete_blog, record_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    try:
+        result = await executors.run_io(delete_record, record_id)
+    except Exception as e:
+        # As in `put_record`: put the row back so `blogs` and the vector
+        # store keep agreeing.
+        await executors.run_io(restore_blog, record_id, old_row)
+        raise HTTPException(
+            status_code=502, detail=f"Updating the vector store failed: {e}"
+        ) from e
+    if not deleted and not any(
+        result[key] for key in ("removed", "reassigned", "unlinked")
+    ):
+        raise HTTPException(status_code=404, detail="Record not found.")
+    background_tasks.add_task(compact_vector_store)
+    return result
+
+
+@app.post("/admin/compact", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def compact_store():
+    """Drops every tombstoned vector now rather than at the compaction threshold."""
+    return await executors.run_io(compact_vector_store, True)
+
+
+def _run_export(formats: list, incremental: bool):
+    try:
+        export_corpus(formats, incremental=incremental)
+    except Exception as e:
+        print(f"Export failed: {e}")
+
+
+@app.post(
+    "/admin/export",
+    response_model=ExportResponse,
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def start_export(
+    background_tasks: BackgroundTasks,
+    incremental: bool = False,
+    format: Optional[str] = None,
+):
+    if (await executors.run_io(get_export_status))["running"]:
+        raise HTTPException(status_code=409, detail="An export is already running.")
+    formats = list(EXPORT_FORMATS) if format in (None, "both") else [format]
+    if not set(formats) <= set(EXPORT_FORMATS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of {', '.join(EXPORT_FORMATS)} or both.",
+        )
+    background_tasks.add_task(_run_export, formats, incremental)
+    return {
+        "status": "accepted",
+        "message": (
+            "Export started; GET /admin/export lists the shards when it completes."
+        ),
+        "formats": formats,
+        "incremental": incremental,
+    }
+
+
+@app.get("/admin/export", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def read_export_status():
+    return await executors.run_io(get_export_status)
+
+
+@app.get(
+    "/admin/export/{export_id}/{filename}",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+async def download_export_file(export_id: str, filename: str):
+    try:
+        path = export_path(export_id, filename)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail="Export file not found.") from e
+    return FileResponse(path, filename=filename)
+
+
+@app.get("/admin/load", tags=["Admin"], dependencies=[Depends(require_admin)])
+async def read_admission_stats():
+    return {name: limiter.stats() for name, limiter in limiters.items()}
 
 
 # --- Other Endpoints ---
@@ -0,0 +1,82 @@
+import asyncio
+import math
+from typing import Optional
+
+from fastapi import HTTPException
+
+from ..core.settings import settings
+
+
+class AdmissionLimiter:
+    """
+    Caps how many requests of one endpoint class run at once.
+
+    Up to `max_queue` further requests wait for a slot. Once the queue is full
+    new requests get 429, and a request that waits longer than
+    `queue_timeout` seconds gets 503; both carry a Retry-After header.
+    """
+
+    def __init__(
+        self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # Created on first use so it binds to the server's event loop.
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def _reject(self, status_code: int, detail: str):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(math.ceil(settings.ADMISSION_RETRY_AFTER))},
+        )
+
+    async def __aenter__(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self.active >= self.max_concurrency and self.waiting >= self.max_queue:
+            self._reject(429, f"Too many {self.name} requests; try again later.")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject(503, f"The {self.name} service is busy; try again later.")
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+limiters = {
+    "chat": AdmissionLimiter(
+        "chat",
+        settings.CHAT_MAX_CONCURRENCY,
+        settings.CHAT_MAX_QUEUE,
+        settings.ADMISSION_QUEUE_TIMEOUT,
+    ),
+    "upload": AdmissionLimiter(
+        "upload",
+        settings.UPLOAD_MAX_CONCURRENCY,
+        settings.UPLOAD_MAX_QUEUE,
+        settings.ADMISSION_QUEUE_TIMEOUT,
+    ),
+}
@@ -0,0 +1,608 @@
+import asyncio
+import json
+import os
+import shutil
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from ..core.settings import settings
+from . import executors, ocr
+from .cleanup import clean_texts
+from .corpus_api import finalize_record, get_current_user_id, upload_chunk
+from .database import insert_blogs
+from .run_lock import RunLock
+from .vector_store import add_texts_to_store
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+COPY_BUFFER_SIZE = 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+MAX_MANIFEST_BYTES = 1024 * 1024
+# A running batch rewrites its report for the other workers at most this
+# often, in seconds.
+REPORT_INTERVAL = 1.0
+METADATA_FIELDS = ("title", "category_id", "release_rights", "language")
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+    ".txt": "text/plain",
+}
+
+
+@dataclass
+class BatchItem:
+    filename: str
+    path: Path
+    content_type: Optional[str]
+    size: int
+    metadata: dict
+    status: str = "queued"
+    record_id: Optional[str] = None
+    error: Optional[str] = None
+    chunks: int = 0
+    batch_size: int = 0
+    timings: dict = field(default_factory=dict)
+    text: str = field(default="", repr=False)
+
+    def report(self) -> dict:
+        return {
+            "filename": self.filename,
+            "title": self.metadata.get("title"),
+            "size": self.size,
+            "status": self.status,
+            "record_id": self.record_id,
+            "error": self.error,
+            "chunks": self.chunks,
+            "cleanup_batch_size": self.batch_size,
+            "timings_ms": {k: round(v * 1000) for k, v in self.timings.items()},
+        }
+
+
+@dataclass
+class BatchJob:
+    id: str
+    directory: Path
+    items: list
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    stage_seconds: dict = field(default_factory=dict)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    # Held while the batch runs; see BatchJobs.
+    lock: Optional[RunLock] = field(default=None, repr=False)
+    report_path: Optional[Path] = None
+    saved: float = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.finished is None
+
+    def report(self) -> dict:
+        """Per-file status plus aggregate throughput so far."""
+        elapsed = (self.finished or time.monotonic()) - self.started
+        finished = [
+            i for i in self.items if i.status in ("done", "uploaded", "failed")
+        ]
+        processed_bytes = sum(i.size for i in finished if i.status != "failed")
+        counts = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return {
+            "batch_id": self.id,
+            "status": "running" if self.running else "completed",
+            "files": len(self.items),
+            "counts": counts,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_minute": round(len(finished) / elapsed * 60, 2)
+            if elapsed
+            else 0.0,
+            "megabytes_per_second": round(processed_bytes / elapsed / 1024 / 1024, 3)
+            if elapsed
+            else 0.0,
+            # Busy time per stage; a sum above elapsed_seconds is pipeline overlap.
+            "stage_seconds": {k: round(v, 2) for k, v in self.stage_seconds.items()},
+            "items": [item.report() for item in self.items],
+        }
+
+    def save(self, force: bool = False):
+        """Writes the report for the other workers, at most every REPORT_INTERVAL."""
+        now = time.monotonic()
+        if self.report_path is None:
+            return
+        if not force and now - self.saved < REPORT_INTERVAL:
+            return
+        self.saved = now
+        tmp_path = self.report_path.with_name(f".{self.report_path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f)
+        os.replace(tmp_path, self.report_path)
+
+
+# --- Intake ---
+def _copy_limited(source: BinaryIO, target: Path, remaining: int) -> int:
+    written = 0
+    with open(target, "wb") as f:
+        while block := source.read(COPY_BUFFER_SIZE):
+            written += len(block)
+            if written > remaining:
+                raise ValueError(
+                    f"The batch may not exceed {settings.UPLOAD_MAX_BYTES} bytes."
+                )
+            f.write(block)
+    return written
+
+
+def _parse_manifest(data) -> tuple[dict, dict]:
+    """
+    Accepts a list of {"filename": ..., <metadata>} entries, or an object with
+    such a "files" list and "defaults" applied to every file.
+    """
+    if isinstance(data, dict):
+        defaults, entries = data.get("defaults") or {}, data.get("files") or []
+    else:
+        defaults, entries = {}, data
+    if not isinstance(defaults, dict) or not isinstance(entries, list):
+        raise ValueError("Invalid manifest.")
+    per_file = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("filename"):
+            raise ValueError("Every manifest entry needs a filename.")
+        per_file[entry["filename"]] = {
+            k: entry[k] for k in METADATA_FIELDS if entry.get(k) is not None
+        }
+    defaults = {k: defaults[k] for k in METADATA_FIELDS if defaults.get(k) is not None}
+    return defaults, per_file
+
+
+def _archive_members(path: Path):
+    """Yields (name, stream) for each regular file in a ZIP or TAR archive."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as stream:
+                        yield info.filename, stream
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, "r:*") as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, archive.extractfile(member)
+    else:
+        raise ValueError("The archive must be a ZIP or TAR file.")
+
+
+class _Staging:
+    """Copies a batch's files into its directory, within the batch limits."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.remaining = settings.UPLOAD_MAX_BYTES
+        self.files = []
+        self.manifest = None
+
+    def add(self, name: str, content_type: Optional[str], stream: BinaryIO):
+        if len(self.files) >= settings.BATCH_MAX_FILES:
+            raise ValueError(
+                f"A batch may hold at most {settings.BATCH_MAX_FILES} files."
+            )
+        path = self.directory / f"{len(self.files):05d}"
+        size = _copy_limited(stream, path, self.remaining)
+        self.remaining -= size
+        self.files.append((name, content_type, path, size))
+
+    def add_archive(self, archive: BinaryIO):
+        archive_path = self.directory / "archive"
+        self.remaining -= _copy_limited(archive, archive_path, self.remaining)
+        for name, stream in _archive_members(archive_path):
+            base = os.path.basename(name)
+            if not base or base.startswith(".") or "__MACOSX" in name:
+                continue
+            if base == MANIFEST_NAME:
+                raw = stream.read(MAX_MANIFEST_BYTES + 1)
+                if len(raw) > MAX_MANIFEST_BYTES:
+                    raise ValueError("The archive manifest is too large.")
+                self.manifest = raw
+                continue
+            self.add(name, None, stream)
+        archive_path.unlink()
+
+
+def _batch_metadata(defaults: Optional[dict], manifests: list) -> tuple[dict, dict]:
+    """Merges the form defaults and the manifests, later ones taking precedence."""
+    base_metadata = {k: v for k, v in (defaults or {}).items() if v is not None}
+    per_file = {}
+    for raw in manifests:
+        if raw:
+            try:
+                data = json.loads(raw)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid manifest: {e}") from e
+            manifest_defaults, entries = _parse_manifest(data)
+            base_metadata.update(manifest_defaults)
+            per_file.update(entries)
+    return base_metadata, per_file
+
+
+def _batch_item(
+    name: str,
+    content_type: Optional[str],
+    path: Path,
+    size: int,
+    metadata: dict,
+) -> BatchItem:
+    filename = os.path.basename(name)
+    metadata.setdefault("title", Path(filename).stem)
+    item = BatchItem(
+        filename=filename,
+        path=path,
+        content_type=CONTENT_TYPES.get(Path(filename).suffix.lower()) or content_type,
+        size=size,
+        metadata=metadata,
+    )
+    if item.content_type not in CONTENT_TYPES.values():
+        item.status, item.error = "skipped", "Unsupported file type."
+    elif not metadata.get("category_id") or not metadata.get("release_rights"):
+        item.status = "failed"
+        item.error = "category_id and release_rights are required."
+    return item
+
+
+class BatchJobs:
+    """
+    Stages batch uploads on disk and keeps their reports under `batches/`
+    until UPLOAD_TTL seconds after they finish, so any worker can answer for
+    a batch. A running batch holds a file lock there, which is how the
+    workers count running batches and how a crashed worker's batches show
+    as interrupted.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.reports_dir = self.root / "batches"
+        # Batches run by this process.
+        self._jobs: dict[str, BatchJob] = {}
+        # Taken around counting and claiming a slot: the thread lock within
+        # this process, the file lock across workers.
+        self._guard = threading.Lock()
+        self._slots = RunLock(self.reports_dir / ".slots.lock")
+
+    def _paths(self, batch_id: str) -> tuple[Path, Path]:
+        return (
+            self.reports_dir / f"{batch_id}.json",
+            self.reports_dir / f"{batch_id}.lock",
+        )
+
+    def running(self) -> int:
+        """Counts the batches running in every worker."""
+        if not self.reports_dir.is_dir():
+            return 0
+        return sum(
+            1
+            for path in self.reports_dir.glob("*.lock")
+            if not path.name.startswith(".") and RunLock(path).locked()
+        )
+
+    def get(self, batch_id: str) -> dict:
+        """Returns a batch's report, from whichever worker runs it."""
+        if batch_id in self._jobs:
+            return self._jobs[batch_id].report()
+        try:
+            uuid.UUID(batch_id)
+        except ValueError as e:
+            raise KeyError(batch_id) from e
+        report_path, lock_path = self._paths(batch_id)
+        try:
+            with open(report_path, encoding="utf-8") as f:
+                report = json.load(f)
+        except FileNotFoundError as e:
+            raise KeyError(batch_id) from e
+        if report["status"] == "running" and not RunLock(lock_path).locked():
+            # The worker running it exited before the batch finished.
+            report["status"] = "interrupted"
+        return report
+
+    def _prune(self):
+        if not self.reports_dir.is_dir():
+            return
+        cutoff = time.time() - settings.UPLOAD_TTL
+        for report_path in self.reports_dir.glob("*.json"):
+            lock_path = report_path.with_suffix(".lock")
+            try:
+                if report_path.stat().st_mtime >= cutoff or RunLock(lock_path).locked():
+                    continue
+                report_path.unlink()
+                lock_path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                continue
+
+    def _claim(self, batch_id: str) -> RunLock:
+        """Takes a running slot for a new batch, or raises RuntimeError."""
+        lock = RunLock(self._paths(batch_id)[1])
+        with self._guard:
+            self._slots.acquire(blocking=True)
+            try:
+                if self.running() >= settings.BATCH_MAX_JOBS:
+                    raise RuntimeError(
+                        "Too many batch uploads in progress; try again later."
+                    )
+                lock.acquire()
+            finally:
+                self._slots.release()
+        return lock
+
+    def create(
+        self,
+        files: list[tuple[str, Optional[str], BinaryIO]],
+        archive: Optional[BinaryIO] = None,
+        manifest: Optional[str] = None,
+        defaults: Optional[dict] = None,
+    ) -> BatchJob:
+        """
+        Copies uploaded (filename, content_type, stream) files and the members
+        of an optional archive to disk and attaches their metadata. Raises
+        ValueError for an invalid batch, and RuntimeError when BATCH_MAX_JOBS
+        batches are already running.
+        """
+        self._prune()
+        batch_id = str(uuid.uuid4())
+        lock = self._claim(batch_id)
+        directory = self.root / f"batch-{batch_id}"
+        try:
+            directory.mkdir(parents=True)
+            job = self._create(batch_id, directory, files, archive, manifest, defaults)
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            lock.release()
+            lock.path.unlink(missing_ok=True)
+            raise
+        job.lock, job.report_path = lock, self._paths(batch_id)[0]
+        self._jobs[batch_id] = job
+        job.save(force=True)
+        return job
+
+    def _create(self, batch_id, directory, files, archive, manifest, defaults):
+        staging = _Staging(directory)
+        for name, content_type, stream in files:
+            staging.add(name, content_type, stream)
+        if archive is not None:
+            staging.add_archive(archive)
+        if not staging.files:
+            raise ValueError("The batch contains no files.")
+
+        base_metadata, per_file = _batch_metadata(
+            defaults, [staging.manifest, manifest]
+        )
+        items = []
+        for name, content_type, path, size in staging.files:
+            entry = per_file.get(name, per_file.get(os.path.basename(name), {}))
+            items.append(
+                _batch_item(
+                    name, content_type, path, size, {**base_metadata, **entry}
+                )
+            )
+        return BatchJob(id=batch_id, directory=directory, items=items)
+
+    def finish(self, job: BatchJob):
+        """Saves a finished batch's final report and frees its slot."""
+        job.save(force=True)
+        if job.lock is not None:
+            job.lock.release()
+        self._jobs.pop(job.id, None)
+
+
+batch_jobs = BatchJobs(settings.UPLOAD_TMP_DIR)
+
+
+# --- Pipeline ---
+@contextmanager
+def _stage(job: BatchJob, items: list, name: str):
+    """Times a stage for its items and adds it to the job's busy time."""
+    for item in items:
+        item.status = name
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        job.stage_seconds[name] = job.stage_seconds.get(name, 0.0) + elapsed
+        for item in items:
+            item.timings[name] = elapsed
+        job.save()
+
+
+def _fail(item: BatchItem, stage: str, error: Exception):
+    item.status = "failed"
+    item.error = f"{stage}: {error}"
+    item.text = ""
+
+
+async def _register(item: BatchItem, user_id: str):
+    upload_uuid = str(uuid.uuid4())
+    with open(item.path, "rb") as file_obj:
+        await upload_chunk(
+            file_obj=file_obj,
+            upload_uuid=upload_uuid,
+            filename=item.filename,
+            content_type=item.content_type,
+        )
+    result = await finalize_record(
+        title=item.metadata["title"],
+        category_id=item.metadata["category_id"],
+        user_id=user_id,
+        upload_uuid=upload_uuid,
+        filename=item.filename,
+        content_type=item.content_type,
+        release_rights=item.metadata["release_rights"],
+        language=item.metadata.get("language"),
+    )
+    item.record_id = result.get("id")
+
+
+async def _extract(item: BatchItem) -> str:
+    if item.content_type == "text/plain":
+        return await executors.run_io(
+            item.path.read_text, encoding="utf-8", errors="replace"
+        )
+    return await executors.run_cpu(ocr.extract_text, str(item.path), item.content_type)
+
+
+def _save(indexed: list[tuple]) -> list[dict]:
+    """
+    Saves cleaned texts to `blogs`, then embeds and stores them in one pass.
+    Rows go first, so a reindex that misses the vectors still finds them.
+    """
+    insert_blogs(
+        [
+            (
+                item.record_id,
+                item.metadata["title"],
+                text,
+                item.metadata.get("language"),
+                item.metadata["category_id"],
+            )
+            for item, text in indexed
+        ]
+    )
+    return add_texts_to_store(
+        [
+            (
+                text,
+                {
+                    "record_id": item.record_id,
+                    "title": item.metadata["title"],
+                    "filename": item.filename,
+                    "language": item.metadata.get("language"),
+                    "category_id": item.metadata["category_id"],
+                },
+            )
+            for item, text in indexed
+        ]
+    )
+
+
+async def _index(job: BatchJob, batch: list):
+    """Cleans and indexes a batch of files with shared Gemini and embedding calls."""
+    ready = [item for item in batch if item.record_id and item.text]
+    for item in batch:
+        if item not in ready or not GEMINI_API_KEY:
+            # Registered with the corpus, but there is nothing to index.
+            item.status = "uploaded"
+            item.text = ""
+    if not GEMINI_API_KEY or not ready:
+        return
+    try:
+        with _stage(job, ready, "cleanup"):
+            cleaned = await executors.run_io(clean_texts, [item.text for item in ready])
+        indexed = [(item, text) for item, text in zip(ready, cleaned) if text]
+        results = []
+        if indexed:
+            with _stage(job, [item for item, _ in indexed], "index"):
+                results = await executors.run_io(_save, indexed)
+    except Exception as e:
+        for item in ready:
+            _fail(item, "index", e)
+        return
+    for item in ready:
+        item.status, item.text, item.batch_size = "uploaded", "", len(ready)
+    for (item, _), result in zip(indexed, results):
+        item.status = "done"
+        item.chunks = result["added"] + result["linked"]
+
+
+async def _register_all(job: BatchJob, user_id: str, ocr_queue, workers: int):
+    try:
+        for item in job.items:
+            if item.status != "queued":
+                continue
+            try:
+                with _stage(job, [item], "register"):
+                    await _register(item, user_id)
+            except Exception as e:
+                _fail(item, "register", e)
+                continue
+            await ocr_queue.put(item)
+    finally:
+        for _ in range(workers):
+            await ocr_queue.put(None)
+
+
+async def _extract_all(job: BatchJob, ocr_queue, index_queue):
+    try:
+        while (item := await ocr_queue.get()) is not None:
+            try:
+                with _stage(job, [item], "ocr"):
+                    item.text = await _extract(item)
+            except Exception as e:
+                _fail(item, "ocr", e)
+                continue
+            await index_queue.put(item)
+    finally:
+        await index_queue.put(None)
+
+
+async def _index_all(job: BatchJob, index_queue, workers: int):
+    remaining = workers
+    while remaining:
+        batch = []
+        item = await index_queue.get()
+        while True:
+            if item is None:
+                remaining -= 1
+            else:
+                batch.append(item)
+            if (
+                not remaining
+                or len(batch) >= settings.BATCH_INDEX_SIZE
+                or index_queue.empty()
+            ):
+                break
+            item = index_queue.get_nowait()
+        if batch:
+            await _index(job, batch)
+
+
+async def _pipeline(job: BatchJob):
+    """
+    Runs the three stages concurrently over bounded queues: corpus
+    registration of file N+1 overlaps OCR of file N, which overlaps cleanup
+    and indexing of earlier files. The last stage takes whatever files are
+    waiting (up to BATCH_INDEX_SIZE) as one batch.
+    """
+    user_id = await get_current_user_id()
+    workers = max(1, settings.OCR_WORKERS)
+    ocr_queue = asyncio.Queue(maxsize=settings.BATCH_PIPELINE_DEPTH)
+    index_queue = asyncio.Queue(maxsize=settings.BATCH_PIPELINE_DEPTH)
+    await asyncio.gather(
+        _register_all(job, user_id, ocr_queue, workers),
+        *(_extract_all(job, ocr_queue, index_queue) for _ in range(workers)),
+        _index_all(job, index_queue, workers),
+    )
+
+
+async def run_batch(job: BatchJob):
+    """Processes a staged batch, then removes its files from disk."""
+    try:
+        await _pipeline(job)
+    except Exception as e:
+        print(f"Batch {job.id} failed: {e}")
+        for item in job.items:
+            if item.status not in ("done", "uploaded", "failed", "skipped"):
+                _fail(item, "batch", e)
+    finally:
+        job.finished = time.monotonic()
+        await executors.run_io(shutil.rmtree, job.directory, True)
+        await executors.run_io(batch_jobs.finish, job)
+        done = sum(1 for item in job.items if item.status == "done")
+        print(f"Batch {job.id}: {done}/{len(job.items)} files indexed.")
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from ..core.settings import settings
+from .text_utils import estimate_tokens
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+SUMMARY_PROMPT = """
+Update the running summary of a conversation about Telugu literature.
+Keep names, works, dates and any facts the user asked about. Be concise and
+write in the language the conversation uses.
+Current summary: {summary}
+New turns:
+{turns}
+Updated summary:
+"""
+
+
+@dataclass
+class ChatSession:
+    id: str
+    summary: str = ""
+    turns: list = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    summarizing: bool = False
+
+    def history_text(self, start: int = 0) -> str:
+        """
+        Renders the summary and the turns from `start` on for inclusion in a
+        prompt.
+        """
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation: {self.summary}")
+        for question, answer in self.turns[start:]:
+            parts.append(f"User: {question}\nAssistant: {answer}")
+        return "\n".join(parts)
+
+
+class SessionStore:
+    """
+    Keeps chat sessions in memory, evicting the least recently used once
+    `max_sessions` is reached and any that sit idle longer than `ttl` seconds.
+    Sessions live in the process that created them, so with several uvicorn
+    workers a client must be routed back to the same worker (sticky sessions)
+    to keep its history.
+    """
+
+    def __init__(self, max_sessions: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        self._expire()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            session = ChatSession(id=session_id or str(uuid.uuid4()))
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session.id)
+        session.last_used = time.monotonic()
+        return session
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+sessions = SessionStore(settings.CHAT_MAX_SESSIONS, settings.CHAT_SESSION_TTL)
+# Summaries in flight, referenced so they aren't garbage collected mid-run.
+_summary_tasks: set = set()
+
+
+async def _summarize(summary: str, turns: list) -> str:
+    model = ChatGoogleGenerativeAI(
+        model="gemini-1.5-flash-latest",
+        temperature=0.1,
+        google_api_key=GEMINI_API_KEY,
+    )
+    rendered = "\n".join(f"User: {q}\nAssistant: {a}" for q, a in turns)
+    response = await model.ainvoke(
+        SUMMARY_PROMPT.format(summary=summary or "(none)", turns=rendered)
+    )
+    return response.content.strip()
+
+
+def record_turn(session: ChatSession, question: str, answer: str) -> bool:
+    """
+    Appends a turn and returns whether the history now exceeds
+    CHAT_HISTORY_TOKEN_BUDGET, in which case `summarize_history` should run.
+    """
+    session.turns.append((question, answer))
+    return estimate_tokens(session.history_text()) > settings.CHAT_HISTORY_TOKEN_BUDGET
+
+
+async def summarize_history(session: ChatSession):
+    """
+    Rolls the oldest turns into the running summary until the history fits in
+    CHAT_HISTORY_TOKEN_BUDGET. The latest turn is always kept verbatim.
+
+    Meant to run after the response is sent (see `schedule_summary`): the
+    Gemini call is made without holding the session lock, and the rolled
+    turns stay in the history until their summary replaces them.
+    """
+    if session.summarizing:
+        return
+    budget = settings.CHAT_HISTORY_TOKEN_BUDGET
+    async with session.lock:
+        count = 0
+        while (
+            count < len(session.turns) - 1
+            and estimate_tokens(session.history_text(count)) > budget
+        ):
+            count += 1
+        if not count:
+            return
+        summary, rolled = session.summary, session.turns[:count]
+        session.summarizing = True
+    try:
+        summary = await _summarize(summary, rolled)
+    except Exception as e:
+        # Losing detail beats growing the prompt without bound.
+        print(f"Chat summary failed for session {session.id}: {e}")
+    async with session.lock:
+        session.summarizing = False
+        # Only this task removes turns, so the rolled ones are still first.
+        del session.turns[:count]
+        session.summary = summary
+        # A long summary could itself exceed the budget; trim it from the front.
+        while session.summary and estimate_tokens(session.history_text()) > budget:
+            session.summary = session.summary[max(1, len(session.summary) // 4):]
+
+
+def schedule_summary(session: ChatSession) -> asyncio.Task:
+    """
+    Runs `summarize_history` as a task of its own. Unlike a FastAPI
+    background task, it doesn't keep the request's admission slot.
+    """
+    task = asyncio.create_task(summarize_history(session))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+    return task
@@ -0,0 +1,215 @@
+"""
+Telugu-aware text chunking for the vector store.
+
+Usage:
+    python -m backend.services.chunker compare FILE [--queries QUERIES.jsonl]
+
+`compare` splits FILE with both this chunker and the previous
+RecursiveCharacterTextSplitter(1000, 100) and prints chunk statistics. With
+--queries (JSON lines of {"query": ..., "expected": ...}), it also embeds both
+chunk sets and reports how often a top-3 result contains the expected text.
+"""
+
+import argparse
+import json
+import re
+import statistics
+import unicodedata
+from typing import Optional
+
+from ..core.settings import settings
+from .text_utils import estimate_tokens
+
+ZWJ = "\u200d"
+ZWNJ = "\u200c"
+VIRAMA_COMBINING_CLASS = 9
+
+# Boundaries tried in order, from the strongest break to the weakest. Blank
+# lines separate stanzas (padyams) and paragraphs, single newlines separate
+# verse lines, then sentences (including the danda marks used in poetry),
+# clauses and words. Each separator stays attached to the text before it.
+SEPARATORS = [
+    re.compile(r"(\n[ \t]*\n\s*)"),
+    re.compile(r"(\n)"),
+    re.compile(r"([.!?।॥]+[\"'”’)]*\s*)"),
+    re.compile(r"([,;:]\s*)"),
+    re.compile(r"(\s+)"),
+]
+
+
+def graphemes(text: str) -> list[str]:
+    """
+    Splits text into grapheme clusters, keeping consonant + virama + consonant
+    conjuncts and their vowel signs together so they are never cut apart.
+    """
+    clusters = []
+    for ch in text:
+        if clusters and _extends_cluster(clusters[-1], ch):
+            clusters[-1] += ch
+        else:
+            clusters.append(ch)
+    return clusters
+
+
+def _extends_cluster(cluster: str, ch: str) -> bool:
+    if unicodedata.category(ch) in ("Mn", "Mc", "Me") or ch in (ZWJ, ZWNJ):
+        return True
+    last = cluster[-1]
+    joins = unicodedata.combining(last) == VIRAMA_COMBINING_CLASS or last == ZWJ
+    return joins and unicodedata.category(ch) == "Lo"
+
+
+def _split_keep(text: str, pattern: re.Pattern) -> list[str]:
+    parts = pattern.split(text)
+    pieces = []
+    for i in range(0, len(parts), 2):
+        piece = parts[i] + (parts[i + 1] if i + 1 < len(parts) else "")
+        if piece:
+            pieces.append(piece)
+    return pieces
+
+
+def _units(text: str, budget: int, level: int = 0) -> list[str]:
+    """
+    Breaks text into pieces that each fit the budget, at the strongest
+    boundary possible.
+    """
+    if estimate_tokens(text) <= budget:
+        return [text]
+    if level >= len(SEPARATORS):
+        return graphemes(text)
+    units = []
+    for piece in _split_keep(text, SEPARATORS[level]):
+        units.extend(_units(piece, budget, level + 1))
+    return units
+
+
+def split_text(
+    text: str, budget: Optional[int] = None, overlap: Optional[int] = None
+) -> list[str]:
+    """
+    Splits text into chunks of at most `budget` estimated tokens.
+
+    Chunks break at stanza, line, sentence, clause and word boundaries in that
+    order of preference, and never inside a grapheme cluster. Each chunk after
+    the first repeats up to `overlap` tokens of whole units from the previous one.
+    """
+    budget = budget or settings.CHUNK_TOKEN_BUDGET
+    overlap = settings.CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+    overlap = min(overlap, budget // 2)
+
+    chunks = []
+    current, current_tokens = [], 0
+    for unit in _units(text, budget):
+        tokens = estimate_tokens(unit)
+        if current and current_tokens + tokens > budget:
+            chunks.append("".join(current))
+            current, current_tokens = _overlap_tail(current, overlap)
+            if current_tokens + tokens > budget:
+                current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(current))
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def split_sentences(text: str) -> list[str]:
+    """Splits text at line and sentence boundaries, keeping each separator."""
+    return [
+        sentence
+        for line in _split_keep(text, SEPARATORS[1])
+        for sentence in _split_keep(line, SEPARATORS[2])
+    ]
+
+
+def _overlap_tail(units: list[str], overlap: int) -> tuple[list[str], int]:
+    tail, tokens = [], 0
+    for unit in reversed(units):
+        unit_tokens = estimate_tokens(unit)
+        if tokens + unit_tokens > overlap:
+            break
+        tail.insert(0, unit)
+        tokens += unit_tokens
+    return tail, tokens
+
+
+# --- Comparison report ---
+def _broken_chunks(chunks: list[str]) -> int:
+    """Counts chunks that start with a combining mark, i.e. a split grapheme."""
+    return sum(
+        1
+        for chunk in chunks
+        if chunk and unicodedata.category(chunk[0]) in ("Mn", "Mc", "Me")
+    )
+
+
+def chunk_stats(chunks: list[str], budget: int) -> dict:
+    tokens = [estimate_tokens(chunk) for chunk in chunks] or [0]
+    return {
+        "chunks": len(chunks),
+        "mean_tokens": round(statistics.mean(tokens), 1),
+        "min_tokens": min(tokens),
+        "max_tokens": max(tokens),
+        "tiny_chunks": sum(1 for t in tokens if t < budget // 4),
+        "broken_graphemes": _broken_chunks(chunks),
+        "embedded_tokens": sum(tokens),
+    }
+
+
+def _hit_rate(chunks: list[str], queries: list[dict], k: int = 3) -> float:
+    from langchain_community.vectorstores.faiss import FAISS
+
+    from .vector_store import embeddings
+
+    store = FAISS.from_texts(chunks, embeddings)
+    hits = 0
+    for item in queries:
+        results = store.similarity_search(item["query"], k=k)
+        hits += any(item["expected"] in doc.page_content for doc in results)
+    return round(hits / len(queries), 3) if queries else 0.0
+
+
+def compare(text: str, queries: Optional[list[dict]] = None) -> dict:
+    """Compares this chunker with the previous character-based splitter."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    budget = settings.CHUNK_TOKEN_BUDGET
+    splitters = {
+        "recursive_character_1000_100": RecursiveCharacterTextSplitter(
+            chunk_size=1000, chunk_overlap=100
+        ).split_text,
+        "telugu_aware": split_text,
+    }
+    report = {}
+    for name, split in splitters.items():
+        chunks = split(text)
+        report[name] = chunk_stats(chunks, budget)
+        if queries:
+            report[name]["hit_rate_at_3"] = _hit_rate(chunks, queries)
+    return report
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare with the old splitter."
+    )
+    compare_parser.add_argument("file", help="UTF-8 text file to split.")
+    compare_parser.add_argument(
+        "--queries", help="JSON lines of {query, expected} for retrieval hit rate."
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.file, encoding="utf-8") as f:
+        text = f.read()
+    queries = None
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [json.loads(line) for line in f if line.strip()]
+    print(json.dumps(compare(text, queries), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
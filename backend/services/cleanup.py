@@ -0,0 +1,78 @@
+import re
+
+import google.generativeai as genai
+
+from ..core.settings import settings
+from .text_utils import estimate_tokens
+
+CLEANUP_MODEL = "gemini-1.5-flash-latest"
+CLEANUP_PROMPT = (
+    "Correct the following OCR text... Return only the corrected text."
+    "\n\nRAW TEXT:\n---\n{text}"
+)
+BATCH_CLEANUP_PROMPT = """Correct each of the following OCR texts.
+Keep them separate and in order.
+Start each corrected text with its marker line exactly as given (for example
+<<<DOC 1>>>) and return nothing but the markers and the corrected texts.
+
+{texts}"""
+_MARKER = re.compile(r"^<<<DOC (\d+)>>>[ \t]*$", re.MULTILINE)
+
+
+def clean_text(text: str) -> str:
+    """Asks Gemini to correct OCR errors in one text."""
+    model = genai.GenerativeModel(CLEANUP_MODEL)
+    response = model.generate_content(CLEANUP_PROMPT.format(text=text))
+    return response.text
+
+
+def _parse_batch(output: str, count: int) -> dict[int, str]:
+    parts = _MARKER.split(output)
+    # split() gives [preamble, number, text, number, text, ...]
+    cleaned = {}
+    for i in range(1, len(parts) - 1, 2):
+        number = int(parts[i])
+        if 1 <= number <= count and parts[i + 1].strip():
+            cleaned[number - 1] = parts[i + 1].strip()
+    return cleaned
+
+
+def _clean_group(texts: list[str]) -> list[str]:
+    if len(texts) == 1:
+        return [clean_text(texts[0])]
+    model = genai.GenerativeModel(CLEANUP_MODEL)
+    rendered = "\n".join(f"<<<DOC {i + 1}>>>\n{text}" for i, text in enumerate(texts))
+    try:
+        response = model.generate_content(BATCH_CLEANUP_PROMPT.format(texts=rendered))
+        cleaned = _parse_batch(response.text, len(texts))
+    except Exception as e:
+        # A blocked or failed shared call shouldn't fail every text in it;
+        # `response.text` raises when the response was blocked.
+        print(f"Batched cleanup of {len(texts)} texts failed ({e}); cleaning each.")
+        cleaned = {}
+    # Any text the model merged or dropped is cleaned on its own.
+    return [cleaned.get(i) or clean_text(text) for i, text in enumerate(texts)]
+
+
+def clean_texts(texts: list[str]) -> list[str]:
+    """
+    Corrects several OCR texts, packing texts into shared Gemini calls of up
+    to CLEANUP_BATCH_TOKENS estimated tokens; longer texts get a call each.
+    """
+    results = [""] * len(texts)
+    groups, group, group_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        tokens = estimate_tokens(text)
+        if group and group_tokens + tokens > settings.CLEANUP_BATCH_TOKENS:
+            groups.append(group)
+            group, group_tokens = [], 0
+        group.append(i)
+        group_tokens += tokens
+    if group:
+        groups.append(group)
+    for group in groups:
+        for i, cleaned in zip(group, _clean_group([texts[i] for i in group])):
+            results[i] = cleaned
+    return results
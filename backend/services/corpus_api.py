@@ -1,7 +1,7 @@
 import httpx
 from ..core.settings import settings
-from fastapi import HTTPException, UploadFile
-from typing import Optional
+from fastapi import HTTPException
+from typing import BinaryIO, Optional
 
 # --- API Endpoints ---
 BASE_URL = settings.CORPUS_API_BASE_URL
@@ -101,7 +101,9 @@ async def get_all_records() -> list:
             ) from e
 
 
-async def upload_chunk(file: UploadFile, upload_uuid: str, filename: str):
+async def upload_chunk(
+    file_obj: BinaryIO, upload_uuid: str, filename: str, content_type: str
+):
     async with httpx.AsyncClient(timeout=60.0) as client:
         try:
             data = {
@@ -110,7 +112,7 @@ async def upload_chunk(file: UploadFile, upload_uuid: str, filename: str):
                 "total_chunks": "1",
                 "filename": filename,
             }
-            files = {"chunk": (filename, file.file, file.content_type)}
+            files = {"chunk": (filename, file_obj, content_type)}
             headers = {"Authorization": f"Bearer {settings.CORPUS_API_TOKEN}"}
             response = await client.post(
                 CHUNK_UPLOAD_URL, data=data, files=files, headers=headers, timeout=60.0
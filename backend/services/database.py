@@ -0,0 +1,322 @@
+import uuid
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from ..core.settings import settings
+
+
+def get_db_connection():
+    """Establishes a connection to the PostgreSQL database."""
+    try:
+        conn = psycopg2.connect(settings.DATABASE_URL)
+        return conn
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return None
+
+
+def init_db():
+    """Initializes the blogs table in the Supabase database."""
+    conn = get_db_connection()
+    if conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blogs (
+                id SERIAL PRIMARY KEY,
+                record_id TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """
+        )
+        cursor.execute("ALTER TABLE blogs ADD COLUMN IF NOT EXISTS language TEXT")
+        cursor.execute("ALTER TABLE blogs ADD COLUMN IF NOT EXISTS category_id TEXT")
+        cursor.execute(
+            "ALTER TABLE blogs ADD COLUMN IF NOT EXISTS updated_at "
+            "TIMESTAMPTZ DEFAULT NOW()"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS blogs_updated_at_id ON blogs (updated_at, id)"
+        )
+        # One row per deleted record, so exports and reindex runs that read
+        # `blogs` by updated_at can learn about deletes too.
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blog_deletions (
+                id BIGSERIAL PRIMARY KEY,
+                record_id TEXT NOT NULL,
+                deleted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS blog_deletions_deleted_at_id "
+            "ON blog_deletions (deleted_at, id)"
+        )
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+
+def insert_blog(
+    record_id: str, title: str, content: str, language: str, category_id: str
+):
+    """Saves a processed contribution to `blogs`, keeping any existing row."""
+    insert_blogs([(record_id, title, content, language, category_id)])
+
+
+def insert_blogs(rows: list[tuple]):
+    """
+    Saves (record_id, title, content, language, category_id) rows to `blogs`
+    in one transaction, keeping any existing rows.
+    """
+    conn = get_db_connection()
+    if conn:
+        try:
+            cursor = conn.cursor()
+            execute_values(
+                cursor,
+                "INSERT INTO blogs (record_id, title, content, language, category_id) "
+                "VALUES %s ON CONFLICT (record_id) DO NOTHING",
+                rows,
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def upsert_blog(
+    record_id: str,
+    title: str,
+    content: str,
+    language: Optional[str] = None,
+    category_id: Optional[str] = None,
+) -> dict:
+    """
+    Inserts or replaces a `blogs` row; a language or category left as None
+    keeps the stored value. Returns the row's resulting metadata.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed.")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO blogs (record_id, title, content, language, category_id) "
+            "VALUES (%s, %s, %s, %s, %s) "
+            "ON CONFLICT (record_id) DO UPDATE SET title = EXCLUDED.title, "
+            "content = EXCLUDED.content, updated_at = NOW(), "
+            "language = COALESCE(EXCLUDED.language, blogs.language), "
+            "category_id = COALESCE(EXCLUDED.category_id, blogs.category_id) "
+            "RETURNING title, language, category_id",
+            (record_id, title, content, language, category_id),
+        )
+        row = cursor.fetchone()
+        conn.commit()
+        cursor.close()
+        return {"title": row[0], "language": row[1], "category_id": row[2]}
+    finally:
+        conn.close()
+
+
+def get_blog(record_id: str) -> Optional[dict]:
+    """Returns a `blogs` row's text and metadata, or None if there is none."""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed.")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT title, content, language, category_id FROM blogs "
+            "WHERE record_id = %s",
+            (record_id,),
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        if row is None:
+            return None
+        return dict(zip(("title", "content", "language", "category_id"), row))
+    finally:
+        conn.close()
+
+
+def restore_blog(record_id: str, row: Optional[dict]):
+    """
+    Puts back a `blogs` row as `get_blog` returned it, re-inserting it if it
+    was deleted, or deleting the row if there was none.
+    """
+    if row is None:
+        delete_blog(record_id)
+        return
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed.")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO blogs (record_id, title, content, language, category_id) "
+            "VALUES (%s, %s, %s, %s, %s) "
+            "ON CONFLICT (record_id) DO UPDATE SET title = EXCLUDED.title, "
+            "content = EXCLUDED.content, language = EXCLUDED.language, "
+            "category_id = EXCLUDED.category_id, updated_at = NOW()",
+            (
+                record_id,
+                row["title"],
+                row["content"],
+                row["language"],
+                row["category_id"],
+            ),
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def delete_blog(record_id: str) -> bool:
+    """
+    Deletes a `blogs` row, logging it in `blog_deletions`, and returns
+    whether it existed.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed.")
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM blogs WHERE record_id = %s", (record_id,))
+        deleted = cursor.rowcount > 0
+        if deleted:
+            cursor.execute(
+                "INSERT INTO blog_deletions (record_id) VALUES (%s)", (record_id,)
+            )
+        conn.commit()
+        cursor.close()
+        return deleted
+    finally:
+        conn.close()
+
+
+# Rows written in the last seconds before a run over `blogs` starts are left
+# for the next run, so a transaction that commits late, with an earlier
+# updated_at than rows already read, can't slip behind the run's watermark.
+SETTLE_SECONDS = 60
+
+BLOG_COLUMNS = [
+    "id",
+    "record_id",
+    "title",
+    "content",
+    "created_at",
+    "updated_at",
+    "language",
+    "category_id",
+]
+
+
+DELETION_COLUMNS = ["id", "record_id", "deleted_at"]
+
+
+def _stream_rows(
+    where: str,
+    params: tuple,
+    order_by: str,
+    fetch_size: Optional[int] = None,
+    table: str = "blogs",
+    columns: list = BLOG_COLUMNS,
+) -> Iterator[dict]:
+    """
+    Yields the rows of `table` (`blogs` by default) matching `where` as dicts.
+
+    Rows are read through a server-side (named) cursor, so only `fetch_size`
+    rows are held in memory at a time regardless of the table size.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed.")
+    try:
+        cursor = conn.cursor(name=f"stream_{table}_{uuid.uuid4().hex}")
+        cursor.itersize = fetch_size or settings.REINDEX_FETCH_SIZE
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM {table} "
+            f"WHERE {where} ORDER BY {order_by}",
+            params,
+        )
+        for row in cursor:
+            yield dict(zip(columns, row))
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def stream_blogs(after_id: int = 0, fetch_size: Optional[int] = None) -> Iterator[dict]:
+    """Yields `blogs` rows with an id greater than `after_id`, in id order."""
+    return _stream_rows("id > %s", (after_id,), "id", fetch_size)
+
+
+def stream_blogs_by_record_id(
+    record_ids: Iterable[str], fetch_size: Optional[int] = None
+) -> Iterator[dict]:
+    """Yields the `blogs` rows of the given records, in id order."""
+    return _stream_rows("record_id = ANY(%s)", (list(record_ids),), "id", fetch_size)
+
+
+def stream_changed_blogs(
+    until: Optional[datetime] = None,
+    since: Optional[tuple] = None,
+    fetch_size: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Yields `blogs` rows last written before `until` (all rows when None), in
+    (updated_at, id) order, starting after the (updated_at, id) watermark
+    `since` when given.
+    """
+    conditions, params = [], ()
+    if since is not None:
+        conditions.append("(updated_at, id) > (%s, %s)")
+        params += tuple(since)
+    if until is not None:
+        conditions.append("updated_at < %s")
+        params += (until,)
+    return _stream_rows(
+        " AND ".join(conditions) or "TRUE", params, "updated_at, id", fetch_size
+    )
+
+
+def stream_blog_deletions(
+    until: Optional[datetime] = None,
+    since: Optional[tuple] = None,
+    absent: bool = False,
+    fetch_size: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Yields `blog_deletions` rows logged before `until` (all when None), in
+    (deleted_at, id) order, starting after the (deleted_at, id) watermark
+    `since` when given. With `absent`, records whose row exists again are
+    left out.
+    """
+    conditions, params = [], ()
+    if since is not None:
+        conditions.append("(deleted_at, id) > (%s, %s)")
+        params += tuple(since)
+    if until is not None:
+        conditions.append("deleted_at < %s")
+        params += (until,)
+    if absent:
+        conditions.append(
+            "NOT EXISTS (SELECT 1 FROM blogs "
+            "WHERE blogs.record_id = blog_deletions.record_id)"
+        )
+    return _stream_rows(
+        " AND ".join(conditions) or "TRUE",
+        params,
+        "deleted_at, id",
+        fetch_size,
+        table="blog_deletions",
+        columns=DELETION_COLUMNS,
+    )
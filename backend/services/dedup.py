@@ -0,0 +1,289 @@
+import re
+import sqlite3
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from .chunker import graphemes
+from .snapshot_db import open_snapshot
+from .text_utils import estimate_tokens
+
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_SIZE = 5
+# Permutations are (a * h + b) mod p over 32-bit shingle hashes; p < 2**31
+# keeps the products inside uint64. The fixed seed makes signatures
+# comparable across restarts.
+MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERM).astype(np.uint64)
+
+_NON_WORD = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Folds case, joiners, punctuation and spacing so editions compare equal."""
+    text = unicodedata.normalize("NFC", text).casefold()
+    text = "".join(
+        ch if unicodedata.category(ch)[0] in ("L", "M") else " "
+        for ch in text
+        if ch not in ("\u200c", "\u200d")
+    )
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """Returns the MinHash signature of the text's grapheme shingles."""
+    clusters = graphemes(normalize(text))
+    if not clusters:
+        return None
+    shingles = {
+        "".join(clusters[i:i + SHINGLE_SIZE])
+        for i in range(max(1, len(clusters) - SHINGLE_SIZE + 1))
+    }
+    hashes = np.array(
+        [zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64
+    )
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % np.uint64(
+        MERSENNE_PRIME
+    )
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+class DedupIndex:
+    """
+    Locality-sensitive hashing index of chunk MinHash signatures.
+
+    Signatures are split into bands; chunks sharing any band bucket are
+    candidates, confirmed when their estimated Jaccard similarity reaches the
+    threshold. Keys are the (shard number, docstore id) of the vector a chunk
+    was stored as.
+
+    Like a shard, the index is a read-only SQLite snapshot plus, in memory,
+    the signatures added or removed since it was written.
+    """
+
+    def __init__(self, threshold: float, path: Optional[Path] = None):
+        self.threshold = threshold
+        self.rows = NUM_PERM // BANDS
+        self.db = open_snapshot(path) if path is not None else None
+        # key -> signature added since the snapshot, or None once removed.
+        self.changed: dict[tuple, Optional[np.ndarray]] = {}
+        # The buckets of the signatures in `changed`.
+        self.buckets: dict[tuple, list] = {}
+        self.stats = {"chunks": 0, "duplicates": 0, "saved_tokens": 0}
+        self.count = 0
+        if self.db is not None:
+            self.stats.update(self.db.execute("SELECT name, value FROM stats"))
+            (self.count,) = self.db.execute(
+                "SELECT COUNT(*) FROM signatures"
+            ).fetchone()
+        # Signatures added (or None for removed) since the last take_changes().
+        self._pending: dict[tuple, Optional[np.ndarray]] = {}
+        self._stats_changed = False
+
+    def _bands(self, signature: np.ndarray):
+        for band in range(BANDS):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _candidates(self, bucket: tuple) -> Iterator[tuple]:
+        """Yields (key, signature) for the chunks in a bucket."""
+        if self.db is not None:
+            rows = self.db.execute(
+                "SELECT s.shard, s.doc_id, s.signature FROM buckets b "
+                "JOIN signatures s ON s.shard = b.shard AND s.doc_id = b.doc_id "
+                "WHERE b.band = ? AND b.hash = ?",
+                bucket,
+            )
+            for shard, doc_id, signature in rows:
+                if (shard, doc_id) not in self.changed:
+                    yield (shard, doc_id), np.frombuffer(signature, dtype=np.uint32)
+        for key in self.buckets.get(bucket, ()):
+            yield key, self.changed[key]
+
+    def signature(self, key: tuple) -> Optional[np.ndarray]:
+        if key in self.changed:
+            return self.changed[key]
+        if self.db is None:
+            return None
+        row = self.db.execute(
+            "SELECT signature FROM signatures WHERE shard = ? AND doc_id = ?", key
+        ).fetchone()
+        return np.frombuffer(row[0], dtype=np.uint32) if row else None
+
+    def items(self) -> Iterator[tuple]:
+        """Yields (key, signature) for every stored chunk."""
+        if self.db is not None:
+            for shard, doc_id, signature in self.db.execute(
+                "SELECT shard, doc_id, signature FROM signatures"
+            ):
+                if (shard, doc_id) not in self.changed:
+                    yield (shard, doc_id), np.frombuffer(signature, dtype=np.uint32)
+        for key, signature in self.changed.items():
+            if signature is not None:
+                yield key, signature
+
+    def __len__(self) -> int:
+        return self.count
+
+    def find(self, signature: np.ndarray, exclude: Iterable = ()) -> Optional[tuple]:
+        """
+        Returns the key of the most similar stored chunk above the threshold,
+        ignoring the keys in `exclude`.
+        """
+        best_key, best_score = None, self.threshold
+        seen = set(exclude)
+        for bucket in self._bands(signature):
+            for key, stored in self._candidates(bucket):
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = float(np.mean(stored == signature))
+                if score >= best_score:
+                    best_key, best_score = key, score
+        return best_key
+
+    def add(self, key: tuple, signature: np.ndarray):
+        self._add(key, signature)
+        self._pending[key] = signature
+
+    def _add(self, key: tuple, signature: np.ndarray):
+        self._remove(key)
+        self.changed[key] = signature
+        for bucket in self._bands(signature):
+            self.buckets.setdefault(bucket, []).append(key)
+        self.count += 1
+
+    def remove(self, key: tuple):
+        if self._remove(key):
+            self._pending[key] = None
+
+    def _remove(self, key: tuple) -> bool:
+        signature = self.signature(key)
+        if signature is None:
+            return False
+        if key in self.changed:
+            for bucket in self._bands(signature):
+                keys = self.buckets.get(bucket, [])
+                if key in keys:
+                    keys.remove(key)
+                if not keys:
+                    self.buckets.pop(bucket, None)
+        self.changed[key] = None
+        self.count -= 1
+        return True
+
+    def record(self, text: str, duplicate: bool):
+        self.stats["chunks"] += 1
+        if duplicate:
+            self.stats["duplicates"] += 1
+            self.stats["saved_tokens"] += estimate_tokens(text)
+        self._stats_changed = True
+
+    def recount(self, stores: Iterable):
+        """
+        Recomputes the stats from the stored chunks: each vector counts as a
+        chunk, and each source linked into it as a duplicate chunk whose
+        tokens were saved. Repeats within a record aren't linked, so unlike
+        `record` this leaves them out.
+        """
+        stats = {"chunks": 0, "duplicates": 0, "saved_tokens": 0}
+        for store in stores:
+            for _, doc in store.items():
+                sources = len(doc.metadata.get("duplicate_sources", ()))
+                stats["chunks"] += 1 + sources
+                stats["duplicates"] += sources
+                stats["saved_tokens"] += sources * estimate_tokens(doc.page_content)
+        self.stats = stats
+        self._stats_changed = True
+
+    def take_changes(self, exclude: Iterable = ()) -> Optional[dict]:
+        """
+        Returns the signatures added or removed since the last call, plus the
+        current stats, or None if nothing changed. Keys in `exclude` are held
+        back until a later call.
+        """
+        exclude = set(exclude)
+        signatures = {k: v for k, v in self._pending.items() if k not in exclude}
+        if not signatures and not self._stats_changed:
+            return None
+        self._pending = {k: v for k, v in self._pending.items() if k in exclude}
+        self._stats_changed = False
+        return {"signatures": signatures, "stats": dict(self.stats)}
+
+    def apply_changes(self, changes: dict):
+        """Replays changes returned by another instance's `take_changes`."""
+        for key, signature in changes["signatures"].items():
+            if signature is None:
+                self._remove(key)
+            else:
+                self._add(key, signature)
+        self.stats = dict(changes["stats"])
+
+    def report(self) -> dict:
+        chunks = self.stats["chunks"]
+        return {
+            **self.stats,
+            "unique_vectors": len(self),
+            "dedup_ratio": round(self.stats["duplicates"] / chunks, 4)
+            if chunks
+            else 0.0,
+        }
+
+    def save(self, path: Path):
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute(
+                "CREATE TABLE signatures (shard INTEGER NOT NULL, "
+                "doc_id TEXT NOT NULL, signature BLOB NOT NULL, "
+                "PRIMARY KEY (shard, doc_id))"
+            )
+            conn.execute(
+                "CREATE TABLE buckets (band INTEGER NOT NULL, hash BLOB NOT NULL, "
+                "shard INTEGER NOT NULL, doc_id TEXT NOT NULL)"
+            )
+            conn.execute("CREATE TABLE stats (name TEXT PRIMARY KEY, value INTEGER)")
+            for (shard, doc_id), signature in self.items():
+                conn.execute(
+                    "INSERT INTO signatures VALUES (?, ?, ?)",
+                    (shard, doc_id, signature.tobytes()),
+                )
+                conn.executemany(
+                    "INSERT INTO buckets VALUES (?, ?, ?, ?)",
+                    [(*bucket, shard, doc_id) for bucket in self._bands(signature)],
+                )
+            conn.executemany("INSERT INTO stats VALUES (?, ?)", self.stats.items())
+            conn.execute("CREATE INDEX buckets_band ON buckets (band, hash)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @classmethod
+    def load(cls, path: Path, threshold: float) -> "DedupIndex":
+        if not path.is_file():
+            # Connecting would otherwise fail with a less helpful message.
+            raise FileNotFoundError(path)
+        return cls(threshold, path)
+
+
+# Metadata kept for each source linked into a vector: enough for a source to
+# take the vector over, on its own shard, if the vector's record is removed.
+SOURCE_KEYS = ("record_id", "title", "filename", "language", "category_id")
+
+
+def link_source(target_metadata: dict, source_metadata: dict):
+    """Records another document's chunk as a source of an existing vector."""
+    if source_metadata.get("record_id") == target_metadata.get("record_id"):
+        return
+    entry = {
+        key: source_metadata.get(key)
+        for key in SOURCE_KEYS
+        if source_metadata.get(key) is not None
+    }
+    sources = target_metadata.setdefault("duplicate_sources", [])
+    if entry not in sources:
+        sources.append(entry)
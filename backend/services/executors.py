@@ -0,0 +1,45 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from ..core.settings import settings
+from . import ocr
+
+# Blocking IO (psycopg2, synchronous Gemini and embedding calls, disk writes)
+# runs on a bounded thread pool; OCR is CPU-bound and runs in worker
+# processes, so neither stalls the event loop.
+io_pool = ThreadPoolExecutor(
+    max_workers=settings.IO_WORKERS, thread_name_prefix="blocking-io"
+)
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(
+            max_workers=settings.OCR_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=ocr.init_worker,
+        )
+    return _cpu_pool
+
+
+async def run_io(func: Callable, *args, **kwargs):
+    """Runs a blocking call on the IO thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_pool, functools.partial(func, *args, **kwargs))
+
+
+async def run_cpu(func: Callable, *args):
+    """Runs a CPU-bound, picklable call in the OCR process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_cpu_pool(), func, *args)
+
+
+def shutdown():
+    io_pool.shutdown(wait=False)
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,419 @@
+"""
+Exports the cleaned corpus in `blogs` as compressed, size-bounded shards.
+
+Usage:
+    python -m backend.services.export                # full export, JSONL.zst + Parquet
+    python -m backend.services.export --incremental  # rows changed since last export
+    python -m backend.services.export --since 2026-01-01T00:00:00+00:00
+    python -m backend.services.export --format jsonl --max-bytes 268435456
+
+Each run writes EXPORT_DIR/<export_id>/ holding part-NNNNN.jsonl.zst and/or
+part-NNNNN.parquet shards, a SHA256SUMS file and a manifest.json listing every
+shard's rows, size and checksum plus the (updated_at, id) watermark reached.
+Incremental and --since exports also write deletions.jsonl, one tombstone per
+record deleted in the window, to be applied before the shards' rows. Only full
+and --incremental exports advance EXPORT_DIR/watermark.json.
+JSONL.zst needs the optional `zstandard` package and Parquet needs `pyarrow`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+from ..core.settings import settings
+from .database import (
+    BLOG_COLUMNS,
+    SETTLE_SECONDS,
+    stream_blog_deletions,
+    stream_changed_blogs,
+)
+from .run_lock import RunLock
+
+EXPORT_ROOT = Path(settings.EXPORT_DIR)
+WATERMARK_FILE = EXPORT_ROOT / "watermark.json"
+DELETIONS_FILE = "deletions.jsonl"
+FORMATS = ("jsonl", "parquet")
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Only one export may run at a time, across the API workers and the CLI;
+# the admin endpoint checks this.
+_run_lock = RunLock(EXPORT_ROOT / ".export.lock")
+
+
+# --- Shard writers ---
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class JsonlZstWriter:
+    suffix = ".jsonl.zst"
+
+    def __init__(self, path: Path):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError(
+                "JSONL.zst export requires the `zstandard` package."
+            ) from e
+        self.file = open(path, "wb")
+        self.stream = zstandard.ZstdCompressor(level=10).stream_writer(self.file)
+
+    def write(self, row: dict):
+        line = json.dumps(row, ensure_ascii=False, default=_json_default) + "\n"
+        self.stream.write(line.encode("utf-8"))
+
+    def size(self) -> int:
+        return self.file.tell()
+
+    def close(self):
+        self.stream.close()
+
+
+class ParquetWriter:
+    suffix = ".parquet"
+
+    def __init__(self, path: Path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export requires the `pyarrow` package.") from e
+        self.pa = pa
+        self.path = path
+        self.schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("record_id", pa.string()),
+                ("title", pa.string()),
+                ("content", pa.string()),
+                ("created_at", pa.timestamp("us", tz="UTC")),
+                ("updated_at", pa.timestamp("us", tz="UTC")),
+                ("language", pa.string()),
+                ("category_id", pa.string()),
+            ]
+        )
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+        self.rows = []
+
+    def write(self, row: dict):
+        # Rows are buffered only up to one row group.
+        self.rows.append(row)
+        if len(self.rows) >= settings.EXPORT_ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self.rows:
+            self.writer.write_table(
+                self.pa.Table.from_pylist(self.rows, schema=self.schema)
+            )
+            self.rows = []
+
+    def size(self) -> int:
+        return self.path.stat().st_size
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+WRITERS = {"jsonl": JsonlZstWriter, "parquet": ParquetWriter}
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BUFFER_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ShardedOutput:
+    """Writes rows of one format into numbered shards of at most `max_bytes`."""
+
+    def __init__(self, fmt: str, directory: Path, max_bytes: int):
+        self.writer_class = WRITERS[fmt]
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.shards = []
+        self.writer = None
+
+    def write(self, row: dict):
+        if self.writer is None:
+            name = f"part-{len(self.shards):05d}{self.writer_class.suffix}"
+            path = self.directory / name
+            self.writer = self.writer_class(path)
+            self.current = {"file": path.name, "rows": 0, "first_id": row["id"]}
+        self.writer.write(row)
+        self.current["rows"] += 1
+        self.current["last_id"] = row["id"]
+        if self.writer.size() >= self.max_bytes:
+            self.close()
+
+    def close(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        self.writer = None
+        path = self.directory / self.current["file"]
+        self.current.update(bytes=path.stat().st_size, sha256=_sha256(path))
+        self.shards.append(self.current)
+
+
+# --- Export ---
+def read_watermark() -> Optional[dict]:
+    try:
+        with open(WATERMARK_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path: Path, data: dict):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _export_row(row: dict) -> dict:
+    return {column: row[column] for column in BLOG_COLUMNS}
+
+
+def export_corpus(
+    formats: Iterable[str] = FORMATS,
+    incremental: bool = False,
+    since: Optional[datetime] = None,
+    max_bytes: Optional[int] = None,
+) -> dict:
+    """
+    Streams `blogs` into a new export directory and returns its manifest.
+
+    With `incremental`, only rows written after the last export's watermark
+    are exported; `since` exports rows written after the given time instead.
+    Rows are streamed from a server-side cursor straight into the shard
+    writers, so memory use does not grow with the corpus.
+    """
+    formats = list(dict.fromkeys(formats))
+    unknown = set(formats) - set(FORMATS)
+    if not formats or unknown:
+        raise ValueError(f"Formats must be among {', '.join(FORMATS)}.")
+    if not _run_lock.acquire(blocking=False):
+        raise RuntimeError("An export is already running.")
+    try:
+        return _run_export(formats, incremental, since, max_bytes)
+    finally:
+        _run_lock.release()
+
+
+def _start_watermarks(
+    incremental: bool, since: Optional[datetime]
+) -> tuple[Optional[tuple], Optional[tuple]]:
+    """
+    Returns the (updated_at, id) watermark to export rows after and the
+    (deleted_at, id) one to export deletions after, or (None, None) for a
+    full export.
+    """
+    if since is not None:
+        return (since, 0), (since, 0)
+    previous = read_watermark() if incremental else None
+    if not previous or previous.get("updated_at") is None:
+        return None, None
+    watermark = (datetime.fromisoformat(previous["updated_at"]), previous["id"])
+    deletions = previous.get("deletions")
+    if deletions:
+        return watermark, (
+            datetime.fromisoformat(deletions["deleted_at"]),
+            deletions["id"],
+        )
+    # Watermarks from before deletions were logged.
+    return watermark, (watermark[0], 0)
+
+
+def _write_rows(
+    outputs: dict, until: datetime, watermark: Optional[tuple]
+) -> tuple[int, Optional[tuple]]:
+    """Streams the changed rows into every output; returns the count and last key."""
+    rows, last = 0, None
+    for row in stream_changed_blogs(until=until, since=watermark):
+        record = _export_row(row)
+        for output in outputs.values():
+            output.write(record)
+        rows += 1
+        last = (row["updated_at"], row["id"])
+    for output in outputs.values():
+        output.close()
+    return rows, last
+
+
+def _write_deletions(
+    directory: Path, until: datetime, watermark: tuple
+) -> tuple[dict, Optional[tuple]]:
+    """Writes the deletion tombstones; returns their file entry and last key."""
+    path = directory / DELETIONS_FILE
+    rows, last = 0, None
+    with open(path, "w", encoding="utf-8") as f:
+        for row in stream_blog_deletions(until=until, since=watermark):
+            tombstone = {"record_id": row["record_id"], "deleted_at": row["deleted_at"]}
+            f.write(json.dumps(tombstone, default=_json_default) + "\n")
+            rows += 1
+            last = (row["deleted_at"], row["id"])
+    entry = {
+        "file": path.name,
+        "rows": rows,
+        "bytes": path.stat().st_size,
+        "sha256": _sha256(path),
+    }
+    return entry, last
+
+
+def _key(value: Optional[tuple], field: str = "updated_at") -> Optional[dict]:
+    return {field: value[0].isoformat(), "id": value[1]} if value else None
+
+
+def _run_export(
+    formats: list,
+    incremental: bool,
+    since: Optional[datetime],
+    max_bytes: Optional[int],
+) -> dict:
+    started_at = datetime.now(timezone.utc)
+    until = started_at - timedelta(seconds=SETTLE_SECONDS)
+    watermark, deletions_watermark = _start_watermarks(incremental, since)
+
+    # The suffix keeps exports started within the same second apart, while the
+    # timestamp prefix keeps the directories sorted by start time.
+    export_id = f"{started_at.strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+    EXPORT_ROOT.mkdir(parents=True, exist_ok=True)
+    tmp_dir = EXPORT_ROOT / f".{export_id}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+    outputs = {
+        fmt: ShardedOutput(fmt, tmp_dir, max_bytes or settings.EXPORT_MAX_SHARD_BYTES)
+        for fmt in formats
+    }
+
+    deletions = None
+    try:
+        rows, last = _write_rows(outputs, until, watermark)
+        if watermark is not None:
+            deletions, last_deletion = _write_deletions(
+                tmp_dir, until, deletions_watermark
+            )
+            deletions_reached = last_deletion or deletions_watermark
+        else:
+            # Rows deleted before a full export are simply absent from it.
+            deletions_reached = (until, 0)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    manifest = {
+        "export_id": export_id,
+        "started_at": started_at.isoformat(),
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        "incremental": watermark is not None,
+        "since": _key(watermark),
+        "watermark": _key(last or watermark),
+        "deletions_watermark": _key(deletions_reached, "deleted_at"),
+        "rows": rows,
+        "shards": {fmt: output.shards for fmt, output in outputs.items()},
+        "deletions": deletions,
+    }
+    files = [shard for output in outputs.values() for shard in output.shards]
+    with open(tmp_dir / "SHA256SUMS", "w", encoding="utf-8") as f:
+        for entry in files + ([deletions] if deletions else []):
+            f.write(f"{entry['sha256']}  {entry['file']}\n")
+    _write_json(tmp_dir / "manifest.json", manifest)
+    os.replace(tmp_dir, EXPORT_ROOT / export_id)
+    # A --since export covers an arbitrary window, so only full and
+    # incremental exports move the watermark the next --incremental resumes from.
+    if manifest["watermark"] and since is None:
+        _write_json(
+            WATERMARK_FILE,
+            {**manifest["watermark"], "deletions": manifest["deletions_watermark"]},
+        )
+    print(f"Exported {rows} rows to {EXPORT_ROOT / export_id}.")
+    return manifest
+
+
+def export_path(export_id: str, filename: str) -> Path:
+    """Returns the path of a file in a finished export, or raises KeyError."""
+    if Path(export_id).name != export_id or Path(filename).name != filename:
+        raise KeyError(filename)
+    if export_id.startswith(".") or filename.startswith("."):
+        raise KeyError(filename)
+    path = EXPORT_ROOT / export_id / filename
+    if not path.is_file():
+        raise KeyError(filename)
+    return path
+
+
+def get_export_status() -> dict:
+    """Reports whether an export is running, the watermark and the latest manifest."""
+    latest = None
+    if EXPORT_ROOT.is_dir():
+        exports = [
+            p
+            for p in EXPORT_ROOT.iterdir()
+            if p.is_dir() and not p.name.startswith(".")
+        ]
+        if exports:
+            # Ids sort by start second; exports run one at a time, so the
+            # last manifest written breaks ties.
+            newest = max(
+                exports,
+                key=lambda p: (
+                    p.name.split("-")[0],
+                    (p / "manifest.json").stat().st_mtime_ns,
+                ),
+            )
+            with open(newest / "manifest.json", encoding="utf-8") as f:
+                latest = json.load(f)
+    return {
+        "running": _run_lock.locked(),
+        "watermark": read_watermark(),
+        "latest": latest,
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--format",
+        choices=[*FORMATS, "both"],
+        default="both",
+        help="Shard format to write (default: both).",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only export rows written since the last export's watermark.",
+    )
+    mode.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Only export rows written after this ISO timestamp.",
+    )
+    parser.add_argument(
+        "--max-bytes", type=int, help="Close a shard once it reaches this size."
+    )
+    args = parser.parse_args(argv)
+    formats = FORMATS if args.format == "both" else [args.format]
+    since = args.since
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    manifest = export_corpus(formats, args.incremental, since, args.max_bytes)
+    print(json.dumps(manifest, default=str, indent=2))
+
+
+if __name__ == "__main__":
+    main()
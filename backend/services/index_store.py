@@ -0,0 +1,525 @@
+"""
+On-disk format of the vector index: a snapshot plus a log of later changes.
+
+An index directory holds one `shard-NNN/` snapshot per shard (`index.faiss`
+and a `docs.sqlite` docstore), the near-duplicate index (`dedup.sqlite`),
+the record map (`records.sqlite`), the shard count and key it was split by
+(`layout.json`), and a `log/` directory of numbered entries, one per write,
+each holding only that write's changes. Loading an index replays its log
+over the snapshot, so a write costs the size of its changes rather than of
+the corpus; vector_store folds the log into a new snapshot once it has
+grown past a fraction of the snapshot's size, or past a fixed cap.
+
+Snapshots are only ever read through memory maps and read-only SQLite
+connections, so any number of worker processes share one copy of them in
+the page cache; each process holds only the log's changes in memory.
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+
+from ..core.settings import settings
+from .dedup import DedupIndex
+from .record_index import RecordIndex
+from .snapshot_db import open_snapshot
+
+LOG_DIR = "log"
+DEDUP_FILE = "dedup.sqlite"
+RECORDS_FILE = "records.sqlite"
+LAYOUT_FILE = "layout.json"
+DOCS_FILE = "docs.sqlite"
+# Vectors copied at a time when a snapshot is written.
+COPY_BLOCK_SIZE = 10000
+
+
+def shard_dir(path: Path, shard_no: int) -> Path:
+    return path / f"shard-{shard_no:03d}"
+
+
+def load_shard_index(path: Path, mmap: bool = False):
+    """Reads a shard's FAISS index, memory-mapped read-only when `mmap` is set."""
+    faiss = dependable_faiss_import()
+    if not mmap:
+        return faiss.read_index(str(path / "index.faiss"))
+    if not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        # IO_FLAG_MMAP alone still copies flat indexes into memory.
+        raise RuntimeError(
+            "Memory-mapping the index needs a faiss-cpu release with "
+            "IO_FLAG_MMAP_IFC; upgrade faiss-cpu."
+        )
+    return faiss.read_index(
+        str(path / "index.faiss"), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    )
+
+
+def read_log(path: Path, after: int, upto: Optional[int] = None) -> Iterator[tuple]:
+    """Yields (number, entry) for the log entries after `after`, in order."""
+    number = after + 1
+    while upto is None or number <= upto:
+        try:
+            with open(path / LOG_DIR / f"{number:08d}.pkl", "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return
+        yield number, entry
+        number += 1
+
+
+# --- Snapshot docstores ---
+class SqliteDocs:
+    """The read-only docstore of a snapshot, one row per vector position."""
+
+    def __init__(self, path: Path):
+        self.conn = open_snapshot(path)
+        (self.count,) = self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()
+
+    @staticmethod
+    def write(path: Path, rows: Iterable[list]):
+        """Writes (position, doc_id, document) rows, given in blocks."""
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute(
+                "CREATE TABLE docs (position INTEGER PRIMARY KEY, "
+                "doc_id TEXT NOT NULL UNIQUE, doc BLOB NOT NULL)"
+            )
+            for block in rows:
+                conn.executemany(
+                    "INSERT INTO docs VALUES (?, ?, ?)",
+                    [(p, doc_id, pickle.dumps(doc)) for p, doc_id, doc in block],
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, doc_id) -> Optional[Document]:
+        row = self.conn.execute(
+            "SELECT doc FROM docs WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def at(self, position: int) -> tuple:
+        """Returns the (doc_id, document) stored at a vector position."""
+        row = self.conn.execute(
+            "SELECT doc_id, doc FROM docs WHERE position = ?", (position,)
+        ).fetchone()
+        return (row[0], pickle.loads(row[1])) if row else (None, None)
+
+    def position(self, doc_id) -> Optional[int]:
+        row = self.conn.execute(
+            "SELECT position FROM docs WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def items(self) -> Iterator[tuple]:
+        for doc_id, doc in self.conn.execute("SELECT doc_id, doc FROM docs"):
+            yield doc_id, pickle.loads(doc)
+
+
+class ShardStore:
+    """
+    One shard of the vector index.
+
+    The snapshot's vectors and documents stay where they were loaded from,
+    which may be a read-only memory map and SQLite file. Chunks added since
+    go to a small in-memory tail index, and changed or deleted chunks to an
+    overlay over the snapshot's docstore. A deleted chunk's vector stays
+    behind as a tombstone, which searches skip, until the next snapshot
+    leaves it out.
+    """
+
+    def __init__(self, index, docs: SqliteDocs, path: Path):
+        # The snapshot directory the shard was loaded from.
+        self.path = path
+        self.index = index
+        self.docs = docs
+        self.tail = None
+        self.tail_ids: list = []
+        self.tail_positions: dict = {}
+        # doc_id -> Document, or None once deleted.
+        self.overlay: dict = {}
+        snapshot_vectors = index.ntotal if index is not None else 0
+        self.dead = snapshot_vectors - len(self.docs)
+        # Changes since the last take_changes(), in the order they were made.
+        self._ops: list = []
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = False) -> "ShardStore":
+        index = None
+        if (path / "index.faiss").is_file():
+            index = load_shard_index(path, mmap)
+        return cls(index, SqliteDocs(path / DOCS_FILE), path)
+
+    @property
+    def ntotal(self) -> int:
+        """Vectors in the shard, tombstones included."""
+        return sum(index.ntotal for index in (self.index, self.tail) if index)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the shard differs from its snapshot on disk."""
+        return bool(self.tail_ids or self.overlay or self.dead)
+
+    def get(self, doc_id) -> Optional[Document]:
+        if doc_id in self.overlay:
+            return self.overlay[doc_id]
+        return self.docs.get(doc_id)
+
+    def items(self) -> Iterator[tuple]:
+        """Yields (doc_id, document) for every live chunk."""
+        for doc_id, doc in self.docs.items():
+            if doc_id not in self.overlay:
+                yield doc_id, doc
+        for doc_id, doc in self.overlay.items():
+            if doc is not None:
+                yield doc_id, doc
+
+    def vector(self, doc_id) -> Optional[np.ndarray]:
+        """Returns the stored vector of a chunk."""
+        if doc_id in self.tail_positions:
+            return self.tail.reconstruct(self.tail_positions[doc_id])
+        position = self.docs.position(doc_id)
+        if position is None:
+            return None
+        return self.index.reconstruct(int(position))
+
+    # --- Changes ---
+    def add(self, items: list[tuple]):
+        """Adds (doc_id, document, vector) chunks."""
+        if items:
+            self._add(items)
+            self._ops.append(("add", items))
+
+    def _add(self, items: list[tuple]):
+        vectors = np.array([vector for _, _, vector in items], dtype=np.float32)
+        if self.tail is None:
+            faiss = dependable_faiss_import()
+            metric = self.index.metric_type if self.index else faiss.METRIC_L2
+            self.tail = faiss.IndexFlat(vectors.shape[1], metric)
+        self.tail.add(vectors)
+        for doc_id, doc, _ in items:
+            self.tail_positions[doc_id] = len(self.tail_ids)
+            self.tail_ids.append(doc_id)
+            self.overlay[doc_id] = doc
+
+    def put(self, doc_id, doc: Document):
+        """Replaces a stored chunk's document, keeping its vector."""
+        self.overlay[doc_id] = doc
+        self._ops.append(("put", doc_id, doc))
+
+    def delete(self, doc_ids: Iterable) -> int:
+        """Deletes chunks, leaving their vectors as tombstones; returns how many."""
+        doc_ids = [doc_id for doc_id in doc_ids if self.get(doc_id) is not None]
+        if doc_ids:
+            self._delete(doc_ids)
+            self._ops.append(("delete", doc_ids))
+        return len(doc_ids)
+
+    def _delete(self, doc_ids: list):
+        for doc_id in doc_ids:
+            self.overlay[doc_id] = None
+        self.dead += len(doc_ids)
+
+    def take_changes(self) -> list:
+        """Returns the changes made since the last call."""
+        ops, self._ops = self._ops, []
+        return ops
+
+    def apply_changes(self, ops: list):
+        """Replays changes returned by another instance's `take_changes`."""
+        for op, *args in ops:
+            if op == "add":
+                self._add(*args)
+            elif op == "put":
+                self.overlay[args[0]] = args[1]
+            else:
+                self._delete(*args)
+
+    # --- Search ---
+    def _at(self, index, position: int) -> Optional[Document]:
+        if index is self.tail:
+            return self.get(self.tail_ids[position])
+        doc_id, doc = self.docs.at(position)
+        if doc_id in self.overlay:
+            return self.overlay[doc_id]
+        return doc
+
+    def search(self, vector: list, k: int, with_vectors: bool = False) -> list:
+        """
+        Returns up to k (distance, text, metadata, vector) tuples, nearest
+        first; the stored vector is only reconstructed when `with_vectors` is
+        set. Each index is over-fetched by the number of tombstones.
+        """
+        query = np.array([vector], dtype=np.float32)
+        results = []
+        for index in (self.index, self.tail):
+            if not index or not index.ntotal:
+                continue
+            fetch = min(k + self.dead, index.ntotal)
+            distances, positions = index.search(query, fetch)
+            found = 0
+            for distance, i in zip(distances[0], positions[0]):
+                if found == k:
+                    break
+                if i == -1:
+                    continue
+                doc = self._at(index, int(i))
+                if doc is None:
+                    # The chunk was deleted and its vector is a tombstone.
+                    continue
+                embedding = index.reconstruct(int(i)).tolist() if with_vectors else None
+                results.append(
+                    (float(distance), doc.page_content, doc.metadata, embedding)
+                )
+                found += 1
+        results.sort(key=lambda r: r[0])
+        return results[:k]
+
+    # --- Snapshots ---
+    def _live_blocks(self) -> Iterator[tuple]:
+        """Yields (vectors, [(doc_id, document)], metric) blocks of live chunks."""
+        for index in (self.index, self.tail):
+            if not index:
+                continue
+            for start in range(0, index.ntotal, COPY_BLOCK_SIZE):
+                block = index.reconstruct_n(
+                    start, min(COPY_BLOCK_SIZE, index.ntotal - start)
+                )
+                keep, docs = [], []
+                for offset in range(len(block)):
+                    position = start + offset
+                    if index is self.tail:
+                        doc_id = self.tail_ids[position]
+                        doc = self.get(doc_id)
+                    else:
+                        doc_id, doc = self.docs.at(position)
+                        doc = self.overlay.get(doc_id, doc)
+                    if doc is None:
+                        continue
+                    keep.append(offset)
+                    docs.append((doc_id, doc))
+                if keep:
+                    yield block[keep], docs, index.metric_type
+
+    def save(self, path: Path):
+        """Writes the live chunks as a snapshot, leaving tombstones out."""
+        faiss = dependable_faiss_import()
+        path.mkdir(parents=True)
+        index = None
+
+        def rows():
+            nonlocal index
+            for vectors, docs, metric in self._live_blocks():
+                if index is None:
+                    index = faiss.IndexFlat(vectors.shape[1], metric)
+                start = index.ntotal
+                index.add(vectors)
+                yield [(start + i, doc_id, doc) for i, (doc_id, doc) in enumerate(docs)]
+
+        SqliteDocs.write(path / DOCS_FILE, rows())
+        if index is not None:
+            faiss.write_index(index, str(path / "index.faiss"))
+
+
+class VectorIndex:
+    """
+    An index directory loaded with the changes logged since its snapshot.
+    The shard stores, near-duplicate index and record map are loaded on
+    first use, so a process that leaves searching to the shard processes
+    never opens the shards, and only writers load the other two.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        num_shards: int,
+        mmap: bool = False,
+        shards: Optional[list] = None,
+        dedup: Optional[DedupIndex] = None,
+        records: Optional[RecordIndex] = None,
+    ):
+        self.path = path
+        self.num_shards = num_shards
+        self.mmap = mmap
+        self.applied = 0
+        self.log_bytes = 0
+        self.snapshot_bytes = sum(
+            f.stat().st_size
+            for f in path.rglob("*")
+            if f.is_file() and f.parent.name != LOG_DIR
+        )
+        # The `meta` of the last log entry that carried one.
+        self.meta = None
+        self._shards = shards
+        self._dedup = dedup
+        self._records = records
+
+    @staticmethod
+    def _layout(num_shards: int) -> dict:
+        return {"num_shards": num_shards, "shard_key": settings.VECTOR_STORE_SHARD_KEY}
+
+    @classmethod
+    def layout_matches(cls, path: Path, num_shards: int) -> bool:
+        """
+        Whether the index at `path` was split into `num_shards` shards by the
+        configured VECTOR_STORE_SHARD_KEY.
+        """
+        try:
+            with open(path / LAYOUT_FILE, encoding="utf-8") as f:
+                return json.load(f) == cls._layout(num_shards)
+        except FileNotFoundError:
+            return False
+
+    @classmethod
+    def _write_layout(cls, path: Path, num_shards: int):
+        with open(path / LAYOUT_FILE, "w", encoding="utf-8") as f:
+            json.dump(cls._layout(num_shards), f)
+
+    @classmethod
+    def load(cls, path: Path, num_shards: int, mmap: bool = False) -> "VectorIndex":
+        """
+        Loads the index at `path` with its log. Raises ValueError if it was
+        sharded differently from `num_shards` and VECTOR_STORE_SHARD_KEY, as
+        its chunks would then be looked up in the wrong shards.
+        """
+        if not cls.layout_matches(path, num_shards):
+            raise ValueError(
+                f"{path} was not built with {num_shards} shards keyed by "
+                f"{settings.VECTOR_STORE_SHARD_KEY!r}; rebuild it with "
+                "`python -m backend.services.reindex --restart`."
+            )
+        index = cls(path, num_shards, mmap)
+        index.catch_up()
+        return index
+
+    @classmethod
+    def create(cls, path: Path, num_shards: int) -> "VectorIndex":
+        """Writes an empty index directory at `path` and loads it."""
+        path.mkdir(parents=True)
+        for i in range(num_shards):
+            shard_dir(path, i).mkdir()
+            SqliteDocs.write(shard_dir(path, i) / DOCS_FILE, ())
+        DedupIndex(settings.DEDUP_THRESHOLD).save(path / DEDUP_FILE)
+        RecordIndex().save(path / RECORDS_FILE)
+        cls._write_layout(path, num_shards)
+        return cls.load(path, num_shards)
+
+    @property
+    def shards(self) -> list:
+        if self._shards is None:
+            shards = [
+                ShardStore.load(shard_dir(self.path, i), self.mmap)
+                for i in range(self.num_shards)
+            ]
+            for _, entry in read_log(self.path, 0, self.applied):
+                for shard_no, ops in entry["shards"].items():
+                    shards[shard_no].apply_changes(ops)
+            self._shards = shards
+        return self._shards
+
+    @property
+    def dedup(self) -> DedupIndex:
+        if self._dedup is None:
+            dedup = DedupIndex.load(self.path / DEDUP_FILE, settings.DEDUP_THRESHOLD)
+            for _, entry in read_log(self.path, 0, self.applied):
+                if entry["dedup"]:
+                    dedup.apply_changes(entry["dedup"])
+            self._dedup = dedup
+        return self._dedup
+
+    @property
+    def records(self) -> RecordIndex:
+        if self._records is None:
+            records = RecordIndex.load(self.path / RECORDS_FILE)
+            for _, entry in read_log(self.path, 0, self.applied):
+                if entry["records"]:
+                    records.apply_changes(entry["records"])
+            self._records = records
+        return self._records
+
+    def catch_up(self) -> int:
+        """Applies the log entries written since this index was loaded."""
+        count = 0
+        for number, entry in read_log(self.path, self.applied):
+            if self._shards is not None:
+                for shard_no, ops in entry["shards"].items():
+                    self._shards[shard_no].apply_changes(ops)
+            if self._dedup is not None and entry["dedup"]:
+                self._dedup.apply_changes(entry["dedup"])
+            if self._records is not None and entry["records"]:
+                self._records.apply_changes(entry["records"])
+            if entry.get("meta") is not None:
+                self.meta = entry["meta"]
+            self.applied = number
+            self.log_bytes += self._entry_path(number).stat().st_size
+            count += 1
+        return count
+
+    def _entry_path(self, number: int) -> Path:
+        return self.path / LOG_DIR / f"{number:08d}.pkl"
+
+    def commit(self, exclude: Iterable = (), meta: Optional[dict] = None) -> int:
+        """
+        Appends the changes made since the last commit to the log as one
+        entry and returns its size in bytes (0 if nothing changed).
+        Near-duplicate signatures of the keys in `exclude` are held back for
+        a later commit; `meta` is stored with the entry.
+        """
+        entry = {
+            "shards": {
+                i: ops
+                for i, store in enumerate(self._shards or ())
+                if (ops := store.take_changes())
+            },
+            "dedup": self._dedup.take_changes(exclude) if self._dedup else None,
+            "records": self._records.take_changes() if self._records else None,
+            "meta": meta,
+        }
+        if not any(entry.values()):
+            return 0
+        number = self.applied + 1
+        target = self._entry_path(number)
+        target.parent.mkdir(exist_ok=True)
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Linking fails if the entry exists, so a writer that fell behind the
+        # log can never overwrite another's entry.
+        try:
+            os.link(tmp_path, target)
+        finally:
+            tmp_path.unlink()
+        self.applied = number
+        if meta is not None:
+            self.meta = meta
+        size = target.stat().st_size
+        self.log_bytes += size
+        return size
+
+    def save(self, path: Path):
+        """
+        Writes the index as a new snapshot directory with an empty log. Shards
+        unchanged since they were loaded are hard-linked from their snapshot.
+        """
+        path.mkdir(parents=True)
+        for i, store in enumerate(self.shards):
+            target = shard_dir(path, i)
+            if store.dirty:
+                store.save(target)
+                continue
+            target.mkdir()
+            for file in store.path.iterdir():
+                os.link(file, target / file.name)
+        self.dedup.save(path / DEDUP_FILE)
+        self.records.save(path / RECORDS_FILE)
+        self._write_layout(path, self.num_shards)
@@ -0,0 +1,47 @@
+import io
+from typing import Union
+
+import fitz
+import numpy as np
+from PIL import Image
+
+# Each OCR worker process loads its own EasyOCR reader once.
+_reader = None
+
+
+def init_worker():
+    """Process pool initializer: loads the EasyOCR models into this process."""
+    global _reader
+    import easyocr
+
+    _reader = easyocr.Reader(["en", "te"])
+
+
+def _get_reader():
+    if _reader is None:
+        init_worker()
+    return _reader
+
+
+def extract_text(source: Union[str, bytes], content_type: str) -> str:
+    """
+    Runs OCR over a PDF or image and returns the raw text. `source` is either
+    a file path or the file's bytes; paths avoid copying large files between
+    processes.
+    """
+    reader = _get_reader()
+    if content_type == "application/pdf":
+        if isinstance(source, bytes):
+            pdf_document = fitz.open(stream=source, filetype="pdf")
+        else:
+            pdf_document = fitz.open(source)
+        all_text_parts = []
+        for page in pdf_document:
+            pix = page.get_pixmap()
+            img_bytes = pix.tobytes("png")
+            ocr_result = reader.readtext(img_bytes, detail=0, paragraph=True)
+            all_text_parts.extend(ocr_result)
+        return "\n".join(all_text_parts)
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    ocr_result = reader.readtext(np.array(image), detail=0, paragraph=True)
+    return "\n".join(ocr_result)
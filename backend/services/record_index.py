@@ -0,0 +1,239 @@
+import sqlite3
+from itertools import groupby
+from pathlib import Path
+from typing import Hashable, Iterable, Iterator, Optional
+
+from .snapshot_db import open_snapshot
+
+
+class RecordIndex:
+    """
+    Maps each record_id to the vectors (shard number, docstore id) holding its
+    chunks, and to the vectors its near-duplicate chunks were linked into
+    instead of being embedded. `linked_to` is the reverse of the links, so a
+    vector other records still depend on can be found without a scan.
+
+    Like a shard, the map is a read-only SQLite snapshot plus, in memory,
+    the records changed since it was written.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.db = open_snapshot(path) if path is not None else None
+        # record_id -> (chunks, links) of the records changed since the
+        # snapshot; both are empty for a record that was removed.
+        self.changed: dict[str, tuple[set, set]] = {}
+        # The reverse of the changed records' links.
+        self._linked_by: dict[Hashable, set] = {}
+        # Records changed since the last take_changes().
+        self._dirty: set = set()
+
+    # --- Snapshot reads ---
+    def _stored(self, table: str, record_id: str) -> set:
+        if self.db is None:
+            return set()
+        rows = self.db.execute(
+            f"SELECT shard, doc_id FROM {table} WHERE record_id = ?", (record_id,)
+        )
+        return {tuple(row) for row in rows}
+
+    def _stored_records(self, table: str) -> Iterator[tuple]:
+        """Yields (record_id, keys) for the unchanged records of the snapshot."""
+        if self.db is None:
+            return
+        rows = self.db.execute(
+            f"SELECT record_id, shard, doc_id FROM {table} ORDER BY record_id"
+        )
+        for record_id, group in groupby(rows, key=lambda row: row[0]):
+            if record_id not in self.changed:
+                yield record_id, {(shard, doc_id) for _, shard, doc_id in group}
+
+    # --- Lookups ---
+    def chunks_of(self, record_id) -> set:
+        record_id = str(record_id)
+        if record_id in self.changed:
+            return set(self.changed[record_id][0])
+        return self._stored("chunks", record_id)
+
+    def links_of(self, record_id) -> set:
+        record_id = str(record_id)
+        if record_id in self.changed:
+            return set(self.changed[record_id][1])
+        return self._stored("links", record_id)
+
+    def linked_to(self, key: Hashable) -> set:
+        """Returns the records with near-duplicate chunks linked into `key`."""
+        sources = set(self._linked_by.get(key, ()))
+        if self.db is not None:
+            rows = self.db.execute(
+                "SELECT record_id FROM links WHERE shard = ? AND doc_id = ?", key
+            )
+            sources.update(
+                record_id for (record_id,) in rows if record_id not in self.changed
+            )
+        return sources
+
+    def link_items(self) -> Iterator[tuple]:
+        """Yields (record_id, keys) for every record with links."""
+        yield from self._stored_records("links")
+        for record_id, (_, links) in self.changed.items():
+            if links:
+                yield record_id, set(links)
+
+    def __contains__(self, record_id) -> bool:
+        record_id = str(record_id)
+        if record_id in self.changed:
+            return any(self.changed[record_id])
+        return bool(self.chunks_of(record_id) or self.links_of(record_id))
+
+    def __iter__(self) -> Iterator[str]:
+        """Yields the id of every record with chunks or links."""
+        stored = set()
+        for table in ("chunks", "links"):
+            stored.update(record_id for record_id, _ in self._stored_records(table))
+        yield from stored
+        for record_id, record in self.changed.items():
+            if any(record):
+                yield record_id
+
+    # --- Changes ---
+    def _record(self, record_id: str) -> tuple[set, set]:
+        """Returns a record's (chunks, links), copied into memory to change."""
+        record = self.changed.get(record_id)
+        if record is None:
+            record = (
+                self._stored("chunks", record_id),
+                self._stored("links", record_id),
+            )
+            self.changed[record_id] = record
+            for key in record[1]:
+                self._linked_by.setdefault(key, set()).add(record_id)
+        return record
+
+    def add_chunk(self, record_id, key: Hashable):
+        record_id = str(record_id)
+        self._record(record_id)[0].add(key)
+        self._dirty.add(record_id)
+
+    def add_link(self, record_id, key: Hashable):
+        record_id = str(record_id)
+        if key in self._record(record_id)[0]:
+            # A repeat within the record itself; nothing to track.
+            return
+        self._link(record_id, key)
+        self._dirty.add(record_id)
+
+    def _link(self, record_id: str, key: Hashable):
+        self._record(record_id)[1].add(key)
+        self._linked_by.setdefault(key, set()).add(record_id)
+
+    def _forget_source(self, record_id: str, key: Hashable):
+        self._linked_by.get(key, set()).discard(record_id)
+        if not self._linked_by.get(key, True):
+            del self._linked_by[key]
+
+    def _unlink(self, record_id: str, key: Hashable):
+        self._record(record_id)[1].discard(key)
+        self._forget_source(record_id, key)
+        self._dirty.add(record_id)
+
+    def pop(self, record_id) -> tuple[set, set]:
+        """Forgets a record, returning the keys of its chunks and its links."""
+        record_id = str(record_id)
+        chunks, links = self._record(record_id)
+        popped = (set(chunks), set(links))
+        for key in links:
+            self._forget_source(record_id, key)
+        chunks.clear()
+        links.clear()
+        self._dirty.add(record_id)
+        return popped
+
+    def transfer(self, key: Hashable, record_id):
+        """Hands a vector over to a record that was linked to it."""
+        self._unlink(str(record_id), key)
+        self.add_chunk(record_id, key)
+
+    def move(self, key: Hashable, new_key: Hashable):
+        """Points the links to a vector at its new key, once it changed shards."""
+        for record_id in self.linked_to(key):
+            self._unlink(record_id, key)
+            self._link(record_id, new_key)
+
+    def take_changes(self) -> Optional[dict]:
+        """
+        Returns {record_id: (chunks, links)} for the records changed since the
+        last call, with None for records that are gone, or None if none were.
+        """
+        if not self._dirty:
+            return None
+        changes = {
+            record_id: tuple(
+                set(keys) if keys else None for keys in self.changed[record_id]
+            )
+            for record_id in self._dirty
+        }
+        self._dirty = set()
+        return changes
+
+    def apply_changes(self, changes: dict):
+        """Replays changes returned by another instance's `take_changes`."""
+        for record_id, (chunks, links) in changes.items():
+            if record_id in self.changed:
+                for key in self.changed[record_id][1]:
+                    self._forget_source(record_id, key)
+            self.changed[record_id] = (set(chunks or ()), set(links or ()))
+            for key in links or ():
+                self._linked_by.setdefault(key, set()).add(record_id)
+        self._dirty = set()
+
+    # --- Snapshots ---
+    def _rows(self, table: str) -> Iterator[tuple]:
+        """Yields the (record_id, shard, doc_id) rows of a table to save."""
+        if self.db is not None:
+            for row in self.db.execute(f"SELECT record_id, shard, doc_id FROM {table}"):
+                if row[0] not in self.changed:
+                    yield row
+        column = 0 if table == "chunks" else 1
+        for record_id, record in self.changed.items():
+            for shard, doc_id in record[column]:
+                yield record_id, shard, doc_id
+
+    def save(self, path: Path):
+        conn = sqlite3.connect(path)
+        try:
+            for table in ("chunks", "links"):
+                conn.execute(
+                    f"CREATE TABLE {table} (record_id TEXT NOT NULL, "
+                    "shard INTEGER NOT NULL, doc_id TEXT NOT NULL)"
+                )
+                conn.executemany(
+                    f"INSERT INTO {table} VALUES (?, ?, ?)", self._rows(table)
+                )
+                conn.execute(f"CREATE INDEX {table}_record ON {table} (record_id)")
+            conn.execute("CREATE INDEX links_key ON links (shard, doc_id)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @classmethod
+    def load(cls, path: Path) -> "RecordIndex":
+        if not path.is_file():
+            # Connecting would otherwise fail with a less helpful message.
+            raise FileNotFoundError(path)
+        return cls(path)
+
+    @classmethod
+    def from_stores(cls, stores: Iterable) -> "RecordIndex":
+        """Builds the map by scanning the metadata of every stored chunk."""
+        index = cls()
+        for shard_no, store in enumerate(stores):
+            if store is None:
+                continue
+            for doc_id, doc in store.items():
+                if doc.metadata.get("record_id") is not None:
+                    index.add_chunk(doc.metadata["record_id"], (shard_no, doc_id))
+                for source in doc.metadata.get("duplicate_sources", ()):
+                    if source.get("record_id") is not None:
+                        index.add_link(source["record_id"], (shard_no, doc_id))
+        index._dirty = set()
+        return index
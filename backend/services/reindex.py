@@ -0,0 +1,466 @@
+"""
+Rebuilds the FAISS vector store from the cleaned documents in `blogs`.
+
+Usage:
+    python -m backend.services.reindex                # full rebuild, resumable
+    python -m backend.services.reindex --restart      # full rebuild from scratch
+    python -m backend.services.reindex --incremental  # rows after the checkpoint
+    python -m backend.services.reindex --shard 3      # rebuild a single shard
+"""
+
+import argparse
+import json
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, Optional
+
+from ..core.settings import settings
+from . import vector_store as vs
+from .database import (
+    SETTLE_SECONDS,
+    stream_blog_deletions,
+    stream_blogs_by_record_id,
+    stream_changed_blogs,
+)
+from .dedup import minhash
+from .index_store import VectorIndex
+from .run_lock import RunLock
+
+CHECKPOINT_FILE = vs.STORE_DIR / "checkpoint.json"
+STAGING_ROOT = vs.STORE_DIR / "staging"
+
+# Only one reindex may run at a time, across the API workers and the CLI;
+# the admin endpoint checks this.
+_run_lock = RunLock(vs.STORE_DIR / ".reindex.lock")
+
+
+# --- Checkpoints ---
+def _read_json(path) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path, data: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint() -> Optional[dict]:
+    """Returns the checkpoint of the last completed reindex, if any."""
+    return _read_json(CHECKPOINT_FILE)
+
+
+def _staging_dir(shard: Optional[int]):
+    """Partial full rebuilds and single-shard rebuilds checkpoint separately."""
+    return STAGING_ROOT / ("all" if shard is None else f"shard-{shard:03d}")
+
+
+def get_reindex_status() -> dict:
+    """Summarizes the last completed run and any partial runs awaiting resume."""
+    partial = {}
+    if STAGING_ROOT.is_dir():
+        for path in sorted(STAGING_ROOT.iterdir()):
+            state = _read_json(path / "checkpoint.json")
+            if state:
+                partial[path.name] = state
+    return {
+        "running": _run_lock.locked(),
+        "checkpoint": read_checkpoint(),
+        "partial": partial,
+    }
+
+
+def _watermark(state: dict) -> Optional[tuple]:
+    """Returns the (updated_at, id) of the last row a run has indexed."""
+    watermark = state.get("watermark")
+    if not watermark:
+        return None
+    return datetime.fromisoformat(watermark["updated_at"]), watermark["id"]
+
+
+# --- Chunking and embedding ---
+def _row_metadata(row: dict) -> dict:
+    return {
+        "record_id": row["record_id"],
+        "title": row["title"],
+        "language": row.get("language"),
+        "category_id": row.get("category_id"),
+    }
+
+
+def _iter_batches(
+    rows: Iterable[dict],
+    batch_size: int,
+    dedup,
+    inflight: set,
+    skip: Optional[Callable[[dict], bool]] = None,
+) -> Iterator[tuple]:
+    """
+    Groups chunk documents into embedding batches of whole rows.
+
+    Near-duplicates are dropped before embedding and carried as links, which
+    travel with the batch completing their row. Each batch is tagged with the
+    (updated_at, id) of the last row it completes, or None when it holds
+    only part of a row too large for a single batch. Rows `skip` returns
+    True for still count as completed. Keys of chunks handed out but not yet
+    stored are kept in `inflight`.
+    """
+    docs, links, last = [], [], None
+    for row in rows:
+        if skip is not None and skip(row):
+            last = (row["updated_at"], row["id"])
+            continue
+        row_docs, row_links = vs.deduplicate(
+            vs.split_text_to_documents(row["content"], _row_metadata(row)), dedup
+        )
+        # Before yielding: a checkpoint may be taken while suspended there.
+        inflight.update((shard_no, doc_id) for shard_no, doc_id, _ in row_docs)
+        if (docs or links) and len(docs) + len(row_docs) > batch_size:
+            yield docs, links, last
+            docs, links = [], []
+        docs.extend(row_docs)
+        links.extend(row_links)
+        last = (row["updated_at"], row["id"])
+        while len(docs) > batch_size:
+            yield docs[:batch_size], [], None
+            docs = docs[batch_size:]
+    if docs or links or last is not None:
+        yield docs, links, last
+
+
+def _embed_batch(batch: tuple) -> tuple:
+    docs, links, last = batch
+    vectors = []
+    if docs:
+        vectors = vs.embeddings.embed_documents(
+            [doc.page_content for _, _, doc in docs]
+        )
+    return docs, vectors, links, last
+
+
+def _embed_in_parallel(batches: Iterator[tuple], workers: int) -> Iterator[tuple]:
+    """Embeds batches on a thread pool, keeping input order and a bounded backlog."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(_embed_batch, batch))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _other_shards(shard: Optional[int]) -> Optional[Callable[[dict], bool]]:
+    if shard is None:
+        return None
+    return lambda row: vs.shard_for(_row_metadata(row)) != shard
+
+
+def _index_rows(
+    index: VectorIndex,
+    rows: Iterable[dict],
+    state: dict,
+    skip: Optional[Callable[[dict], bool]] = None,
+    checkpoint_dir=None,
+):
+    """
+    Streams rows into `index`, leaving out those `skip` returns True for. Every
+    REINDEX_CHECKPOINT_EVERY batches, the chunks stored so far are appended
+    to the index's log; with `checkpoint_dir`, `state` is logged with them
+    so the run can resume from its watermark.
+    """
+    dedup = index.dedup if settings.DEDUP_ENABLED else None
+    inflight = set()
+    batches = _iter_batches(
+        rows, settings.REINDEX_EMBED_BATCH_SIZE, dedup, inflight, skip
+    )
+    since_checkpoint = 0
+    for docs, vectors, links, last in _embed_in_parallel(
+        batches, settings.REINDEX_WORKERS
+    ):
+        vs.store_chunks(index, docs, vectors, links)
+        inflight.difference_update((shard_no, doc_id) for shard_no, doc_id, _ in docs)
+        state["chunks"] += len(docs)
+        state["duplicates"] = state.get("duplicates", 0) + len(links)
+        since_checkpoint += 1
+        if last is None:
+            continue
+        state["watermark"] = {"updated_at": last[0].isoformat(), "id": last[1]}
+        if since_checkpoint < settings.REINDEX_CHECKPOINT_EVERY:
+            continue
+        since_checkpoint = 0
+        state["updated_at"] = datetime.now(timezone.utc).isoformat()
+        # Chunks still being embedded belong to rows past the watermark.
+        index.commit(exclude=inflight, meta=dict(state) if checkpoint_dir else None)
+        if checkpoint_dir:
+            _write_json(checkpoint_dir / "checkpoint.json", state)
+        print(
+            f"Reindex checkpoint: watermark={state['watermark']}, "
+            f"chunks={state['chunks']}"
+        )
+
+
+def _replay(index: VectorIndex, state: dict, seen: dict, shard: Optional[int]):
+    """
+    Re-indexes every row written after the run's watermark, replacing the
+    record's chunks, so rows changed while the run was streaming end up
+    current. `seen` maps record_ids to the updated_at already replayed,
+    which are skipped. Records deleted since the run started, and not
+    re-uploaded, are removed first.
+    """
+    since = (datetime.fromisoformat(state["started_at"]), 0)
+    changes = [
+        (row["record_id"], [], True)
+        for row in stream_blog_deletions(since=since, absent=True)
+        if row["record_id"] in index.records
+    ]
+    skip = _other_shards(shard)
+    for row in stream_changed_blogs(since=_watermark(state)):
+        if skip is not None and skip(row):
+            continue
+        if seen.get(row["record_id"]) == row["updated_at"]:
+            continue
+        seen[row["record_id"]] = row["updated_at"]
+        docs = vs.split_text_to_documents(row["content"], _row_metadata(row))
+        changes.append((row["record_id"], docs, True))
+        if len(changes) >= settings.REINDEX_EMBED_BATCH_SIZE:
+            state["chunks"] += sum(r["added"] for r in vs.apply_records(index, changes))
+            changes = []
+    if changes:
+        state["chunks"] += sum(r["added"] for r in vs.apply_records(index, changes))
+
+
+# --- Entry points ---
+def reindex(
+    incremental: bool = False, restart: bool = False, shard: Optional[int] = None
+) -> dict:
+    """
+    Rebuilds the vector store from `blogs` and swaps it in atomically.
+
+    A full rebuild checkpoints into a staging directory and resumes from it
+    unless `restart` is set; with `shard`, only that shard is rebuilt and
+    swapped. An incremental run adds rows newer than the last checkpoint
+    that the live store is missing.
+    """
+    if shard is not None and not 0 <= shard < vs.NUM_SHARDS:
+        raise ValueError(f"Shard must be between 0 and {vs.NUM_SHARDS - 1}.")
+    if not _run_lock.acquire(blocking=False):
+        raise RuntimeError("A reindex is already running.")
+    try:
+        if incremental:
+            return _run_incremental()
+        return _run_full(restart, shard)
+    finally:
+        _run_lock.release()
+
+
+def _open_staging(staging_dir, restart: bool, shard: Optional[int]) -> tuple:
+    """
+    Returns the staging index and run state, resuming a partial run if any
+    unless the shard settings have changed since it started.
+    """
+    resumable = (staging_dir / "index").is_dir() and VectorIndex.layout_matches(
+        staging_dir / "index", vs.NUM_SHARDS
+    )
+    if not restart and resumable:
+        index = VectorIndex.load(staging_dir / "index", vs.NUM_SHARDS)
+        if index.meta is not None:
+            print(f"Resuming reindex after {index.meta['watermark']}.")
+            return index, index.meta
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    state = {
+        "mode": "full" if shard is None else "shard",
+        "shard": shard,
+        "watermark": None,
+        "chunks": 0,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+    }
+    index = VectorIndex.create(staging_dir / "index", vs.NUM_SHARDS)
+    if shard is not None and settings.DEDUP_ENABLED:
+        # Chunks repeating another shard's are linked to it, as they are in
+        # the live store, rather than embedded into this one.
+        for key, signature in vs.other_shard_signatures(shard).items():
+            index.dedup.add(key, signature)
+    return index, state
+
+
+def _cross_shard_changes(index: VectorIndex, shard: int) -> tuple[list, list]:
+    """
+    Collects the links between a rebuilt shard and the others, which only
+    the live store can hold. Call with the write lock held.
+
+    Returns ((shard, id), metadata) links from the shard's records into
+    other shards' vectors, and (record_id, docs, True) changes re-indexing
+    the records of other shards that had duplicates linked into the shard's
+    old vectors but no longer match anything. Their duplicates that match a
+    rebuilt vector are linked to it in `index`.
+    """
+    outgoing = {
+        record_id: [key for key in keys if key[0] != shard]
+        for record_id, keys in index.records.link_items()
+    }
+    incoming = {
+        record_id
+        for record_id in vs.records_linked_into(shard)
+        if record_id not in index.records
+    }
+    links, replays, relinks = [], [], []
+    rows = stream_blogs_by_record_id(
+        incoming | {record_id for record_id, keys in outgoing.items() if keys}
+    )
+    for row in rows:
+        metadata = _row_metadata(row)
+        links.extend((key, metadata) for key in outgoing.get(row["record_id"], ()))
+        if row["record_id"] not in incoming:
+            continue
+        docs = vs.split_text_to_documents(row["content"], metadata)
+        matched = _links_into(index.dedup, docs, shard)
+        if matched is None:
+            replays.append((row["record_id"], docs, True))
+        else:
+            relinks.extend(matched)
+    vs.apply_links(index, relinks)
+    return links, replays
+
+
+def _links_into(dedup, docs: list, shard: int) -> Optional[list]:
+    """
+    Returns links from the chunks in `docs` that repeat a vector of `shard`,
+    or None if some chunk no longer matches any stored vector.
+    """
+    links = []
+    for doc in docs:
+        signature = minhash(doc.page_content)
+        if signature is None:
+            continue
+        key = dedup.find(signature)
+        if key is None:
+            return None
+        if key[0] == shard:
+            links.append((key, doc.metadata))
+    return links
+
+
+def _run_full(restart: bool, shard: Optional[int] = None) -> dict:
+    staging_dir = _staging_dir(shard)
+    index, state = _open_staging(staging_dir, restart, shard)
+
+    # Rows written within SETTLE_SECONDS may still be joined by transactions
+    # committing behind them, so the watermark stops short of them.
+    settled = datetime.now(timezone.utc) - timedelta(seconds=SETTLE_SECONDS)
+    rows = stream_changed_blogs(until=settled, since=_watermark(state))
+    _index_rows(index, rows, state, _other_shards(shard), staging_dir)
+
+    # Then replay what was written after the watermark: first unlocked, then
+    # under the write lock for whatever landed meanwhile, swapping before any
+    # further upload can reach the old store. Uploads save their row before
+    # indexing it, so every record in the live store is in the replay.
+    seen = {}
+    _replay(index, state, seen, shard)
+    with vs.writer_lock():
+        _replay(index, state, seen, shard)
+        if shard is None:
+            if settings.DEDUP_ENABLED:
+                # Chunks re-read after a resume were counted twice.
+                index.dedup.recount(index.shards)
+                state["dedup"] = index.dedup.report()
+            vs.swap_vector_store(index)
+        elif settings.DEDUP_ENABLED:
+            links, replays = _cross_shard_changes(index, shard)
+            vs.swap_shard(shard, index.shards[shard], index.dedup, links, replays)
+            state["dedup"] = vs.get_dedup_report()
+        else:
+            vs.swap_shard(shard, index.shards[shard], None)
+        state["completed_at"] = datetime.now(timezone.utc).isoformat()
+        if shard is None:
+            # A single shard's run doesn't vouch for rows in the other shards.
+            _write_json(CHECKPOINT_FILE, state)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    print(f"Reindex complete: {state['chunks']} chunks up to {state['watermark']}.")
+    return state
+
+
+def _add_rows(rows: list[dict], state: dict):
+    results = vs.add_texts_to_store(
+        [(row["content"], _row_metadata(row)) for row in rows]
+    )
+    state["chunks"] += sum(r["added"] for r in results)
+    state["duplicates"] += sum(r["linked"] for r in results)
+    last = rows[-1]
+    state["watermark"] = {
+        "updated_at": last["updated_at"].isoformat(),
+        "id": last["id"],
+    }
+
+
+def _run_incremental() -> dict:
+    """
+    Adds the settled rows newer than the last checkpoint, in batches written
+    like uploads: each is embedded before the write lock is taken, and
+    records the live store already holds are left alone, since uploads add
+    to it themselves.
+    """
+    previous = read_checkpoint() or {}
+    state = {
+        "mode": "incremental",
+        "watermark": previous.get("watermark"),
+        "chunks": 0,
+        "duplicates": 0,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+    }
+    settled = datetime.now(timezone.utc) - timedelta(seconds=SETTLE_SECONDS)
+    batch = []
+    for row in stream_changed_blogs(until=settled, since=_watermark(state)):
+        batch.append(row)
+        if len(batch) >= settings.REINDEX_EMBED_BATCH_SIZE:
+            _add_rows(batch, state)
+            batch = []
+    if batch:
+        _add_rows(batch, state)
+    state["completed_at"] = datetime.now(timezone.utc).isoformat()
+    _write_json(CHECKPOINT_FILE, state)
+    print(
+        f"Incremental reindex added {state['chunks']} chunks "
+        f"up to {state['watermark']}."
+    )
+    return state
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only index rows newer than the last checkpoint.",
+    )
+    mode.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard any partial run and rebuild from scratch.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=int,
+        help="Rebuild only this shard (not combinable with --incremental).",
+    )
+    args = parser.parse_args(argv)
+    if args.incremental and args.shard is not None:
+        parser.error("--shard cannot be combined with --incremental.")
+    result = reindex(
+        incremental=args.incremental, restart=args.restart, shard=args.shard
+    )
+    print(json.dumps(result, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import math
+import time
+
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+from ..core.settings import settings
+from .chunker import graphemes, split_sentences
+from .dedup import normalize
+from .text_utils import estimate_tokens
+from .vector_store import search_candidates
+
+SHINGLE_SIZE = 3
+# Chunks of one record overlap by whole units, so anything shorter than this is
+# more likely a coincidental repeat than a shared span.
+MIN_OVERLAP_CHARS = 20
+GAP_MARKER = " … "
+
+
+def _shingles(text: str) -> set:
+    """Grapheme 3-grams, which match Telugu words across inflected endings."""
+    clusters = graphemes(normalize(text))
+    if not clusters:
+        return set()
+    return {
+        "".join(clusters[i:i + SHINGLE_SIZE])
+        for i in range(max(1, len(clusters) - SHINGLE_SIZE + 1))
+    }
+
+
+def _overlap(a: str, b: str) -> int:
+    """Returns the length of the longest suffix of `a` that begins `b`."""
+    probe = b[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    pos = a.find(probe)
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(probe, pos + 1)
+    return 0
+
+
+def drop_overlaps(docs: list[Document]) -> list[Document]:
+    """
+    Removes text repeated between chunks of the same record: a chunk contained
+    in an earlier one is dropped, and a span shared with an adjacent chunk is
+    cut from whichever chunk ranks lower.
+    """
+    kept = []
+    for doc in docs:
+        text = doc.page_content
+        for earlier in kept:
+            if earlier.metadata.get("record_id") != doc.metadata.get("record_id"):
+                continue
+            if text in earlier.page_content:
+                text = ""
+                break
+            text = text[_overlap(earlier.page_content, text):]
+            cut = _overlap(text, earlier.page_content)
+            if cut:
+                text = text[:-cut]
+        if text.strip():
+            kept.append(Document(page_content=text.strip(), metadata=doc.metadata))
+    return kept
+
+
+def _score(query_shingles: set, sentence: str) -> float:
+    shingles = _shingles(sentence)
+    if not query_shingles or not shingles:
+        return 0.0
+    return len(query_shingles & shingles) / math.sqrt(
+        len(query_shingles) * len(shingles)
+    )
+
+
+def pack_sentences(query: str, docs: list[Document], budget: int) -> list[Document]:
+    """
+    Keeps the sentences most relevant to the query until `budget` estimated
+    tokens are used. Each document's best sentence goes in first so every
+    selected chunk is represented; ties fall back to chunk rank and position.
+    Sentences stay in their original order and skipped runs become a gap marker.
+    """
+    query_shingles = _shingles(query)
+    candidates = []
+    for rank, doc in enumerate(docs):
+        sentences = [s for s in split_sentences(doc.page_content) if s.strip()]
+        scored = [
+            (_score(query_shingles, sentence), rank, pos, sentence)
+            for pos, sentence in enumerate(sentences)
+        ]
+        if scored:
+            best = max(scored, key=lambda c: (c[0], -c[2]))
+            candidates.append((True, *best))
+            candidates.extend((False, *c) for c in scored if c is not best)
+    candidates.sort(key=lambda c: (not c[0], -c[1], c[2], c[3]))
+
+    chosen: dict[int, dict[int, str]] = {}
+    used = 0
+    for _, _, rank, pos, sentence in candidates:
+        tokens = estimate_tokens(sentence)
+        if used + tokens > budget:
+            continue
+        chosen.setdefault(rank, {})[pos] = sentence
+        used += tokens
+
+    packed = []
+    for rank, doc in enumerate(docs):
+        if rank not in chosen:
+            continue
+        parts, previous = [], None
+        for pos in sorted(chosen[rank]):
+            if previous is not None and pos != previous + 1:
+                parts.append(GAP_MARKER)
+            parts.append(chosen[rank][pos].strip() + " ")
+            previous = pos
+        packed.append(
+            Document(page_content="".join(parts).strip(), metadata=doc.metadata)
+        )
+    return packed
+
+
+def _tokens(docs: list[Document]) -> int:
+    return sum(estimate_tokens(doc.page_content) for doc in docs)
+
+
+def retrieve_context(query: str) -> tuple[list[Document], dict]:
+    """
+    Builds the context for a chat answer.
+
+    Over-fetches RETRIEVAL_FETCH_K candidates, picks RETRIEVAL_K of them with
+    maximal marginal relevance, removes spans repeated between chunks of the
+    same record and packs the most query-relevant sentences into
+    CONTEXT_TOKEN_BUDGET. Returns the documents and stats for logging, where
+    `raw_tokens` is what the top RETRIEVAL_K chunks by distance would have cost.
+    """
+    started = time.perf_counter()
+    k = settings.RETRIEVAL_K
+    query_vector, results = search_candidates(
+        query, max(k, settings.RETRIEVAL_FETCH_K), with_vectors=True
+    )
+    stats = {"candidates": len(results), "raw_tokens": 0, "tokens": 0}
+    if not results:
+        stats["ms"] = round((time.perf_counter() - started) * 1000)
+        return [], stats
+
+    stats["raw_tokens"] = _tokens([doc for _, doc, _ in results[:k]])
+    selected = maximal_marginal_relevance(
+        np.array(query_vector, dtype=np.float32),
+        [vector for _, _, vector in results],
+        lambda_mult=settings.RETRIEVAL_MMR_LAMBDA,
+        k=min(k, len(results)),
+    )
+    docs = drop_overlaps([results[i][1] for i in selected])
+    docs = pack_sentences(query, docs, settings.CONTEXT_TOKEN_BUDGET)
+    stats["tokens"] = _tokens(docs)
+    stats["ms"] = round((time.perf_counter() - started) * 1000)
+    return docs, stats
@@ -0,0 +1,52 @@
+import threading
+from pathlib import Path
+
+
+class RunLock:
+    """
+    A lock on a file, so that a job runs once across every worker process
+    and CLI invocation sharing the directory. It mirrors the parts of
+    `threading.Lock` the jobs use: a non-blocking `acquire`, `release` and
+    `locked`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = None
+        self._guard = threading.Lock()
+
+    def acquire(self, blocking: bool = False) -> bool:
+        import fcntl
+
+        with self._guard:
+            if self._file is not None:
+                return False
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            file = open(self.path, "a")
+            try:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(file, flags)
+            except BlockingIOError:
+                file.close()
+                return False
+            self._file = file
+            return True
+
+    def release(self):
+        with self._guard:
+            self._file.close()
+            self._file = None
+
+    def locked(self) -> bool:
+        """Whether the lock is held, by this process or another."""
+        import fcntl
+
+        if self._file is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        return False
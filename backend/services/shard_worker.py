@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from .index_store import ShardStore, read_log, shard_dir
+
+# Each search process owns a single shard and keeps it loaded between queries.
+_loaded = {}
+
+
+def _snapshot_key(path: Path) -> tuple:
+    """
+    Identifies a shard snapshot by its files' inodes and modification times.
+    A new generation hard-links the shards a snapshot left unchanged, so
+    their key stays the same.
+    """
+    return tuple(
+        sorted(
+            (file.name, stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+            for file in path.iterdir()
+            for stat in (file.stat(),)
+        )
+    )
+
+
+def _ensure_loaded(generation_dir: str, shard_no: int, applied: int):
+    """
+    Switches to the shard's snapshot in a new generation, reloading it only
+    if its files changed, then replays the generation's log.
+    """
+    if _loaded.get("generation_dir") != generation_dir:
+        path = shard_dir(Path(generation_dir), shard_no)
+        key = _snapshot_key(path)
+        store = _loaded.get("store")
+        if key != _loaded.get("key") or store is None or store.dirty:
+            store = ShardStore.load(path, mmap=True)
+        store.path = path
+        _loaded.update(generation_dir=generation_dir, key=key, store=store, applied=0)
+    if _loaded["applied"] >= applied:
+        return
+    for number, entry in read_log(Path(generation_dir), _loaded["applied"], applied):
+        ops = entry["shards"].get(shard_no)
+        if ops:
+            _loaded["store"].apply_changes(ops)
+        _loaded["applied"] = number
+
+
+def warm_shard(generation_dir: str, shard_no: int, applied: int):
+    """Loads the shard ahead of the first search of a generation."""
+    _ensure_loaded(generation_dir, shard_no, applied)
+
+
+def search_shard(
+    generation_dir: str,
+    shard_no: int,
+    applied: int,
+    vector: list,
+    k: int,
+    with_vectors: bool = False,
+) -> list[tuple]:
+    """
+    Searches one persisted shard with the first `applied` log entries of its
+    generation replayed; see `ShardStore.search` for the result format.
+    """
+    _ensure_loaded(generation_dir, shard_no, applied)
+    return _loaded["store"].search(vector, k, with_vectors)
@@ -0,0 +1,13 @@
+import sqlite3
+from pathlib import Path
+
+
+def open_snapshot(path: Path) -> sqlite3.Connection:
+    """
+    Opens a SQLite file of an index snapshot read-only. Snapshots are never
+    changed once written, so SQLite can skip locking, and every process
+    reading the file shares one copy of it in the page cache.
+    """
+    return sqlite3.connect(
+        f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False
+    )
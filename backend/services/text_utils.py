@@ -0,0 +1,18 @@
+import math
+
+# Rough token ratios for Gemini models: English averages about four characters
+# per token, while Telugu and other Indic scripts split far more finely.
+ASCII_CHARS_PER_TOKEN = 4
+NON_ASCII_CHARS_PER_TOKEN = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of model tokens in `text` without calling the API."""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    non_ascii_chars = len(text) - ascii_chars
+    return math.ceil(
+        ascii_chars / ASCII_CHARS_PER_TOKEN
+        + non_ascii_chars / NON_ASCII_CHARS_PER_TOKEN
+    )
@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+from ..core.settings import settings
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class ChunkedUploadStore:
+    """
+    Receives resumable uploads as numbered chunks written straight to disk.
+
+    Each upload lives in its own directory holding a manifest and one file per
+    received chunk, so a client can ask which chunks arrived and resend only
+    the rest. Assembly streams the chunks into a single file on disk.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _dir(self, upload_id: str) -> Path:
+        try:
+            uuid.UUID(upload_id)
+        except ValueError as e:
+            raise KeyError(upload_id) from e
+        path = self.root / upload_id
+        if not (path / "manifest.json").is_file():
+            raise KeyError(upload_id)
+        return path
+
+    def _manifest(self, path: Path) -> dict:
+        with open(path / "manifest.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _received(self, path: Path) -> list[int]:
+        return sorted(
+            int(p.name.split("-")[1]) for p in path.glob("chunk-*") if p.is_file()
+        )
+
+    def _status(self, path: Path, manifest: dict) -> dict:
+        if (path / "assembled").is_file():
+            # Assembly removed the chunk files; every chunk arrived.
+            received = list(range(manifest["total_chunks"]))
+        else:
+            received = self._received(path)
+        return {**manifest, "received": received}
+
+    def _write_manifest(self, path: Path, manifest: dict):
+        tmp_path = path / ".manifest.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path / "manifest.json")
+
+    def create(
+        self, filename: str, content_type: str, total_size: int, total_chunks: int
+    ) -> dict:
+        if total_size <= 0 or total_size > settings.UPLOAD_MAX_BYTES:
+            raise ValueError(
+                f"File size must be between 1 and {settings.UPLOAD_MAX_BYTES} bytes."
+            )
+        if total_chunks <= 0 or total_chunks > total_size:
+            raise ValueError("Invalid number of chunks.")
+        self.cleanup_expired()
+
+        upload_id = str(uuid.uuid4())
+        path = self.root / upload_id
+        path.mkdir(parents=True)
+        manifest = {
+            "upload_id": upload_id,
+            "filename": os.path.basename(filename),
+            "content_type": content_type,
+            "total_size": total_size,
+            "total_chunks": total_chunks,
+        }
+        self._write_manifest(path, manifest)
+        return self._status(path, manifest)
+
+    def status(self, upload_id: str) -> dict:
+        path = self._dir(upload_id)
+        return self._status(path, self._manifest(path))
+
+    def write_chunk(self, upload_id: str, index: int, source: BinaryIO) -> dict:
+        """Streams one chunk to disk; resending a chunk replaces it."""
+        path = self._dir(upload_id)
+        manifest = self._manifest(path)
+        if not 0 <= index < manifest["total_chunks"]:
+            raise ValueError(f"Chunk index must be below {manifest['total_chunks']}.")
+
+        tmp_path = path / f".chunk-{index:06d}.tmp"
+        written = 0
+        with open(tmp_path, "wb") as f:
+            while block := source.read(COPY_BUFFER_SIZE):
+                written += len(block)
+                if written > settings.UPLOAD_MAX_CHUNK_BYTES:
+                    f.close()
+                    tmp_path.unlink()
+                    limit = settings.UPLOAD_MAX_CHUNK_BYTES
+                    raise ValueError(f"Chunks may not exceed {limit} bytes.")
+                f.write(block)
+        os.replace(tmp_path, path / f"chunk-{index:06d}")
+        return self._status(path, manifest)
+
+    def assemble(self, upload_id: str) -> tuple[dict, Path]:
+        """Concatenates all chunks into one file and returns it with the manifest."""
+        path = self._dir(upload_id)
+        manifest = self._manifest(path)
+        assembled = path / "assembled"
+        if assembled.is_file() and assembled.stat().st_size == manifest["total_size"]:
+            # Already assembled by an earlier attempt whose processing failed.
+            return manifest, assembled
+        missing = set(range(manifest["total_chunks"])) - set(self._received(path))
+        if missing:
+            raise ValueError(f"Missing chunks: {sorted(missing)}")
+
+        tmp_path = path / ".assembled.tmp"
+        with open(tmp_path, "wb") as out:
+            for index in range(manifest["total_chunks"]):
+                with open(path / f"chunk-{index:06d}", "rb") as chunk:
+                    shutil.copyfileobj(chunk, out, COPY_BUFFER_SIZE)
+        if tmp_path.stat().st_size != manifest["total_size"]:
+            tmp_path.unlink()
+            raise ValueError("Assembled size does not match the declared size.")
+        os.replace(tmp_path, assembled)
+        for chunk in path.glob("chunk-*"):
+            chunk.unlink()
+        return manifest, assembled
+
+    def save_record(self, upload_id: str, record: dict):
+        """Stores the corpus record created for an upload in its manifest."""
+        path = self._dir(upload_id)
+        self._write_manifest(path, {**self._manifest(path), "record": record})
+
+    def discard(self, upload_id: str):
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def cleanup_expired(self):
+        if not self.root.is_dir():
+            return
+        cutoff = time.time() - settings.UPLOAD_TTL
+        for path in self.root.iterdir():
+            if path.is_dir() and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+chunked_uploads = ChunkedUploadStore(settings.UPLOAD_TMP_DIR)
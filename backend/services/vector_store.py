@@ -1,12 +1,26 @@
+import copy
+import multiprocessing
 import os
+import shutil
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Optional
 
 from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-# --- FIX APPLIED HERE: Updated import path ---
-from langchain_community.vectorstores.faiss import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
+from ..core.settings import settings
+from .chunker import split_text
+from .dedup import DedupIndex, link_source, minhash
+from .index_store import ShardStore, VectorIndex
+from .record_index import RecordIndex
+from .shard_worker import search_shard, warm_shard
+
 # --- Configuration ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
@@ -17,40 +31,740 @@ embeddings = GoogleGenerativeAIEmbeddings(
     model="models/embedding-001", google_api_key=GEMINI_API_KEY
 )
 
-vector_store = None
+STORE_DIR = Path(settings.VECTOR_STORE_DIR)
+CURRENT_FILE = STORE_DIR / "CURRENT"
+GENERATION_PREFIX = "gen-"
+KEEP_GENERATIONS = 2
+NUM_SHARDS = max(1, settings.VECTOR_STORE_SHARDS)
+# The log is never folded into a new snapshot before it reaches this size,
+# however small the snapshot.
+SNAPSHOT_MIN_LOG_BYTES = 4 * 1024 * 1024
+
+# With several shards, searches go to one process per shard, so the API
+# process only needs the index on disk and memory-maps it like shared mode.
+DISK_BACKED = settings.VECTOR_STORE_SHARED or NUM_SHARDS > 1
+
+# The live index: the current generation's snapshot with its log replayed.
+live: Optional[VectorIndex] = None
+_loaded_generation = None
+_last_reload_check = 0.0
+_shard_pools = None
+# Per shard, a timed-out search still running in its process. It can't be
+# stopped, so later searches leave the shard out until it finishes rather than
+# queueing behind it.
+_busy_shards = {}
+# Per shard, the load of the live generation into its process. Searches wait
+# for it, so loading isn't counted against SHARD_SEARCH_TIMEOUT.
+_warming = {}
+
+# Serializes writers (uploads, reindex swaps); readers never take it. A file
+# lock extends this across the uvicorn workers and the reindex command line.
+_write_lock = threading.RLock()
+_lock_depth = 0
+_lock_file = None
+# Searches and writes run on different executor threads; both hold this lock
+# while touching the live index so a search never sees a half-applied change.
+live_lock = threading.Lock()
+
+
+# --- Sharding ---
+def shard_for(metadata: dict) -> int:
+    """Returns the shard a chunk belongs to, from a stable hash of its shard key."""
+    key = str(metadata.get(settings.VECTOR_STORE_SHARD_KEY) or "")
+    return zlib.crc32(key.encode("utf-8")) % NUM_SHARDS
+
+
+# --- Persistence ---
+# Each snapshot of the index is an immutable "generation" directory, and every
+# write after it appends an entry to the generation's log (see index_store).
+# The CURRENT file names the live generation and is replaced atomically, so a
+# reader never sees a half-written index.
+def _read_current_generation() -> Optional[str]:
+    try:
+        return CURRENT_FILE.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _next_generation_name() -> str:
+    existing = [
+        int(p.name[len(GENERATION_PREFIX):])
+        for p in STORE_DIR.glob(f"{GENERATION_PREFIX}*")
+        if p.name[len(GENERATION_PREFIX):].isdigit()
+    ]
+    return f"{GENERATION_PREFIX}{max(existing, default=0) + 1:06d}"
+
+
+def _prune_generations(current: str):
+    generations = sorted(
+        p for p in STORE_DIR.glob(f"{GENERATION_PREFIX}*") if p.is_dir()
+    )
+    for path in generations[:-KEEP_GENERATIONS]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def writer_lock():
+    """Holds the write lock, across every process using the store."""
+    global _lock_depth, _lock_file
+    with _write_lock:
+        if _lock_depth == 0:
+            import fcntl
+
+            STORE_DIR.mkdir(parents=True, exist_ok=True)
+            _lock_file = open(STORE_DIR / ".write.lock", "w")
+            fcntl.flock(_lock_file, fcntl.LOCK_EX)
+        _lock_depth += 1
+        try:
+            yield
+        finally:
+            _lock_depth -= 1
+            if _lock_depth == 0 and _lock_file is not None:
+                _lock_file.close()
+                _lock_file = None
+
+
+def _make_current(name: str):
+    tmp_current = STORE_DIR / ".CURRENT.tmp"
+    tmp_current.write_text(name)
+    os.replace(tmp_current, CURRENT_FILE)
+    _prune_generations(name)
+
+
+def _activate(generation: str):
+    """Loads `generation` with its log and makes it the live index."""
+    global live, _loaded_generation
+    index = VectorIndex.load(STORE_DIR / generation, NUM_SHARDS, mmap=DISK_BACKED)
+    with live_lock:
+        live = index
+        _loaded_generation = generation
+    if _shard_pools is not None:
+        _warm_shards(index)
+
+
+def _publish(index: VectorIndex) -> str:
+    """
+    Writes `index` as a new generation with an empty log, makes it current
+    and live. Call with `writer_lock` held.
+    """
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    name = _next_generation_name()
+    tmp_path = STORE_DIR / f".{name}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    index.save(tmp_path)
+    os.replace(tmp_path, STORE_DIR / name)
+    _make_current(name)
+    _activate(name)
+    return name
+
+
+def _refresh():
+    """
+    Brings the live index up to date with the current generation and its
+    log, creating an empty generation if there is none. Call with
+    `writer_lock` held.
+    """
+    generation = _read_current_generation()
+    if not generation or not (STORE_DIR / generation).is_dir():
+        STORE_DIR.mkdir(parents=True, exist_ok=True)
+        generation = _next_generation_name()
+        tmp_path = STORE_DIR / f".{generation}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        VectorIndex.create(tmp_path, NUM_SHARDS)
+        os.replace(tmp_path, STORE_DIR / generation)
+        _make_current(generation)
+    if live is None or generation != _loaded_generation:
+        _activate(generation)
+        return
+    with live_lock:
+        live.catch_up()
 
 
 def initialize_vector_store():
-    """Creates an empty FAISS vector store if one doesn't exist."""
-    global vector_store
-    if vector_store is None:
-        dummy_doc = [Document(page_content="start")]
-        vector_store = FAISS.from_documents(dummy_doc, embeddings)
-        print("In-memory vector store initialized.")
+    """Loads the persisted FAISS index, or creates an empty one if none exists."""
+    if live is not None:
+        return
+    with writer_lock():
+        _refresh()
+    if NUM_SHARDS > 1:
+        _get_shard_pools()
+        _warm_shards(live)
+    print(f"Vector store loaded from {STORE_DIR / _loaded_generation}.")
 
 
-def add_text_to_store(text: str, metadata: dict):
-    """Splits text, creates documents, and adds them to the vector store."""
-    global vector_store
-    if vector_store is None:
-        initialize_vector_store()
-
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    docs = [
-        Document(page_content=chunk, metadata=metadata)
-        for chunk in text_splitter.split_text(text)
+def _maybe_reload():
+    """
+    Picks up the changes and generations written by other processes: other
+    workers, or a reindex run from the command line.
+    """
+    global _last_reload_check
+    now = time.monotonic()
+    if now - _last_reload_check < settings.VECTOR_STORE_RELOAD_INTERVAL:
+        return
+    _last_reload_check = now
+    generation = _read_current_generation()
+    try:
+        if generation and generation != _loaded_generation:
+            _activate(generation)
+            print(f"Vector store reloaded to {generation}.")
+        elif live is not None:
+            with live_lock:
+                live.catch_up()
+    except (OSError, RuntimeError, EOFError, ValueError) as e:
+        # The generation may have been pruned meanwhile, or written with other
+        # shard settings; retry next interval.
+        print(f"Vector store reload failed: {e}")
+
+
+def _snapshot_due(index: VectorIndex) -> bool:
+    threshold = max(
+        SNAPSHOT_MIN_LOG_BYTES,
+        settings.VECTOR_STORE_SNAPSHOT_RATIO * index.snapshot_bytes,
+    )
+    return index.log_bytes >= min(threshold, settings.VECTOR_STORE_MAX_LOG_BYTES)
+
+
+@contextmanager
+def writable_index():
+    """
+    Yields the live index, brought up to date under the write lock, and logs
+    the changes made to it as one entry. Change it while holding `live_lock`.
+    If the body fails, the unlogged changes are discarded by reloading the
+    index. Once the log outgrows VECTOR_STORE_SNAPSHOT_RATIO of the snapshot
+    or VECTOR_STORE_MAX_LOG_BYTES, it is folded into a new generation.
+    """
+    with writer_lock():
+        _refresh()
+        try:
+            yield live
+            with live_lock:
+                live.commit()
+        except BaseException:
+            _activate(_loaded_generation)
+            raise
+        if _snapshot_due(live):
+            name = _publish(live)
+            print(f"Vector store snapshot written to {STORE_DIR / name}.")
+
+
+def swap_vector_store(index: VectorIndex):
+    """Publishes a rebuilt index and makes it live."""
+    with writer_lock():
+        name = _publish(index)
+    print(f"Vector store swapped to the rebuilt index {name}.")
+
+
+def other_shard_signatures(shard_no: int) -> dict:
+    """Returns the live near-duplicate signatures of every shard but one."""
+    with writer_lock():
+        _refresh()
+        return {
+            key: signature
+            for key, signature in live.dedup.items()
+            if key[0] != shard_no
+        }
+
+
+def records_linked_into(shard_no: int) -> set:
+    """
+    Returns the records with near-duplicate chunks linked into vectors of
+    `shard_no`. Call with `writer_lock` held.
+    """
+    _refresh()
+    return {
+        record_id
+        for record_id, keys in live.records.link_items()
+        if any(key[0] == shard_no for key in keys)
+    }
+
+
+def swap_shard(
+    shard_no: int,
+    store: ShardStore,
+    dedup: Optional[DedupIndex],
+    links: list = (),
+    replays: list = (),
+):
+    """
+    Publishes the live index with one shard replaced by a rebuilt store and,
+    when given, that shard's near-duplicate signatures by `dedup`'s. The
+    rebuilt shard's ((shard, id), metadata) links into other shards are
+    merged into those vectors, and `replays` are applied as `apply_records`
+    changes before the index is published.
+    """
+    with writer_lock():
+        _refresh()
+        shards = list(live.shards)
+        shards[shard_no] = store
+        merged = live.dedup
+        if dedup is not None:
+            for key in [key for key, _ in merged.items() if key[0] == shard_no]:
+                merged.remove(key)
+            for key, signature in dedup.items():
+                if key[0] == shard_no:
+                    merged.add(key, signature)
+        try:
+            index = VectorIndex(
+                live.path,
+                NUM_SHARDS,
+                shards=shards,
+                dedup=merged,
+                records=RecordIndex.from_stores(shards),
+            )
+            with live_lock:
+                store_chunks(index, [], [], list(links))
+            apply_records(index, list(replays), live_lock)
+            # Counts added from the rebuild would repeat those of the chunks
+            # it replaced, so they are recomputed from the stores instead.
+            merged.recount(shards)
+            name = _publish(index)
+        except BaseException:
+            _activate(_loaded_generation)
+            raise
+    print(f"Vector store swapped to rebuilt shard {shard_no} in {name}.")
+
+
+# --- Chunking ---
+def split_text_to_documents(text: str, metadata: dict) -> list[Document]:
+    """Splits text into chunk documents that share the given metadata."""
+    return [
+        Document(page_content=chunk, metadata=dict(metadata))
+        for chunk in split_text(text)
     ]
 
-    vector_store.add_documents(docs)
+
+def deduplicate(
+    docs: list[Document], dedup: Optional[DedupIndex]
+) -> tuple[list[tuple], list[tuple]]:
+    """
+    Assigns each chunk a shard and id, and separates out near-duplicates.
+
+    Returns (shard, id, doc) for chunks that need embedding, and
+    ((shard, id), metadata) links from duplicates to the vector they repeat.
+    Unique chunks are added to `dedup` straight away so that repeats within
+    the same batch are caught too.
+    """
+    new_docs, links = [], []
+    for doc in docs:
+        key = (shard_for(doc.metadata), str(uuid.uuid4()))
+        if dedup is not None:
+            signature = minhash(doc.page_content)
+            match = dedup.find(signature) if signature is not None else None
+            dedup.record(doc.page_content, duplicate=match is not None)
+            if match is not None:
+                links.append((match, doc.metadata))
+                continue
+            if signature is not None:
+                dedup.add(key, signature)
+        new_docs.append((*key, doc))
+    return new_docs, links
+
+
+def _put_metadata(store: ShardStore, doc_id, doc: Document, metadata: dict):
+    """Stores a copy of a chunk with new metadata, rather than changing it in place."""
+    store.put(doc_id, Document(page_content=doc.page_content, metadata=metadata))
+
+
+def apply_links(index: VectorIndex, links: list[tuple]):
+    """Merges duplicate chunks' source metadata into the vectors they repeat."""
+    for (shard_no, doc_id), source_metadata in links:
+        store = index.shards[shard_no]
+        target = store.get(doc_id)
+        if target is None:
+            continue
+        metadata = copy.deepcopy(target.metadata)
+        link_source(metadata, source_metadata)
+        if metadata != target.metadata:
+            _put_metadata(store, doc_id, target, metadata)
+
+
+def store_chunks(index: VectorIndex, docs: list[tuple], vectors: list, links: list):
+    """
+    Adds embedded (shard, id, doc) chunks to their shards, merges the
+    ((shard, id), metadata) links of near-duplicates into the vectors they
+    repeat, and maps both to their records.
+    """
+    by_shard = {}
+    for (shard_no, doc_id, doc), vector in zip(docs, vectors):
+        by_shard.setdefault(shard_no, []).append((doc_id, doc, vector))
+    for shard_no, items in by_shard.items():
+        index.shards[shard_no].add(items)
+    apply_links(index, links)
+    for shard_no, doc_id, doc in docs:
+        if doc.metadata.get("record_id") is not None:
+            index.records.add_chunk(doc.metadata["record_id"], (shard_no, doc_id))
+    for key, source_metadata in links:
+        if source_metadata.get("record_id") is not None:
+            index.records.add_link(source_metadata["record_id"], key)
+
+
+def _without_source(doc: Document, record_id: str) -> list[dict]:
+    return [
+        source
+        for source in doc.metadata.get("duplicate_sources", [])
+        if str(source.get("record_id")) != record_id
+    ]
+
+
+def _hand_over(index: VectorIndex, key: tuple, doc: Document, sources: list):
+    """
+    Hands a chunk over to the first of the records linked to it, taking that
+    record's metadata and, if it belongs to another shard, moving its vector
+    there. The other sources stay linked.
+    """
+    shard_no, doc_id = key
+    owner = sources[0]["record_id"]
+    new_doc = Document(
+        page_content=doc.page_content,
+        metadata={**sources[0], "duplicate_sources": sources[1:]},
+    )
+    target = shard_for(new_doc.metadata)
+    if target == shard_no:
+        index.shards[shard_no].put(doc_id, new_doc)
+        index.records.transfer(key, owner)
+        return
+    new_key = (target, doc_id)
+    index.shards[target].add([(doc_id, new_doc, index.shards[shard_no].vector(doc_id))])
+    index.shards[shard_no].delete([doc_id])
+    index.records.move(key, new_key)
+    index.records.transfer(new_key, owner)
+    signature = index.dedup.signature(key) if settings.DEDUP_ENABLED else None
+    if signature is not None:
+        index.dedup.remove(key)
+        index.dedup.add(new_key, signature)
+
+
+def _tombstone(index: VectorIndex, record_id: str, chunks: set, links: set) -> int:
+    """
+    Removes a record's chunks from the docstores, leaving their vectors as
+    tombstones until the next snapshot. A chunk that other records'
+    duplicates were linked to is handed over to the first of them instead of
+    being removed. Returns the number of chunks removed.
+    """
+    for shard_no, doc_id in links:
+        store = index.shards[shard_no]
+        target = store.get(doc_id)
+        if target is not None:
+            metadata = {
+                **target.metadata,
+                "duplicate_sources": _without_source(target, record_id),
+            }
+            _put_metadata(store, doc_id, target, metadata)
+    removed = {}
+    for shard_no, doc_id in chunks:
+        doc = index.shards[shard_no].get(doc_id)
+        if doc is None:
+            continue
+        sources = _without_source(doc, record_id)
+        if sources:
+            _hand_over(index, (shard_no, doc_id), doc, sources)
+        else:
+            removed.setdefault(shard_no, []).append(doc_id)
+    for shard_no, doc_ids in removed.items():
+        index.shards[shard_no].delete(doc_ids)
+    return sum(len(doc_ids) for doc_ids in removed.values())
+
+
+def _plan_records(index: VectorIndex, changes: list[tuple]) -> list[tuple]:
+    """
+    Forgets the records a change replaces and deduplicates the new chunks.
+    An add for a record the index already holds is skipped, so an upload
+    that a reindex has picked up from `blogs` isn't indexed twice.
+    """
+    records = index.records
+    dedup = index.dedup if settings.DEDUP_ENABLED else None
+    plans = []
+    for record_id, docs, replace in changes:
+        record_id = None if record_id is None else str(record_id)
+        old_chunks, old_links = set(), set()
+        if record_id is not None and record_id in records:
+            if not replace:
+                plans.append((record_id, old_chunks, old_links, [], []))
+                continue
+            old_chunks, old_links = records.pop(record_id)
+        if dedup is not None:
+            # Chunks nobody else links to are going away; drop their
+            # signatures so the new text isn't matched against them.
+            for key in old_chunks:
+                if not records.linked_to(key):
+                    dedup.remove(key)
+        new_docs, links = deduplicate(docs, dedup)
+        plans.append((record_id, old_chunks, old_links, new_docs, links))
+    return plans
+
+
+def apply_records(
+    index: VectorIndex, changes: list[tuple], lock=None, vectors: Optional[dict] = None
+) -> list[dict]:
+    """
+    Applies (record_id, docs, replace) changes to `index`, embedding every
+    new chunk in one pass. With `replace`, the record's current chunks are
+    tombstoned first; then its `docs` are deduplicated, embedded and added.
+    `vectors` maps chunk texts already embedded to their vectors. The index
+    itself is only touched while holding `lock`, if given. Returns one
+    result per change.
+    """
+    with lock or nullcontext():
+        plans = _plan_records(index, changes)
+    all_new = [item for plan in plans for item in plan[3]]
+    all_links = [link for plan in plans for link in plan[4]]
+    vectors = dict(vectors or {})
+    missing = [d.page_content for _, _, d in all_new if d.page_content not in vectors]
+    missing = list(dict.fromkeys(missing))
+    if missing:
+        vectors.update(zip(missing, embeddings.embed_documents(missing)))
+    results = []
+    with lock or nullcontext():
+        for record_id, old_chunks, old_links, new_docs, links in plans:
+            removed = _tombstone(index, record_id, old_chunks, old_links)
+            results.append(
+                {
+                    "record_id": record_id,
+                    "added": len(new_docs),
+                    "linked": len(links),
+                    "removed": removed,
+                    "reassigned": len(old_chunks) - removed,
+                    "unlinked": len(old_links),
+                }
+            )
+        store_chunks(
+            index, all_new, [vectors[d.page_content] for _, _, d in all_new], all_links
+        )
+    return results
+
+
+def _likely_new_texts(changes: list[tuple]) -> list[str]:
+    """
+    Returns the texts of the chunks in `changes` that match no chunk of the
+    live index as it stands, ignoring a replaced record's own chunks; these
+    will most likely need embedding. Reads the index without the write lock.
+    """
+    initialize_vector_store()
+    index = live
+    dedup_enabled = settings.DEDUP_ENABLED
+    signatures = [
+        [(doc, minhash(doc.page_content) if dedup_enabled else None) for doc in docs]
+        for _, docs, _ in changes
+    ]
+    texts = []
+    with live_lock:
+        dedup = index.dedup if dedup_enabled else None
+        for (record_id, _, replace), docs in zip(changes, signatures):
+            own = set()
+            if record_id is not None and str(record_id) in index.records:
+                if not replace:
+                    continue
+                own = index.records.chunks_of(record_id)
+            for doc, signature in docs:
+                if signature is None or dedup.find(signature, own) is None:
+                    texts.append(doc.page_content)
+    return list(dict.fromkeys(texts))
+
+
+def _write_records(changes: list[tuple]) -> list[dict]:
+    """
+    Applies `apply_records` changes to the live index as one log entry. The
+    chunks likely to need embedding are embedded before the write lock is
+    taken, so other writers don't wait on the embedding API; the changes are
+    then planned again under the lock, and only chunks a concurrent write
+    left unmatched are embedded there.
+    """
+    texts = _likely_new_texts(changes)
+    vectors = dict(zip(texts, embeddings.embed_documents(texts))) if texts else {}
+    with writable_index() as index:
+        return apply_records(index, changes, live_lock, vectors)
+
+
+def _write_record(record_id, docs: list[Document], replace: bool) -> dict:
+    return _write_records([(record_id, docs, replace)])[0]
+
+
+def add_text_to_store(text: str, metadata: dict):
+    """
+    Splits text, skips chunks that nearly duplicate indexed ones (linking
+    their source instead), adds the rest to their shard and persists it.
+    """
+    docs = split_text_to_documents(text, metadata)
+    result = _write_record(metadata.get("record_id"), docs, replace=False)
+    if not result["added"] and not result["linked"]:
+        return
+    print(
+        f"Added {result['added']} document chunks to the vector store for record: "
+        f"{metadata.get('record_id')} ({result['linked']} near-duplicates linked "
+        "instead of embedded)"
+    )
+
+
+def add_texts_to_store(items: list[tuple[str, dict]]) -> list[dict]:
+    """
+    Adds several (text, metadata) documents like `add_text_to_store`, but with
+    one embedding pass and one published generation for all of them.
+    """
+    results = _write_records(
+        [
+            (metadata.get("record_id"), split_text_to_documents(text, metadata), False)
+            for text, metadata in items
+        ]
+    )
+    added = sum(r["added"] for r in results)
+    linked = sum(r["linked"] for r in results)
     print(
-        f"Added {len(docs)} document chunks to the vector store for record: {metadata.get('record_id')}"
+        f"Added {added} document chunks for {len(items)} records"
+        f" ({linked} near-duplicates linked instead of embedded)"
     )
+    return results
+
+
+def upsert_record(record_id: str, text: str, metadata: dict) -> dict:
+    """
+    Replaces a record's chunks with those of `text`. The old vectors become
+    tombstones, which searches skip until `compact_vector_store` drops them.
+    """
+    metadata = {**metadata, "record_id": record_id}
+    docs = split_text_to_documents(text, metadata)
+    result = _write_record(record_id, docs, replace=True)
+    print(
+        f"Upserted record {record_id}: {result['added']} chunks added, "
+        f"{result['removed']} removed, {result['reassigned']} kept for duplicates."
+    )
+    return result
+
+
+def delete_record(record_id: str) -> dict:
+    """Tombstones a record's chunks and unlinks it from chunks it duplicated."""
+    result = _write_record(record_id, [], replace=True)
+    print(
+        f"Deleted record {record_id}: {result['removed']} chunks removed, "
+        f"{result['reassigned']} kept for duplicates."
+    )
+    return result
+
+
+# --- Compaction ---
+def compact_vector_store(force: bool = False) -> dict:
+    """
+    Writes a new snapshot when some shard's tombstones exceed
+    VECTOR_STORE_COMPACT_RATIO of its vectors (any tombstones with `force`);
+    snapshots leave tombstoned vectors out.
+    """
+    with writer_lock():
+        _refresh()
+        wanted = [
+            i
+            for i, store in enumerate(live.shards)
+            if store.dead
+            and (
+                force
+                or store.dead >= settings.VECTOR_STORE_COMPACT_RATIO * store.ntotal
+            )
+        ]
+        removed = sum(store.dead for store in live.shards) if wanted else 0
+        if wanted:
+            _publish(live)
+            print(f"Compacted shards {wanted}: {removed} tombstoned vectors dropped.")
+    return {"shards": wanted, "removed": removed}
+
+
+def get_dedup_report() -> dict:
+    """Returns duplicate counts and the embedding tokens saved so far."""
+    initialize_vector_store()
+    with live_lock:
+        return live.dedup.report()
 
 
-def search_store(query: str) -> list[Document]:
-    """Searches the vector store for documents similar to the query."""
-    global vector_store
-    if vector_store is None:
-        return []
+# --- Search ---
+def _get_shard_pools() -> list[ProcessPoolExecutor]:
+    global _shard_pools
+    if _shard_pools is None:
+        context = multiprocessing.get_context("spawn")
+        _shard_pools = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context)
+            for _ in range(NUM_SHARDS)
+        ]
+    return _shard_pools
+
+
+def _warm_shards(index: VectorIndex):
+    """Has every shard process load its shard of `index` before it is searched."""
+    for i, pool in enumerate(_shard_pools):
+        _warming[i] = pool.submit(warm_shard, str(index.path), i, index.applied)
+
+
+def _scatter_search(
+    index: VectorIndex, vector: list, k: int, with_vectors: bool
+) -> list[tuple]:
+    """
+    Searches every shard in its own process, skipping shards that time out
+    or are still busy with a search that timed out earlier. Shards still
+    loading a new generation are waited for before the timeout starts.
+    """
+    shards = []
+    for i, pool in enumerate(_get_shard_pools()):
+        busy = _busy_shards.get(i)
+        if busy is not None and not busy.done():
+            print(f"Shard {i} is busy; results are partial.")
+            continue
+        shards.append((i, pool))
+    wait([_warming[i] for i, _ in shards if i in _warming])
+    futures = {}
+    for i, pool in shards:
+        future = pool.submit(
+            search_shard, str(index.path), i, index.applied, vector, k, with_vectors
+        )
+        futures[future] = i
+    done, not_done = wait(futures, timeout=settings.SHARD_SEARCH_TIMEOUT)
+    for future in not_done:
+        # A running search can't be cancelled; mark its shard busy instead.
+        if not future.cancel():
+            _busy_shards[futures[future]] = future
+        print(f"Shard {futures[future]} search timed out; results are partial.")
+    results = []
+    for future in done:
+        try:
+            results.extend(future.result())
+        except Exception as e:
+            print(f"Shard {futures[future]} search failed: {e}")
+    return results
+
+
+def _local_search(
+    index: VectorIndex, vector: list, k: int, with_vectors: bool
+) -> list[tuple]:
+    results = []
+    with live_lock:
+        for store in index.shards:
+            results.extend(store.search(vector, k, with_vectors))
+    return results
+
+
+def search_candidates(
+    query: str, k: int, with_vectors: bool = False
+) -> tuple[list, list[tuple]]:
+    """
+    Searches all shards and merges the top k.
+
+    Returns the query embedding and (distance, document, vector) tuples, where
+    the vector is the stored chunk embedding if `with_vectors` is set.
+    """
+    _maybe_reload()
+    index = live
+    if index is None:
+        return [], []
+
+    vector = embeddings.embed_query(query)
+    if NUM_SHARDS > 1:
+        results = _scatter_search(index, vector, k, with_vectors)
+    else:
+        results = _local_search(index, vector, k, with_vectors)
+    results.sort(key=lambda r: r[0])
+    return vector, [
+        (distance, Document(page_content=text, metadata=metadata), embedding)
+        for distance, text, metadata, embedding in results[:k]
+    ]
+
 
-    return vector_store.similarity_search(query, k=3)
+def search_store(query: str, k: int = 3) -> list[Document]:
+    """Searches all shards for documents similar to the query and merges the top k."""
+    _, results = search_candidates(query, k)
+    return [doc for _, doc, _ in results]
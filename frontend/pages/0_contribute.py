@@ -1,14 +1,127 @@
+import hashlib
+import io
+import math
 import os
+import time
+
 import requests
 import streamlit as st
-from requests_toolbelt.multipart.encoder import MultipartEncoder
+from PIL import Image, ImageOps
 
 # --- Configuration ---
 BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
 UPLOAD_ENDPOINT = f"{BACKEND_URL}/upload/"
+CHUNKED_UPLOAD_ENDPOINT = f"{BACKEND_URL}/upload/chunked/"
 CATEGORIES_ENDPOINT = f"{BACKEND_URL}/categories/"
 
-# --- Helper Function ---
+# Photos are downscaled before upload: OCR reads printed Telugu well at this
+# size, and full-resolution camera captures only cost upload time.
+MAX_IMAGE_SIDE = 2000
+JPEG_QUALITY = 85
+# Files are sent in chunks so a dropped connection only repeats one chunk.
+CHUNK_SIZE = 512 * 1024
+CHUNK_RETRIES = 3
+
+
+# --- Helper Functions ---
+@st.cache_resource
+def get_http_session():
+    """One HTTP session for the page, so chunk requests reuse connections."""
+    return requests.Session()
+
+
+def prepare_image(filename, data, content_type):
+    """Downscales and re-encodes an image for OCR, keeping it if that's smaller."""
+    try:
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    except Exception:
+        return filename, data, content_type
+    image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    if buffer.tell() >= len(data):
+        return filename, data, content_type
+    stem = os.path.splitext(filename)[0] or "capture"
+    return f"{stem}.jpg", buffer.getvalue(), "image/jpeg"
+
+
+def put_chunk(session, url, index, chunk, headers):
+    """
+    Sends one chunk, retrying with backoff on connection errors, timeouts
+    and 5xx responses.
+    """
+    for attempt in range(CHUNK_RETRIES):
+        try:
+            response = session.put(
+                f"{url}/{index}",
+                files={"chunk": (f"chunk-{index}", chunk, "application/octet-stream")},
+                headers=headers,
+                timeout=60,
+            )
+            if response.status_code < 500:
+                response.raise_for_status()
+                return
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            # Slow mobile links mostly fail with a read timeout.
+            pass
+        time.sleep(2**attempt)
+    raise requests.exceptions.RequestException(f"Chunk {index} failed after retries.")
+
+
+def chunked_upload(filename, data, content_type, fields, headers, progress):
+    """
+    Uploads `data` in chunks and then submits the record details.
+
+    The upload id is remembered per file content, so submitting the same file
+    again after a failure resumes with the chunks the backend is missing.
+    """
+    session = get_http_session()
+    digest = hashlib.sha256(data).hexdigest()
+    pending = st.session_state.setdefault("pending_uploads", {})
+
+    status = None
+    if digest in pending:
+        response = session.get(
+            f"{CHUNKED_UPLOAD_ENDPOINT}{pending[digest]}", headers=headers
+        )
+        if response.status_code == 200:
+            status = response.json()
+    if status is None:
+        response = session.post(
+            CHUNKED_UPLOAD_ENDPOINT,
+            data={
+                "filename": filename,
+                "content_type": content_type,
+                "total_size": len(data),
+                "total_chunks": max(1, math.ceil(len(data) / CHUNK_SIZE)),
+            },
+            headers=headers,
+        )
+        response.raise_for_status()
+        status = response.json()
+        pending[digest] = status["upload_id"]
+
+    upload_url = f"{CHUNKED_UPLOAD_ENDPOINT}{status['upload_id']}"
+    received = set(status["received"])
+    total_chunks = status["total_chunks"]
+    for index in range(total_chunks):
+        if index not in received:
+            chunk = data[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+            put_chunk(session, upload_url, index, chunk, headers)
+        progress.progress(
+            (index + 1) / total_chunks,
+            text=f"Uploaded {index + 1} of {total_chunks} parts",
+        )
+
+    progress.progress(1.0, text="Processing your document...")
+    response = session.post(f"{upload_url}/complete", data=fields, headers=headers)
+    if response.status_code == 200:
+        pending.pop(digest, None)
+    return response
+
+
 @st.cache_data
 def fetch_categories():
     """Fetches the list of categories from our backend."""
@@ -101,23 +214,28 @@ else:
                                     UPLOAD_ENDPOINT, data=text_file, headers={"Authorization": f"Bearer {token}"}
                                 )
                             else:
-                                m = MultipartEncoder(
+                                filename, data, content_type = (
+                                    final_file.name,
+                                    final_file.getvalue(),
+                                    final_file.type,
+                                )
+                                if content_type.startswith("image/"):
+                                    filename, data, content_type = prepare_image(
+                                        filename, data, content_type
+                                    )
+
+                                response = chunked_upload(
+                                    filename,
+                                    data,
+                                    content_type,
                                     fields={
                                         "title": title,
                                         "category_id": category_id,
                                         "release_rights": release_rights,
                                         "language": language,
-                                        "file": (final_file.name, final_file.getvalue(), final_file.type),
-                                    }
-                                )
-
-                                headers = {
-                                    "Authorization": f"Bearer {token}",
-                                    "Content-Type": m.content_type,
-                                }
-
-                                response = requests.post(
-                                    UPLOAD_ENDPOINT, data=m, headers=headers
+                                    },
+                                    headers={"Authorization": f"Bearer {token}"},
+                                    progress=st.progress(0.0, text="Starting upload..."),
                                 )
 
                             if response.status_code == 200:
@@ -1,5 +1,5 @@
 import streamlit as st
-import google.generativeai as genai
+import requests
 import os
 
 # --- Custom CSS for professional styling ---
@@ -47,32 +47,16 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# --- 1. Configure the Google Generative AI API Key ---
-try:
-    api_key = st.secrets["GOOGLE_API_KEY"]
-except KeyError:
-    st.error("API Key not found. Please set `GOOGLE_API_KEY` in `secrets.toml`.")
-    st.stop()
+# --- 1. Backend Configuration ---
+BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
+CHAT_ENDPOINT = f"{BACKEND_URL}/chat/"
 
-genai.configure(api_key=api_key)
 
-# --- 2. Initialize the Gemini Model with a System Instruction ---
-model_name = "gemini-1.5-flash"
-# FIX: The system instruction is rephrased to be less restrictive, allowing the model
-# to answer questions about a wider range of Telugu literary figures and topics.
-system_instruction = (
-    "You are a helpful and knowledgeable chatbot specialized in Telugu literature. "
-    "Your name is 'Sahitya Sreshta' (సాహిత్య శ్రేష్ఠ). "
-    "You can answer questions related to Telugu literature, poetry, famous authors, and literary works. "
-    "Provide a detailed and comprehensive answer to each question. "
-    "Your responses must be in conversational Telugu. "
-    "For example: 'తెలుగు కవిత్వ పితామహుడు అల్లసాని పెద్దన.' "
-    "If a question is not about Telugu literature, politely and conversationally respond in Telugu that you can only answer questions about that topic."
-)
-model = genai.GenerativeModel(
-    model_name=model_name,
-    system_instruction=system_instruction,
-)
+# --- 2. Reuse one HTTP session (and its connections) across reruns ---
+@st.cache_resource
+def get_http_session():
+    return requests.Session()
+
 
 # --- 3. Set a descriptive page title and icon ---
 st.set_page_config(
@@ -105,9 +89,19 @@ if prompt := st.chat_input("మీ ప్రశ్న ఇక్కడ టైప
 
     try:
         with st.spinner("సాహిత్య శ్రేష్ఠ స్పందిస్తోంది..."):
-            chat = model.start_chat()
-            response = chat.send_message(prompt)
-            bot_response = response.text
+            # The backend keeps the conversation history for this session id.
+            response = get_http_session().post(
+                CHAT_ENDPOINT,
+                json={
+                    "query": prompt,
+                    "session_id": st.session_state.get("chat_session_id"),
+                },
+                timeout=120,
+            )
+            response.raise_for_status()
+            data = response.json()
+            st.session_state.chat_session_id = data["session_id"]
+            bot_response = data["answer"]
     except Exception as e:
         bot_response = f"క్షమించండి, మీ అభ్యర్థనను ప్రాసెస్ చేయడంలో ఒక లోపం జరిగింది: {e}"
 
@@ -0,0 +1,41 @@
+import os
+import random
+import shutil
+import tempfile
+
+import pytest
+
+# The services read their settings at import time; the vector store only
+# needs a key to build its (unused here) embeddings client.
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("VECTOR_STORE_DIR", tempfile.mkdtemp(prefix="vector_store_"))
+
+LETTERS = "అఆఇఈఉఊకఖగఘచఛజఝటఠడఢణతథదధనపఫబభమయరలవశషసహ"
+
+
+def telugu_text(seed: int, words: int = 60) -> str:
+    """Returns random Telugu-script text, the same for the same seed."""
+    rng = random.Random(seed)
+    return " ".join(
+        "".join(rng.choice(LETTERS) for _ in range(rng.randint(2, 6)))
+        for _ in range(words)
+    )
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """
+    The vector store module, on an empty directory and with deterministic
+    fake embeddings in place of Gemini's.
+    """
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+
+    from backend.services import vector_store
+
+    shutil.rmtree(vector_store.STORE_DIR, ignore_errors=True)
+    monkeypatch.setattr(vector_store, "embeddings", DeterministicFakeEmbedding(size=16))
+    monkeypatch.setattr(vector_store, "live", None)
+    monkeypatch.setattr(vector_store, "_loaded_generation", None)
+    vector_store.initialize_vector_store()
+    yield vector_store
+    shutil.rmtree(vector_store.STORE_DIR, ignore_errors=True)
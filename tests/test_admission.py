@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.services.admission import AdmissionLimiter
+
+
+async def _hold(limiter: AdmissionLimiter, release: asyncio.Event):
+    async with limiter:
+        await release.wait()
+
+
+async def _until(condition):
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("condition not reached")
+
+
+def test_requests_beyond_the_limit_wait_for_a_slot():
+    async def main():
+        limiter = AdmissionLimiter("chat", 1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        first = asyncio.create_task(_hold(limiter, release))
+        await _until(lambda: limiter.active == 1)
+        second = asyncio.create_task(_hold(limiter, release))
+        await _until(lambda: limiter.waiting == 1)
+        assert limiter.stats()["active"] == 1
+        release.set()
+        await asyncio.gather(first, second)
+        assert limiter.stats()["active"] == 0
+        assert limiter.stats()["rejected"] == 0
+
+    asyncio.run(main())
+
+
+def test_a_full_queue_rejects_with_429():
+    async def main():
+        limiter = AdmissionLimiter("upload", 1, max_queue=0, queue_timeout=5)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(limiter, release))
+        await _until(lambda: limiter.active == 1)
+        with pytest.raises(HTTPException) as error:
+            async with limiter:
+                pass
+        assert error.value.status_code == 429
+        assert "Retry-After" in error.value.headers
+        release.set()
+        await holder
+        return limiter
+
+    assert asyncio.run(main()).stats()["rejected"] == 1
+
+
+def test_waiting_past_the_timeout_rejects_with_503():
+    async def main():
+        limiter = AdmissionLimiter("chat", 1, max_queue=1, queue_timeout=0.01)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(limiter, release))
+        await _until(lambda: limiter.active == 1)
+        with pytest.raises(HTTPException) as error:
+            async with limiter:
+                pass
+        assert error.value.status_code == 503
+        assert limiter.stats()["waiting"] == 0
+        release.set()
+        await holder
+        # The slot is free again once the holder leaves.
+        async with limiter:
+            assert limiter.stats()["active"] == 1
+
+    asyncio.run(main())
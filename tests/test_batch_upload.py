@@ -0,0 +1,172 @@
+import asyncio
+import io
+import json
+import zipfile
+
+import pytest
+
+# The pipeline imports the OCR module, which needs PyMuPDF and Pillow.
+pytest.importorskip("fitz")
+pytest.importorskip("PIL")
+
+from backend.services import batch_upload  # noqa: E402
+from backend.services.batch_upload import BatchJobs  # noqa: E402
+
+DEFAULTS = {"category_id": "poetry", "release_rights": "creator"}
+
+
+def _archive(files: dict) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def _texts(count: int) -> list:
+    return [
+        (f"poem{i}.txt", "text/plain", io.BytesIO(f"పద్యం {i}".encode("utf-8")))
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch) -> BatchJobs:
+    jobs = BatchJobs(str(tmp_path))
+    monkeypatch.setattr(batch_upload, "batch_jobs", jobs)
+    return jobs
+
+
+class Corpus:
+    """Stands in for the corpus API, `blogs` and the vector store."""
+
+    def __init__(self):
+        self.registered = []
+        self.rows = []
+        self.groups = []
+
+    async def get_current_user_id(self):
+        return "user-1"
+
+    async def upload_chunk(self, file_obj, upload_uuid, filename, content_type):
+        file_obj.read()
+
+    async def finalize_record(self, **kwargs):
+        self.registered.append(kwargs["filename"])
+        return {"id": f"rec-{len(self.registered)}"}
+
+    def insert_blogs(self, rows):
+        self.rows.extend(rows)
+
+    def add_texts_to_store(self, items):
+        self.groups.append([metadata["record_id"] for _, metadata in items])
+        return [{"added": 1, "linked": 0} for _ in items]
+
+
+@pytest.fixture
+def corpus(monkeypatch) -> Corpus:
+    corpus = Corpus()
+    for name in (
+        "get_current_user_id",
+        "upload_chunk",
+        "finalize_record",
+        "insert_blogs",
+        "add_texts_to_store",
+    ):
+        monkeypatch.setattr(batch_upload, name, getattr(corpus, name))
+    monkeypatch.setattr(batch_upload, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(
+        batch_upload, "clean_texts", lambda texts: [t.upper() for t in texts]
+    )
+    monkeypatch.setattr(batch_upload.settings, "BATCH_INDEX_SIZE", 2)
+    return corpus
+
+
+def test_an_archive_is_staged_with_its_manifest(jobs):
+    manifest = {
+        "defaults": DEFAULTS,
+        "files": [{"filename": "a.txt", "title": "Title A"}],
+    }
+    archive = _archive(
+        {
+            "poems/a.txt": "a",
+            "poems/b.txt": "b",
+            "notes.doc": "c",
+            "manifest.json": json.dumps(manifest),
+            "__MACOSX/._a.txt": "",
+        }
+    )
+    job = jobs.create([], archive=archive)
+    items = {item.filename: item for item in job.items}
+    assert set(items) == {"a.txt", "b.txt", "notes.doc"}
+    assert items["a.txt"].metadata == {**DEFAULTS, "title": "Title A"}
+    assert items["b.txt"].metadata["title"] == "b"
+    assert items["notes.doc"].status == "skipped"
+    assert jobs.get(job.id)["status"] == "running"
+    jobs.finish(job)
+
+
+def test_files_without_required_metadata_fail_up_front(jobs):
+    job = jobs.create(_texts(1), defaults={"category_id": "poetry"})
+    assert job.items[0].status == "failed"
+    jobs.finish(job)
+
+
+def test_batches_beyond_the_limit_are_refused(jobs, monkeypatch):
+    monkeypatch.setattr(batch_upload.settings, "BATCH_MAX_JOBS", 1)
+    job = jobs.create(_texts(1), defaults=DEFAULTS)
+    with pytest.raises(RuntimeError):
+        jobs.create(_texts(1), defaults=DEFAULTS)
+    jobs.finish(job)
+    jobs.finish(jobs.create(_texts(1), defaults=DEFAULTS))
+
+
+def test_invalid_batches_are_rejected(jobs):
+    with pytest.raises(ValueError, match="no files"):
+        jobs.create([])
+    with pytest.raises(ValueError, match="manifest"):
+        jobs.create(_texts(1), manifest="{")
+    # A rejected batch frees its slot.
+    assert jobs.running() == 0
+
+
+def test_the_pipeline_registers_cleans_and_indexes_in_groups(jobs, corpus):
+    job = jobs.create(_texts(5), defaults=DEFAULTS)
+    asyncio.run(batch_upload.run_batch(job))
+
+    report = jobs.get(job.id)
+    assert report["status"] == "completed"
+    assert report["counts"] == {"done": 5}
+    assert corpus.registered == [f"poem{i}.txt" for i in range(5)]
+    assert sorted(record_id for group in corpus.groups for record_id in group) == [
+        f"rec-{i}" for i in range(1, 6)
+    ]
+    assert max(len(group) for group in corpus.groups) <= 2
+    assert {row[2] for row in corpus.rows} == {f"పద్యం {i}" for i in range(5)}
+    assert not job.directory.exists()
+    assert jobs.running() == 0
+
+
+def test_a_failed_stage_fails_only_its_files(jobs, corpus, monkeypatch):
+    finalize_record = corpus.finalize_record
+
+    async def flaky_finalize_record(**kwargs):
+        if kwargs["filename"] == "poem1.txt":
+            raise ConnectionError("corpus unavailable")
+        return await finalize_record(**kwargs)
+
+    monkeypatch.setattr(batch_upload, "finalize_record", flaky_finalize_record)
+    job = jobs.create(_texts(3), defaults=DEFAULTS)
+    asyncio.run(batch_upload.run_batch(job))
+
+    items = jobs.get(job.id)["items"]
+    assert [item["status"] for item in items] == ["done", "failed", "done"]
+    assert items[1]["error"] == "register: corpus unavailable"
+
+
+def test_a_batch_left_running_by_an_exited_worker_is_interrupted(jobs):
+    job = jobs.create(_texts(1), defaults=DEFAULTS)
+    # Another worker reads the report once the lock is gone.
+    job.lock.release()
+    assert BatchJobs(str(jobs.root)).get(job.id)["status"] == "interrupted"
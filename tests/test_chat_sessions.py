@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from backend.services import chat_sessions
+from backend.services.chat_sessions import (
+    ChatSession,
+    SessionStore,
+    record_turn,
+    schedule_summary,
+    summarize_history,
+)
+
+QUESTION = "ప్రశ్న " * 10
+ANSWER = "సమాధానం " * 20
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(chat_sessions.settings, "CHAT_HISTORY_TOKEN_BUDGET", 150)
+    return 150
+
+
+@pytest.fixture
+def summaries(monkeypatch):
+    calls = []
+
+    async def fake_summarize(summary, turns):
+        calls.append(list(turns))
+        await asyncio.sleep(0)
+        return f"సారాంశం{len(calls)}"
+
+    monkeypatch.setattr(chat_sessions, "_summarize", fake_summarize)
+    return calls
+
+
+def test_record_turn_reports_when_the_history_is_over_budget(budget):
+    session = ChatSession(id="s")
+    assert not record_turn(session, QUESTION, ANSWER)
+    assert record_turn(session, QUESTION, ANSWER)
+
+
+def test_summarize_history_rolls_the_oldest_turns_into_the_summary(
+    budget, summaries
+):
+    session = ChatSession(id="s")
+    for i in range(3):
+        record_turn(session, f"{QUESTION}{i}", ANSWER)
+
+    asyncio.run(summarize_history(session))
+
+    assert session.summary == "సారాంశం1"
+    assert summaries[0][0] == (f"{QUESTION}0", ANSWER)
+    assert session.turns[-1] == (f"{QUESTION}2", ANSWER)
+    assert not session.summarizing
+
+
+def test_turns_added_during_the_summary_are_kept(budget, monkeypatch):
+    session = ChatSession(id="s")
+    for i in range(3):
+        record_turn(session, f"{QUESTION}{i}", ANSWER)
+
+    async def slow_summarize(summary, turns):
+        # A new turn lands while Gemini is summarizing.
+        session.turns.append(("new", "turn"))
+        return "సారాంశం"
+
+    monkeypatch.setattr(chat_sessions, "_summarize", slow_summarize)
+    asyncio.run(summarize_history(session))
+    assert session.turns[-1] == ("new", "turn")
+    assert (f"{QUESTION}0", ANSWER) not in session.turns
+
+
+def test_a_failed_summary_still_bounds_the_history(budget, monkeypatch):
+    session = ChatSession(id="s", summary="పాత సారాంశం")
+    for i in range(3):
+        record_turn(session, f"{QUESTION}{i}", ANSWER)
+
+    async def failing_summarize(summary, turns):
+        raise RuntimeError("blocked")
+
+    monkeypatch.setattr(chat_sessions, "_summarize", failing_summarize)
+    asyncio.run(summarize_history(session))
+    assert session.summary == "పాత సారాంశం"
+    assert len(session.turns) < 3
+
+
+def test_schedule_summary_runs_without_being_awaited(budget, summaries):
+    session = ChatSession(id="s")
+    for i in range(3):
+        record_turn(session, f"{QUESTION}{i}", ANSWER)
+
+    async def main():
+        task = schedule_summary(session)
+        assert task in chat_sessions._summary_tasks
+        assert not task.done()
+        await task
+        await asyncio.sleep(0)
+        assert task not in chat_sessions._summary_tasks
+
+    asyncio.run(main())
+    assert session.summary == "సారాంశం1"
+
+
+def test_session_store_evicts_the_least_recently_used():
+    store = SessionStore(max_sessions=2, ttl=3600)
+    first = store.get_or_create("a")
+    second = store.get_or_create("b")
+    store.get_or_create("a")
+    store.get_or_create("c")
+    assert len(store) == 2
+    assert store.get_or_create("a") is first
+    assert store.get_or_create("b") is not second
+
+
+def test_session_store_expires_idle_sessions():
+    store = SessionStore(max_sessions=10, ttl=-1)
+    session = store.get_or_create("a")
+    session.turns.append(("q", "a"))
+    assert store.get_or_create("a").turns == []
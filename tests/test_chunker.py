@@ -0,0 +1,57 @@
+import unicodedata
+
+from backend.services.chunker import graphemes, split_text
+from backend.services.text_utils import estimate_tokens
+
+STANZA = "తెలుగు భాష తీయదనం తెలుగు పద్యం అందం\nఅమ్మ ఒడిలో నేర్చిన మాట మధురం"
+
+
+def test_graphemes_keep_vowel_signs_with_their_consonant():
+    assert graphemes("తెలుగు") == ["తె", "లు", "గు"]
+
+
+def test_graphemes_keep_conjuncts_together():
+    # క + virama + ష forms one conjunct, with the vowel sign on top.
+    assert graphemes("క్షేమం") == ["క్షే", "మం"]
+
+
+def test_graphemes_attach_joiners():
+    assert graphemes("క\u200cష") == ["క\u200c", "ష"]
+    assert graphemes("క్\u200dష") == ["క్\u200dష"]
+
+
+def test_split_text_returns_short_text_whole():
+    assert split_text("  చిన్న వాక్యం.  ", budget=50) == ["చిన్న వాక్యం."]
+    assert split_text("", budget=50) == []
+
+
+def test_split_text_chunks_fit_the_budget():
+    text = "\n\n".join([STANZA] * 12)
+    chunks = split_text(text, budget=40, overlap=0)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 40 for chunk in chunks)
+
+
+def test_split_text_never_starts_a_chunk_inside_a_grapheme():
+    # A single word longer than the budget falls back to grapheme clusters.
+    text = "క్షేమం" * 40
+    chunks = split_text(text, budget=10, overlap=0)
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    for chunk in chunks:
+        assert unicodedata.category(chunk[0]) not in ("Mn", "Mc", "Me")
+
+
+def test_split_text_prefers_stanza_breaks():
+    budget = estimate_tokens(STANZA) + 5
+    chunks = split_text(f"{STANZA}\n\n{STANZA}\n\n{STANZA}", budget=budget, overlap=0)
+    assert chunks == [STANZA, STANZA, STANZA]
+
+
+def test_split_text_repeats_overlap_from_the_previous_chunk():
+    words = [f"పదం{i}" for i in range(60)]
+    chunks = split_text(" ".join(words), budget=30, overlap=8)
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        first_word = chunk.split()[0]
+        assert first_word in previous.split()
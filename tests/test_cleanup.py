@@ -0,0 +1,70 @@
+import pytest
+
+from backend.services import cleanup
+
+
+class Model:
+    """Stands in for Gemini, echoing texts back upper-cased."""
+
+    calls = []
+    drop = set()
+    fail = False
+
+    def __init__(self, name: str):
+        pass
+
+    def generate_content(self, prompt: str):
+        type(self).calls.append(prompt)
+        if "<<<DOC 1>>>" not in prompt:
+            return Response(prompt.rsplit("---\n", 1)[1].upper())
+        if self.fail:
+            return Response(None)
+        body = prompt.split("\n\n", 1)[1]
+        parts = cleanup._MARKER.split(body)
+        return Response(
+            "".join(
+                f"<<<DOC {number}>>>\n{text.strip().upper()}\n"
+                for number, text in zip(parts[1::2], parts[2::2])
+                if int(number) not in self.drop
+            )
+        )
+
+
+class Response:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("The response was blocked.")
+        return self._text
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(Model, "calls", [])
+    monkeypatch.setattr(Model, "drop", set())
+    monkeypatch.setattr(Model, "fail", False)
+    monkeypatch.setattr(cleanup.genai, "GenerativeModel", Model)
+    monkeypatch.setattr(cleanup.settings, "CLEANUP_BATCH_TOKENS", 100)
+    return Model
+
+
+def test_texts_are_packed_into_shared_calls(model):
+    texts = [("one " * 20).strip(), "", ("two " * 20).strip(), ("three " * 80).strip()]
+    assert cleanup.clean_texts(texts) == [text.upper() for text in texts]
+    # The first two texts share a call; the long one gets its own.
+    assert len(model.calls) == 2
+
+
+def test_a_text_the_model_dropped_is_cleaned_on_its_own(model):
+    model.drop = {2}
+    assert cleanup.clean_texts(["a b", "c d", "e f"]) == ["A B", "C D", "E F"]
+    assert len(model.calls) == 2
+
+
+def test_a_blocked_shared_call_cleans_each_text(model):
+    model.fail = True
+    assert cleanup.clean_texts(["a b", "c d"]) == ["A B", "C D"]
+    assert len(model.calls) == 3
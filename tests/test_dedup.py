@@ -0,0 +1,79 @@
+from backend.services.dedup import DedupIndex, link_source, minhash
+
+POEM = (
+    "శ్రీరామ రామ రామేతి రమే రామే మనోరమే సహస్రనామ తత్తుల్యం రామనామ వరాననే "
+    "తెలుగు భాషలో పద్యం రాయడం ఒక కళ అది తరతరాలుగా వస్తున్న సంపద"
+)
+OTHER = "సముద్రపు ఒడ్డున ఇసుకలో పిల్లలు ఆడుకుంటున్నారు సాయంత్రం సూర్యుడు అస్తమిస్తున్నాడు"
+
+
+def test_find_matches_a_reformatted_copy():
+    index = DedupIndex(threshold=0.8)
+    index.add((0, "a"), minhash(POEM))
+    copy = POEM.replace(" ", "  ").replace("రామ", "రామ,", 1)
+    assert index.find(minhash(copy)) == (0, "a")
+    assert index.find(minhash(OTHER)) is None
+
+
+def test_find_skips_excluded_keys():
+    index = DedupIndex(threshold=0.8)
+    index.add((0, "a"), minhash(POEM))
+    index.add((1, "b"), minhash(POEM))
+    assert index.find(minhash(POEM), exclude=[(0, "a")]) == (1, "b")
+    assert index.find(minhash(POEM), exclude=[(0, "a"), (1, "b")]) is None
+
+
+def test_remove_forgets_the_signature_and_its_buckets():
+    index = DedupIndex(threshold=0.8)
+    index.add((0, "a"), minhash(POEM))
+    index.remove((0, "a"))
+    assert index.find(minhash(POEM)) is None
+    assert index.signature((0, "a")) is None
+    assert len(index) == 0
+    assert index.buckets == {}
+    # Removing an unknown key is a no-op.
+    index.remove((0, "missing"))
+
+
+def test_take_changes_replays_adds_and_removes():
+    index = DedupIndex(threshold=0.8)
+    index.add((0, "a"), minhash(POEM))
+    index.add((0, "b"), minhash(OTHER))
+    index.remove((0, "b"))
+    index.record(POEM, duplicate=True)
+    replica = DedupIndex(threshold=0.8)
+    replica.apply_changes(index.take_changes())
+    assert replica.find(minhash(POEM)) == (0, "a")
+    assert replica.find(minhash(OTHER)) is None
+    assert replica.stats["duplicates"] == 1
+    assert index.take_changes() is None
+
+
+def test_link_source_skips_the_same_record_and_repeats():
+    target = {"record_id": "r1", "title": "One"}
+    link_source(target, {"record_id": "r1", "title": "One"})
+    assert "duplicate_sources" not in target
+    source = {"record_id": "r2", "title": "Two", "page": 3}
+    link_source(target, source)
+    link_source(target, source)
+    assert target["duplicate_sources"] == [{"record_id": "r2", "title": "Two"}]
+
+
+def test_a_saved_index_reads_back_with_later_changes_over_it(tmp_path):
+    index = DedupIndex(threshold=0.8)
+    index.add((0, "a"), minhash(POEM))
+    index.record(POEM, duplicate=True)
+    index.save(tmp_path / "dedup.sqlite")
+
+    loaded = DedupIndex.load(tmp_path / "dedup.sqlite", threshold=0.8)
+    assert loaded.find(minhash(POEM)) == (0, "a")
+    assert loaded.stats["duplicates"] == 1
+    loaded.remove((0, "a"))
+    loaded.add((1, "b"), minhash(OTHER))
+    assert loaded.find(minhash(POEM)) is None
+    assert loaded.find(minhash(OTHER)) == (1, "b")
+    assert len(loaded) == 1
+
+    replica = DedupIndex.load(tmp_path / "dedup.sqlite", threshold=0.8)
+    replica.apply_changes(loaded.take_changes())
+    assert dict(replica.items()).keys() == {(1, "b")}
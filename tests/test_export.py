@@ -0,0 +1,134 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import zstandard
+
+from backend.services import export
+from backend.services.database import BLOG_COLUMNS
+from backend.services.run_lock import RunLock
+
+HOUR_AGO = datetime.now(timezone.utc) - timedelta(hours=1)
+
+
+class Blogs:
+    """Stands in for the `blogs` and `blog_deletions` tables."""
+
+    def __init__(self):
+        self.rows = []
+        self.deletions = []
+
+    def write(self, record_id: str, minutes: int):
+        row = dict.fromkeys(BLOG_COLUMNS)
+        row.update(
+            id=len(self.rows) + 1,
+            record_id=record_id,
+            content=f"{record_id} content",
+            updated_at=HOUR_AGO + timedelta(minutes=minutes),
+        )
+        self.rows.append(row)
+
+    def delete(self, record_id: str, minutes: int):
+        self.rows = [row for row in self.rows if row["record_id"] != record_id]
+        self.deletions.append(
+            {
+                "id": len(self.deletions) + 1,
+                "record_id": record_id,
+                "deleted_at": HOUR_AGO + timedelta(minutes=minutes),
+            }
+        )
+
+    @staticmethod
+    def _after(rows, field, until, since):
+        for row in sorted(rows, key=lambda r: (r[field], r["id"])):
+            if since is not None and (row[field], row["id"]) <= since:
+                continue
+            if until is not None and row[field] >= until:
+                continue
+            yield dict(row)
+
+    def stream_changed_blogs(self, until=None, since=None, fetch_size=None):
+        return self._after(self.rows, "updated_at", until, since)
+
+    def stream_blog_deletions(
+        self, until=None, since=None, absent=False, fetch_size=None
+    ):
+        return self._after(self.deletions, "deleted_at", until, since)
+
+
+@pytest.fixture
+def blogs(tmp_path, monkeypatch):
+    blogs = Blogs()
+    monkeypatch.setattr(export, "EXPORT_ROOT", tmp_path)
+    monkeypatch.setattr(export, "WATERMARK_FILE", tmp_path / "watermark.json")
+    monkeypatch.setattr(export, "_run_lock", RunLock(tmp_path / ".export.lock"))
+    monkeypatch.setattr(export, "stream_changed_blogs", blogs.stream_changed_blogs)
+    monkeypatch.setattr(export, "stream_blog_deletions", blogs.stream_blog_deletions)
+    return blogs
+
+
+def _run(**kwargs) -> dict:
+    return export.export_corpus(["jsonl"], **kwargs)
+
+
+def _exported(manifest: dict) -> list:
+    """Returns the record ids in an export's shards, in order."""
+    directory = export.EXPORT_ROOT / manifest["export_id"]
+    record_ids = []
+    for shard in manifest["shards"]["jsonl"]:
+        with open(directory / shard["file"], "rb") as f:
+            text = zstandard.ZstdDecompressor().stream_reader(f).read().decode()
+        record_ids += [json.loads(line)["record_id"] for line in text.splitlines()]
+    return record_ids
+
+
+def _tombstones(manifest: dict) -> list:
+    path = export.EXPORT_ROOT / manifest["export_id"] / export.DELETIONS_FILE
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["record_id"] for line in f]
+
+
+def test_incremental_exports_resume_from_the_watermark(blogs):
+    blogs.write("r1", 1)
+    blogs.write("r2", 2)
+    full = _run()
+    assert _exported(full) == ["r1", "r2"]
+    assert full["deletions"] is None
+    assert export.read_watermark()["id"] == 2
+
+    assert _exported(_run(incremental=True)) == []
+    blogs.write("r3", 3)
+    incremental = _run(incremental=True)
+    assert incremental["incremental"]
+    assert _exported(incremental) == ["r3"]
+    assert export.read_watermark()["id"] == 3
+
+
+def test_a_since_export_leaves_the_watermark_alone(blogs):
+    blogs.write("r1", 1)
+    blogs.write("r2", 2)
+    _run()
+    watermark = export.read_watermark()
+
+    blogs.write("r3", 3)
+    assert _exported(_run(since=HOUR_AGO)) == ["r1", "r2", "r3"]
+    assert export.read_watermark() == watermark
+    # The next incremental export still picks up r3.
+    assert _exported(_run(incremental=True)) == ["r3"]
+
+
+def test_incremental_exports_write_tombstones_once(blogs, monkeypatch):
+    blogs.write("r1", 1)
+    blogs.write("r2", 2)
+    # Settle the full export half an hour back, so a deletion can follow it.
+    monkeypatch.setattr(export, "SETTLE_SECONDS", 30 * 60)
+    _run()
+    monkeypatch.setattr(export, "SETTLE_SECONDS", 0)
+
+    blogs.delete("r1", 40)
+    incremental = _run(incremental=True)
+    assert _tombstones(incremental) == ["r1"]
+    assert incremental["deletions"]["rows"] == 1
+    assert _tombstones(_run(incremental=True)) == []
+    # A --since export covers the deletions in its own window.
+    assert _tombstones(_run(since=HOUR_AGO)) == ["r1"]
@@ -0,0 +1,98 @@
+import pytest
+from conftest import telugu_text
+from langchain.docstore.document import Document
+
+from backend.services.dedup import minhash
+from backend.services.index_store import VectorIndex
+
+
+def _add(index: VectorIndex, doc_id: str, seed: int, record_id: str = "r1"):
+    text = telugu_text(seed)
+    doc = Document(page_content=text, metadata={"record_id": record_id})
+    index.shards[0].add([(doc_id, doc, [float(seed)] * 4)])
+    index.dedup.add((0, doc_id), minhash(text))
+    index.records.add_chunk(record_id, (0, doc_id))
+
+
+def _docs(index: VectorIndex) -> dict:
+    return {doc_id: doc.page_content for doc_id, doc in index.shards[0].items()}
+
+
+@pytest.fixture
+def index(tmp_path) -> VectorIndex:
+    return VectorIndex.create(tmp_path / "gen", 1)
+
+
+def test_a_loaded_index_replays_the_log(index):
+    _add(index, "a", 1)
+    index.commit()
+    index.shards[0].delete(["a"])
+    _add(index, "b", 2, record_id="r2")
+    index.commit()
+
+    replica = VectorIndex.load(index.path, 1)
+    assert replica.applied == 2
+    assert _docs(replica) == {"b": telugu_text(2)}
+    assert replica.shards[0].dead == 1
+    assert replica.dedup.find(minhash(telugu_text(2))) == (0, "b")
+    assert replica.records.chunks_of("r2") == {(0, "b")}
+
+
+def test_catch_up_applies_only_new_entries(index):
+    replica = VectorIndex.load(index.path, 1)
+    assert replica.shards[0].ntotal == 0
+    _add(index, "a", 1)
+    index.commit(meta={"watermark": 1})
+    assert replica.catch_up() == 1
+    assert replica.catch_up() == 0
+    assert _docs(replica) == {"a": telugu_text(1)}
+    assert replica.meta == {"watermark": 1}
+
+
+def test_commit_never_overwrites_an_entry_written_meanwhile(index):
+    behind = VectorIndex.load(index.path, 1)
+    assert behind.shards[0].ntotal == 0
+    _add(index, "a", 1)
+    index.commit()
+    _add(behind, "b", 2)
+    with pytest.raises(FileExistsError):
+        behind.commit()
+    assert _docs(VectorIndex.load(index.path, 1)) == {"a": telugu_text(1)}
+
+
+def test_commit_holds_back_excluded_signatures(index):
+    _add(index, "a", 1)
+    index.commit(exclude=[(0, "a")])
+    assert VectorIndex.load(index.path, 1).dedup.signature((0, "a")) is None
+    index.commit()
+    assert VectorIndex.load(index.path, 1).dedup.signature((0, "a")) is not None
+
+
+def test_a_saved_snapshot_leaves_tombstones_out_and_starts_a_new_log(index, tmp_path):
+    _add(index, "a", 1)
+    _add(index, "b", 2, record_id="r2")
+    index.commit()
+    index.shards[0].delete(["a"])
+    index.records.pop("r1")
+    index.commit()
+
+    index.save(tmp_path / "next")
+    snapshot = VectorIndex.load(tmp_path / "next", 1)
+    assert snapshot.applied == 0
+    assert _docs(snapshot) == {"b": telugu_text(2)}
+    assert snapshot.shards[0].ntotal == 1
+    assert set(snapshot.records) == {"r2"}
+    # Nothing is held in memory until later writes change it.
+    assert not snapshot.dedup.changed and not snapshot.records.changed
+    assert snapshot.dedup.find(minhash(telugu_text(2))) == (0, "b")
+
+
+def test_loading_with_other_shard_settings_is_refused(index, monkeypatch):
+    with pytest.raises(ValueError, match="reindex"):
+        VectorIndex.load(index.path, 2)
+    monkeypatch.setattr(
+        "backend.services.index_store.settings.VECTOR_STORE_SHARD_KEY", "language"
+    )
+    assert not VectorIndex.layout_matches(index.path, 1)
+    with pytest.raises(ValueError):
+        VectorIndex.load(index.path, 1)
@@ -0,0 +1,90 @@
+from backend.services.record_index import RecordIndex
+
+
+def _index() -> RecordIndex:
+    index = RecordIndex()
+    index.add_chunk("r1", (0, "a"))
+    index.add_chunk("r1", (1, "b"))
+    index.add_chunk("r2", (0, "c"))
+    # r2 repeats r1's first chunk, and r3 repeats both of r1's.
+    index.add_link("r2", (0, "a"))
+    index.add_link("r3", (0, "a"))
+    index.add_link("r3", (1, "b"))
+    return index
+
+
+def test_add_link_ignores_repeats_within_a_record():
+    index = _index()
+    index.add_link("r1", (0, "a"))
+    assert not index.links_of("r1")
+    assert index.linked_to((0, "a")) == {"r2", "r3"}
+
+
+def test_pop_returns_chunks_and_links_and_unlinks():
+    index = _index()
+    chunks, links = index.pop("r3")
+    assert chunks == set()
+    assert links == {(0, "a"), (1, "b")}
+    assert "r3" not in index
+    assert index.linked_to((0, "a")) == {"r2"}
+    assert not index.linked_to((1, "b"))
+
+    chunks, links = index.pop("r1")
+    assert chunks == {(0, "a"), (1, "b")}
+    assert links == set()
+    assert index.pop("unknown") == (set(), set())
+
+
+def test_transfer_hands_a_vector_to_a_linked_record():
+    index = _index()
+    index.pop("r1")
+    index.transfer((0, "a"), "r2")
+    assert index.chunks_of("r2") == {(0, "a"), (0, "c")}
+    assert not index.links_of("r2")
+    assert index.linked_to((0, "a")) == {"r3"}
+
+
+def test_move_repoints_links_to_the_new_key():
+    index = _index()
+    index.move((0, "a"), (2, "z"))
+    assert not index.linked_to((0, "a"))
+    assert index.linked_to((2, "z")) == {"r2", "r3"}
+    assert index.links_of("r3") == {(2, "z"), (1, "b")}
+
+
+def test_take_changes_replays_onto_another_instance():
+    index = _index()
+    replica = RecordIndex()
+    replica.apply_changes(index.take_changes())
+    index.pop("r3")
+    replica.apply_changes(index.take_changes())
+    assert _contents(replica) == _contents(index)
+    assert index.take_changes() is None
+
+
+def _contents(index: RecordIndex) -> dict:
+    return {
+        record_id: (index.chunks_of(record_id), index.links_of(record_id))
+        for record_id in index
+    }
+
+
+def test_a_saved_map_reads_back_with_later_changes_over_it(tmp_path):
+    _index().save(tmp_path / "records.sqlite")
+    index = RecordIndex.load(tmp_path / "records.sqlite")
+    assert _contents(index) == _contents(_index())
+    assert index.linked_to((0, "a")) == {"r2", "r3"}
+
+    index.pop("r2")
+    index.transfer((0, "a"), "r3")
+    assert "r2" not in index
+    assert index.linked_to((0, "a")) == set()
+    assert index.chunks_of("r3") == {(0, "a")}
+    assert dict(index.link_items()) == {"r3": {(1, "b")}}
+
+    # The changes replayed over the snapshot give the same map.
+    replica = RecordIndex.load(tmp_path / "records.sqlite")
+    replica.apply_changes(index.take_changes())
+    assert _contents(replica) == _contents(index)
+    index.save(tmp_path / "next.sqlite")
+    assert _contents(RecordIndex.load(tmp_path / "next.sqlite")) == _contents(index)
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from conftest import telugu_text
+
+from backend.services import reindex
+
+HOUR_AGO = datetime.now(timezone.utc) - timedelta(hours=1)
+
+
+class Blogs:
+    """Stands in for the `blogs` and `blog_deletions` tables."""
+
+    def __init__(self, count: int):
+        self.rows = [
+            self._row(i, f"r{i}", HOUR_AGO + timedelta(seconds=i))
+            for i in range(1, count + 1)
+        ]
+        self.on_row = None
+        self.fail_after = None
+
+    @staticmethod
+    def _row(i: int, record_id: str, updated_at: datetime) -> dict:
+        return {
+            "id": i,
+            "record_id": record_id,
+            "title": record_id,
+            "content": telugu_text(i),
+            "updated_at": updated_at,
+        }
+
+    def add(self, record_id: str, seed: int, updated_at: datetime):
+        self.rows.append(self._row(len(self.rows) + 1, record_id, updated_at))
+        self.rows[-1]["content"] = telugu_text(seed)
+
+    def stream_changed_blogs(self, until=None, since=None, fetch_size=None):
+        for row in sorted(self.rows, key=lambda r: (r["updated_at"], r["id"])):
+            if since is not None and (row["updated_at"], row["id"]) <= since:
+                continue
+            if until is not None and row["updated_at"] >= until:
+                continue
+            if self.fail_after is not None and row["id"] > self.fail_after:
+                raise ConnectionError("database went away")
+            yield dict(row)
+            if self.on_row is not None:
+                self.on_row(row)
+
+    def stream_blog_deletions(
+        self, until=None, since=None, absent=False, fetch_size=None
+    ):
+        return iter(())
+
+
+@pytest.fixture
+def blogs(store, monkeypatch):
+    blogs = Blogs(8)
+    monkeypatch.setattr(reindex, "stream_changed_blogs", blogs.stream_changed_blogs)
+    monkeypatch.setattr(reindex, "stream_blog_deletions", blogs.stream_blog_deletions)
+    monkeypatch.setattr(reindex.settings, "REINDEX_EMBED_BATCH_SIZE", 2)
+    monkeypatch.setattr(reindex.settings, "REINDEX_CHECKPOINT_EVERY", 1)
+    monkeypatch.setattr(reindex.settings, "REINDEX_WORKERS", 1)
+    return blogs
+
+
+def _contents(store, record_id: str) -> list[str]:
+    return [
+        doc.page_content
+        for shard in store.live.shards
+        for _, doc in shard.items()
+        if doc.metadata["record_id"] == record_id
+    ]
+
+
+def test_full_rebuild_indexes_every_row(blogs, store):
+    state = reindex.reindex()
+    assert state["watermark"]["id"] == 8
+    assert set(store.live.records) == {f"r{i}" for i in range(1, 9)}
+    assert reindex.read_checkpoint()["completed_at"]
+
+
+def test_interrupted_rebuild_resumes_from_its_watermark(blogs, store):
+    blogs.fail_after = 5
+    with pytest.raises(ConnectionError):
+        reindex.reindex()
+    partial = reindex.get_reindex_status()["partial"]["all"]
+    assert 0 < partial["watermark"]["id"] <= 5
+
+    blogs.fail_after = None
+    streamed = []
+    blogs.on_row = lambda row: streamed.append(row["id"])
+    reindex.reindex()
+    assert min(streamed) > partial["watermark"]["id"]
+    records = store.live.records
+    assert set(records) == {f"r{i}" for i in range(1, 9)}
+    # Rows indexed before the interruption are not stored twice.
+    stored = sum(len(list(shard.items())) for shard in store.live.shards)
+    assert sum(len(records.chunks_of(record_id)) for record_id in records) == stored
+    assert not reindex.get_reindex_status()["partial"]
+
+
+def test_rows_written_during_the_rebuild_are_replayed(blogs, store):
+    now = datetime.now(timezone.utc)
+
+    def upload_midway(row):
+        if row["id"] == 4 and "late" not in [r["record_id"] for r in blogs.rows]:
+            # An upload lands after the watermark and an indexed row is edited.
+            blogs.add("late", 100, now)
+            store.add_text_to_store(telugu_text(100), {"record_id": "late"})
+            blogs.rows[0].update(content=telugu_text(200), updated_at=now)
+
+    blogs.on_row = upload_midway
+    reindex.reindex()
+    assert _contents(store, "late") == [telugu_text(100)]
+    assert _contents(store, "r1") == [telugu_text(200)]
+
+
+def test_incremental_run_adds_only_missing_records(blogs, store):
+    reindex.reindex()
+    store.add_text_to_store(telugu_text(300), {"record_id": "uploaded"})
+    minute_ago = datetime.now(timezone.utc) - timedelta(minutes=2)
+    blogs.add("uploaded", 300, minute_ago)
+    blogs.add("missed", 400, minute_ago)
+
+    state = reindex.reindex(incremental=True)
+    assert state["watermark"]["id"] == 10
+    assert _contents(store, "uploaded") == [telugu_text(300)]
+    assert _contents(store, "missed") == [telugu_text(400)]
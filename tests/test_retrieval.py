@@ -0,0 +1,35 @@
+from langchain.docstore.document import Document
+
+from backend.services.retrieval import drop_overlaps
+
+FIRST = "మొదటి భాగం కథ ఇక్కడ మొదలవుతుంది. "
+SHARED = "ఈ వాక్యం రెండు ముక్కల్లోనూ పునరావృతమవుతుంది. "
+SECOND = "రెండవ భాగం కథ ఇక్కడ ముగుస్తుంది."
+
+
+def _doc(text: str, record_id: str = "r1") -> Document:
+    return Document(page_content=text, metadata={"record_id": record_id})
+
+
+def test_drop_overlaps_drops_contained_chunks():
+    kept = drop_overlaps([_doc(FIRST + SHARED), _doc(SHARED)])
+    assert [doc.page_content for doc in kept] == [(FIRST + SHARED).strip()]
+
+
+def test_drop_overlaps_cuts_the_shared_span_from_the_lower_ranked_chunk():
+    # Ranked after the chunk it follows: the shared start is cut.
+    kept = drop_overlaps([_doc(FIRST + SHARED), _doc(SHARED + SECOND)])
+    assert [doc.page_content for doc in kept] == [(FIRST + SHARED).strip(), SECOND]
+
+    # Ranked after the chunk it precedes: the shared end is cut.
+    kept = drop_overlaps([_doc(SHARED + SECOND), _doc(FIRST + SHARED)])
+    assert [doc.page_content for doc in kept] == [SHARED + SECOND, FIRST.strip()]
+
+
+def test_drop_overlaps_keeps_other_records_intact():
+    docs = [_doc(FIRST + SHARED, "r1"), _doc(SHARED, "r2")]
+    assert [doc.page_content for doc in drop_overlaps(docs)] == [
+        (FIRST + SHARED).strip(),
+        SHARED.strip(),
+    ]
+    assert drop_overlaps(docs)[1].metadata == {"record_id": "r2"}
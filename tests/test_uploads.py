@@ -0,0 +1,82 @@
+import io
+import uuid
+
+import pytest
+
+from backend.services.uploads import ChunkedUploadStore
+
+DATA = "తెలుగు సాహిత్యం ".encode("utf-8") * 50
+
+
+def _chunks(data: bytes, count: int) -> list[bytes]:
+    size = -(-len(data) // count)
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.fixture
+def store(tmp_path) -> ChunkedUploadStore:
+    return ChunkedUploadStore(str(tmp_path))
+
+
+def test_chunks_can_arrive_in_any_order_and_be_resent(store):
+    chunks = _chunks(DATA, 4)
+    upload = store.create("poem.txt", "text/plain", len(DATA), len(chunks))
+    assert upload["received"] == []
+    for index in (2, 0, 2):
+        status = store.write_chunk(
+            upload["upload_id"], index, io.BytesIO(chunks[index])
+        )
+    assert status["received"] == [0, 2]
+    assert store.status(upload["upload_id"])["received"] == [0, 2]
+
+
+def test_assemble_concatenates_the_chunks_in_order(store):
+    chunks = _chunks(DATA, 3)
+    upload = store.create("../poem.txt", "text/plain", len(DATA), len(chunks))
+    for index in reversed(range(len(chunks))):
+        store.write_chunk(upload["upload_id"], index, io.BytesIO(chunks[index]))
+    manifest, path = store.assemble(upload["upload_id"])
+    assert manifest["filename"] == "poem.txt"
+    assert path.read_bytes() == DATA
+    # The chunk files are gone, but every chunk still reports as received.
+    assert store.status(upload["upload_id"])["received"] == [0, 1, 2]
+    # A retried completion reuses the assembled file.
+    assert store.assemble(upload["upload_id"])[1] == path
+
+
+def test_assemble_reports_missing_chunks(store):
+    chunks = _chunks(DATA, 3)
+    upload = store.create("poem.txt", "text/plain", len(DATA), len(chunks))
+    store.write_chunk(upload["upload_id"], 1, io.BytesIO(chunks[1]))
+    with pytest.raises(ValueError, match=r"Missing chunks: \[0, 2\]"):
+        store.assemble(upload["upload_id"])
+
+
+def test_assemble_rejects_a_size_mismatch(store):
+    upload = store.create("poem.txt", "text/plain", len(DATA), 1)
+    store.write_chunk(upload["upload_id"], 0, io.BytesIO(DATA[:-1]))
+    with pytest.raises(ValueError, match="size"):
+        store.assemble(upload["upload_id"])
+
+
+def test_invalid_uploads_and_chunks_are_rejected(store):
+    with pytest.raises(ValueError):
+        store.create("poem.txt", "text/plain", 0, 1)
+    with pytest.raises(ValueError):
+        store.create("poem.txt", "text/plain", 10, 11)
+    upload = store.create("poem.txt", "text/plain", len(DATA), 2)
+    with pytest.raises(ValueError):
+        store.write_chunk(upload["upload_id"], 2, io.BytesIO(b"x"))
+    with pytest.raises(KeyError):
+        store.status("../etc")
+    with pytest.raises(KeyError):
+        store.status(str(uuid.uuid4()))
+
+
+def test_save_record_is_kept_in_the_manifest(store):
+    upload = store.create("poem.txt", "text/plain", len(DATA), 1)
+    store.save_record(upload["upload_id"], {"id": "rec-1"})
+    assert store.status(upload["upload_id"])["record"] == {"id": "rec-1"}
+    store.discard(upload["upload_id"])
+    with pytest.raises(KeyError):
+        store.status(upload["upload_id"])
@@ -0,0 +1,100 @@
+import shutil
+
+import pytest
+from conftest import telugu_text
+
+from backend.services.dedup import minhash
+
+POEM = telugu_text(1)
+OTHER = telugu_text(2)
+
+
+def _docs(store) -> dict:
+    """Maps each stored chunk's text to its record and duplicate sources."""
+    docs = {}
+    for shard in store.live.shards:
+        for _, doc in shard.items():
+            sources = doc.metadata.get("duplicate_sources", [])
+            docs[doc.page_content] = (
+                doc.metadata["record_id"],
+                [source["record_id"] for source in sources],
+            )
+    return docs
+
+
+def _reload(store):
+    store.live = None
+    store.initialize_vector_store()
+
+
+def test_round_trip_through_add_upsert_delete_compact_and_reload(store):
+    store.add_text_to_store(POEM, {"record_id": "r1"})
+    # A copy of an indexed chunk is linked to it rather than embedded.
+    store.add_text_to_store(POEM, {"record_id": "r2"})
+    assert _docs(store) == {POEM: ("r1", ["r2"])}
+    _, results = store.search_candidates(POEM, 1)
+    assert results[0][1].page_content == POEM
+
+    # Replacing r1 hands its chunk over to r2, which still depends on it.
+    result = store.upsert_record("r1", OTHER, {"title": "r1"})
+    assert (result["added"], result["removed"], result["reassigned"]) == (1, 0, 1)
+    assert _docs(store) == {POEM: ("r2", []), OTHER: ("r1", [])}
+
+    result = store.delete_record("r2")
+    assert result["removed"] == 1
+    assert _docs(store) == {OTHER: ("r1", [])}
+    assert store.live.shards[0].dead == 1
+
+    assert store.compact_vector_store(force=True)["removed"] == 1
+    assert store.live.shards[0].dead == 0
+    _, results = store.search_candidates(POEM, 5)
+    assert [doc.page_content for _, doc, _ in results] == [OTHER]
+
+    _reload(store)
+    assert _docs(store) == {OTHER: ("r1", [])}
+    assert set(store.live.records) == {"r1"}
+
+
+def test_the_log_survives_a_reload_without_a_snapshot(store):
+    store.add_text_to_store(POEM, {"record_id": "r1"})
+    store.upsert_record("r1", OTHER, {})
+    generation = store._loaded_generation
+    _reload(store)
+    assert store._loaded_generation == generation
+    assert _docs(store) == {OTHER: ("r1", [])}
+    assert store.live.records.chunks_of("r1")
+
+
+def test_adding_a_record_again_leaves_it_alone(store):
+    store.add_text_to_store(POEM, {"record_id": "r1"})
+    store.add_text_to_store(OTHER, {"record_id": "r1"})
+    assert _docs(store) == {POEM: ("r1", [])}
+
+
+@pytest.fixture
+def two_shards(store, monkeypatch):
+    monkeypatch.setattr(store, "NUM_SHARDS", 2)
+    shutil.rmtree(store.STORE_DIR)
+    _reload(store)
+    return store
+
+
+def test_hand_over_moves_the_vector_to_the_new_owners_shard(two_shards):
+    store = two_shards
+    owner = "r1"
+    source = next(
+        record_id
+        for record_id in (f"r{i}" for i in range(2, 50))
+        if store.shard_for({"record_id": record_id})
+        != store.shard_for({"record_id": owner})
+    )
+    store.add_text_to_store(POEM, {"record_id": owner})
+    store.add_text_to_store(POEM, {"record_id": source})
+    store.delete_record(owner)
+
+    shard_no = store.shard_for({"record_id": source})
+    (key,) = store.live.records.chunks_of(source)
+    assert key[0] == shard_no
+    assert store.live.dedup.find(minhash(POEM)) == key
+    _reload(store)
+    assert store.live.shards[shard_no].get(key[1]).metadata["record_id"] == source